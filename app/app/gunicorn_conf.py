@@ -0,0 +1,129 @@
+"""Gunicorn settings for serving the app in production.
+
+Run with::
+
+    gunicorn -c python:app.gunicorn_conf app.wsgi
+
+The app is imported once in the master before forking, so the workers share
+its memory copy-on-write. Workers are recycled after ``max_requests`` to cap
+memory growth, and every worker logs its memory use once it is ready.
+"""
+import gc
+import multiprocessing
+import os
+import time
+
+
+_started = time.time()
+
+bind = '0.0.0.0:%s' % os.environ.get('PORT', '8000')
+
+# load Django in the master, before the workers are forked
+preload_app = True
+
+# (2 x cores) + 1 processes, each with a few threads for requests that
+# wait on the database
+workers = int(os.environ.get(
+    'WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1
+))
+threads = int(os.environ.get('GUNICORN_THREADS', 2))
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+# recycle the workers, the jitter keeps them from restarting all at once
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+# time given to the workers to finish their requests on SIGTERM
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+
+# the heartbeat files of the workers, /dev/shm avoids blocking on disk IO
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+accesslog = '-'
+errorlog = '-'
+
+
+def memory_usage():
+    """Return the memory use of this process in kB, from /proc
+
+    ``rss`` counts the pages shared with the master as well, ``private`` is
+    what this worker really costs.
+    """
+    usage = {}
+    try:
+        with open('/proc/self/smaps_rollup') as smaps:
+            for line in smaps:
+                name, _, value = line.partition(':')
+                if name in ('Rss', 'Pss', 'Private_Clean', 'Private_Dirty'):
+                    usage[name] = int(value.split()[0])
+    except OSError:
+        return None
+    return {
+        'rss': usage.get('Rss', 0),
+        'pss': usage.get('Pss', 0),
+        'private': usage.get('Private_Clean', 0) +
+        usage.get('Private_Dirty', 0),
+    }
+
+
+def when_ready(server):
+    server.log.info(
+        'Started in %.0f ms with %d workers x %d threads',
+        (time.time() - _started) * 1000, server.cfg.workers,
+        server.cfg.threads
+    )
+    if server.cfg.workers > 1:
+        warn_process_local_state(server)
+
+
+def warn_process_local_state(server):
+    """Warn when state that has to be shared is kept per worker"""
+    from django.conf import settings
+    if settings.CACHES['default']['BACKEND'].endswith('.LocMemCache'):
+        server.log.warning(
+            'CACHE_BACKEND is a local memory cache: every worker has its '
+            'own, so cache invalidations and replica pins are not seen by '
+            'the other workers. Set CACHE_BACKEND to a shared cache.'
+        )
+    if settings.THROTTLE_STORE.endswith('.LocalMemoryBucketStore'):
+        server.log.warning(
+            'THROTTLE_STORE keeps the buckets per worker, the rates are '
+            'multiplied by the number of workers.'
+        )
+
+
+def pre_fork(server, worker):
+    # move the preloaded objects out of the garbage collector's reach, so
+    # collections in the workers don't write to (and copy) shared pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # never share database connections opened in the master
+    from django.db import connections
+    for connection in connections.all():
+        connection.close()
+
+
+def post_worker_init(worker):
+    usage = memory_usage()
+    if usage:
+        worker.log.info(
+            'Worker %s ready: rss=%d kB pss=%d kB private=%d kB',
+            worker.pid, usage['rss'], usage['pss'], usage['private']
+        )
+
+
+def worker_exit(server, worker):
+    # write the views the worker still has buffered
+    from core import counters
+    counters.views.flush()
+
+    usage = memory_usage()
+    if usage:
+        server.log.info(
+            'Worker %s exiting: rss=%d kB private=%d kB',
+            worker.pid, usage['rss'], usage['private']
+        )
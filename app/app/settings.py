@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.1/ref/settings/
 """
 
 import os
+import sys
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -47,6 +48,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ProfilingMiddleware',
+    'core.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -54,6 +57,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'app.urls'
@@ -90,6 +94,23 @@ DATABASES = {
     }
 }
 
+# Optional read replica, used for the safe requests of the recipe and user
+# views (see core.db_router and core.middleware.ReplicaRoutingMiddleware).
+if os.environ.get('DB_REPLICA_HOST'):
+    DATABASES['replica'] = dict(
+        DATABASES['default'],
+        HOST=os.environ.get('DB_REPLICA_HOST'),
+        # tests run against the primary only
+        TEST={'MIRROR': 'default'},
+    )
+
+DATABASE_ROUTERS = ['core.db_router.PrimaryReplicaRouter']
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+REPLICA_VIEW_MODULES = ('recipe.views', 'user.views')
+# how long a client reads from the primary after a write (seconds). The
+# pins are kept in the cache, so it has to be shared between processes.
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 5))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
@@ -128,7 +149,158 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/2.1/howto/static-files/
 
 STATIC_URL = '/static/'
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.environ.get('MEDIA_ROOT', '/vol/web/media')
 
 
 ############### CREATED BY RAMANA ############
-AUTH_USER_MODEL = 'core.User'
\ No newline at end of file
+AUTH_USER_MODEL = 'core.User'
+
+# Number of rows deleted per transaction when purging accounts or
+# bulk deleting recipes. Small chunks keep row locks short.
+PURGE_CHUNK_SIZE = int(os.environ.get('PURGE_CHUNK_SIZE', 1000))
+
+# Above this many rows the admin shows the planner's row estimate instead
+# of running COUNT(*) on unfiltered changelists (PostgreSQL only).
+ADMIN_EXACT_COUNT_LIMIT = int(os.environ.get('ADMIN_EXACT_COUNT_LIMIT', 10000))
+
+# Cache shared by all the processes: the cached responses, the versions
+# invalidating them, the replica pins, the login backoff and the throttle
+# buckets live here. The per process local memory default is only right
+# for a single process, docker-compose points it to the memcached service.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+REST_FRAMEWORK = {
+    'DEFAULT_THROTTLE_CLASSES': (
+        'core.throttling.ReadThrottle',
+        'core.throttling.WriteThrottle',
+    ),
+    # token bucket size / refill rate, per token and scope
+    'DEFAULT_THROTTLE_RATES': {
+        'read': os.environ.get('THROTTLE_READ_RATE', '600/min'),
+        'write': os.environ.get('THROTTLE_WRITE_RATE', '120/min'),
+        'login': os.environ.get('THROTTLE_LOGIN_RATE', '30/min'),
+    },
+}
+
+# Where the throttle buckets live: LocalMemoryBucketStore for a single
+# process, CacheBucketStore (uses THROTTLE_CACHE_ALIAS) for many.
+THROTTLE_STORE = os.environ.get(
+    'THROTTLE_STORE', 'core.throttling.LocalMemoryBucketStore'
+)
+THROTTLE_CACHE_ALIAS = 'default'
+
+# Responses smaller than this (in bytes) aren't compressed.
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 512))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+# How long rendered list responses stay in the cache (seconds).
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 300))
+
+# Warm the URL resolver and the serializers while booting, and let the
+# entrypoint replace wait_for_db + migrate with the fast_boot command.
+FAST_BOOT = os.environ.get('DJANGO_FAST_BOOT') == '1'
+
+# Widths (in pixels) of the resized copies made of every recipe image, by
+# the recipe_image_variants job.
+RECIPE_IMAGE_WIDTHS = (160, 320, 640, 1280)
+
+# Background jobs (core.jobs), run with manage.py run_workers.
+JOB_MODULES = ['core.tasks']
+JOB_MAX_ATTEMPTS = 5
+# first retry delay in seconds, doubled after every failed attempt
+JOB_RETRY_DELAY = 10
+JOB_RETRY_MAX_DELAY = 3600
+# a job running for longer than this is considered lost and run again
+JOB_LEASE_SECONDS = 600
+JOB_POLL_INTERVAL = 1.0
+
+# Auth tokens expire after this many days without being used. Tokens used
+# in the second half of their life are renewed for another full lifetime.
+AUTH_TOKEN_LIFETIME_DAYS = int(os.environ.get('AUTH_TOKEN_LIFETIME_DAYS', 30))
+
+# Password hashing. PBKDF2 iterations tuned for the production hardware with
+# manage.py calibrate_hasher; other hashers are only kept to check old hashes.
+PASSWORD_HASHERS = [
+    'core.hashers.CalibratedPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+PASSWORD_HASH_ITERATIONS = int(
+    os.environ.get('PASSWORD_HASH_ITERATIONS', 120000)
+)
+# At most this many passwords are hashed at the same time per process, a
+# login waiting longer than the timeout (seconds) for its turn gets a 503.
+LOGIN_HASH_CONCURRENCY = int(os.environ.get('LOGIN_HASH_CONCURRENCY', 2))
+LOGIN_HASH_QUEUE_TIMEOUT = float(
+    os.environ.get('LOGIN_HASH_QUEUE_TIMEOUT', 2)
+)
+# After this many failed logins an email has to wait 1, 2, 4... seconds (up
+# to the max delay) between attempts. Failures are forgotten after the
+# window (seconds) or on a successful login.
+LOGIN_BACKOFF_FREE_ATTEMPTS = 5
+LOGIN_BACKOFF_MAX_DELAY = 300
+LOGIN_BACKOFF_WINDOW = 3600
+
+# Change feed (core.changes): entries returned per request, and how long
+# tombstones are kept before clients behind them have to sync from scratch.
+CHANGE_FEED_PAGE_SIZE = 500
+CHANGE_FEED_RETENTION_DAYS = int(
+    os.environ.get('CHANGE_FEED_RETENTION_DAYS', 30)
+)
+
+# Most requests one /api/batch/ request can run.
+BATCH_MAX_REQUESTS = 20
+
+# In-process inverted index of the recipes' tags and ingredients, used for
+# the ?tags= and ?ingredients= filters (see core.recipe_index). Every
+# process keeps its own copy for up to RECIPE_INDEX_MAX_USERS users.
+RECIPE_INDEX_ENABLED = os.environ.get('RECIPE_INDEX_ENABLED') == '1'
+RECIPE_INDEX_MAX_USERS = int(os.environ.get('RECIPE_INDEX_MAX_USERS', 1000))
+# Above this many matching recipes the filters join the link tables instead
+# of sending the ids to the database.
+RECIPE_INDEX_MAX_IDS = int(os.environ.get('RECIPE_INDEX_MAX_IDS', 500))
+
+# Names returned by the tag and ingredient autocomplete, and how long
+# (seconds) the results stay cached.
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_CACHE_TIMEOUT = 30
+
+# Rankings of the public recipes (see core.rankings), recomputed by the
+# refresh_rankings command: recipes per ranking, and how the trending
+# score weighs the activity of the last days.
+RANKING_SIZE = 100
+TRENDING_WINDOW_DAYS = 7
+TRENDING_HALF_LIFE_DAYS = 2
+TRENDING_SAVE_WEIGHT = 5
+
+# Seconds the recipe views are buffered in memory before they are written
+# (see core.counters), 0 writes every view right away.
+VIEW_COUNTER_FLUSH_INTERVAL = float(
+    os.environ.get('VIEW_COUNTER_FLUSH_INTERVAL', 10)
+)
+if sys.argv[1:2] == ['test']:
+    # a flush thread would write the views into whichever test runs next
+    VIEW_COUNTER_FLUSH_INTERVAL = 0
+
+# How long (seconds) the response of a create request sent with an
+# Idempotency-Key header is kept for replaying retries (core.idempotency).
+IDEMPOTENCY_KEY_TTL = int(os.environ.get('IDEMPOTENCY_KEY_TTL', 24 * 3600))
+
+# Request profiling (core.middleware.ProfilingMiddleware), off unless one
+# of these is set: the fraction of requests to profile, a regex of the
+# paths to profile, and a secret clients send in X-Profile to get profiled.
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+PROFILE_PATH_PATTERN = os.environ.get('PROFILE_PATH_PATTERN', '')
+PROFILE_HEADER_SECRET = os.environ.get('PROFILE_HEADER_SECRET', '')
+# where the profiles go, only the newest PROFILE_MAX_FILES are kept
+PROFILE_DIR = os.environ.get('PROFILE_DIR', '/tmp/profiles')
+PROFILE_MAX_FILES = int(os.environ.get('PROFILE_MAX_FILES', 500))
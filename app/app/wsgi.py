@@ -14,3 +14,11 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
 application = get_wsgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if settings.FAST_BOOT:
+    # build the lazy caches before the first request (and before gunicorn
+    # forks the workers when the app is preloaded)
+    from core.warmup import warm_up
+    warm_up()
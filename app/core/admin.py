@@ -1,6 +1,12 @@
+from django.conf import settings
 from django.contrib import admin
 # import default user admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models.functions import Lower
+from django.utils.functional import cached_property
+from django.utils.html import format_html
 
 # import our models from core app
 from core import models
@@ -8,10 +14,123 @@ from core import models
 from django.utils.translation import gettext as _
 
 
-class UserAdmin(BaseUserAdmin):
+class EstimatedCountPaginator(Paginator):
+    """Paginator that doesn't run COUNT(*) over big unfiltered tables
+
+    On PostgreSQL the planner's row estimate is used instead when the
+    changelist isn't filtered and the table is bigger than
+    ADMIN_EXACT_COUNT_LIMIT rows.
+    """
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            estimate = self._estimated_count()
+            if estimate > settings.ADMIN_EXACT_COUNT_LIMIT:
+                return estimate
+        return super().count
+
+    def _estimated_count(self):
+        """Return the planner's estimate of the table size, if we have one"""
+        connection = connections[self.object_list.db]
+        if connection.vendor != 'postgresql':
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE relname = %s',
+                [self.object_list.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        return int(row[0]) if row else 0
+
+
+class OwnerFilter(admin.SimpleListFilter):
+    """Filter user owned objects by their owner
+
+    Listing every user as a choice doesn't scale, so the filter only shows
+    up once a user is picked (by clicking the owner in the changelist).
+    """
+    title = _('owner')
+    parameter_name = 'user'
+
+    def lookups(self, request, model_admin):
+        if not (self.value() or '').isdigit():
+            return ()
+        email = models.User.objects.filter(
+            pk=self.value()
+        ).values_list('email', flat=True).first()
+        return ((self.value(), email or self.value()),)
+
+    def queryset(self, request, queryset):
+        if (self.value() or '').isdigit():
+            return queryset.filter(user_id=self.value())
+        return queryset
+
+
+def email_candidates(term):
+    """Return the ways an email typed in a search can be stored
+
+    Emails are stored as they were given, with the domain lowercased.
+    """
+    local, _, domain = term.rpartition('@')
+    return {term, term.lower(), '%s@%s' % (local, domain.lower())}
+
+
+class IndexedSearchMixin:
+    """Search with lookups the indexes cover
+
+    The admin's own ``=`` and ``^`` searches compare UPPER(column), which
+    no index covers. Here terms with an @ match ``email_field`` exactly
+    (the unique email index), the others the start of the lowercased
+    ``name_field`` (the lower(name) indexes, Postgres only).
+    """
+    email_field = None
+    name_field = None
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        if '@' in term and self.email_field:
+            return queryset.filter(**{
+                self.email_field + '__in': email_candidates(term)
+            }), False
+        if self.name_field:
+            return queryset.annotate(
+                lower_name=Lower(self.name_field)
+            ).filter(lower_name__startswith=term.lower()), False
+        return queryset.none(), False
+
+
+class ScalableModelAdmin(admin.ModelAdmin):
+    """Base admin for the big user owned tables"""
+    paginator = EstimatedCountPaginator
+    # don't count the whole table again next to the filtered count
+    show_full_result_count = False
+    list_select_related = ('user',)
+    list_filter = (OwnerFilter,)
+    raw_id_fields = ('user',)
+    ordering = ('-id',)
+
+    def owner(self, obj):
+        """Owner email linking to the objects of that owner"""
+        return format_html(
+            '<a href="?{}={}">{}</a>',
+            OwnerFilter.parameter_name, obj.user_id, obj.user.email
+        )
+    owner.short_description = _('owner')
+
+
+class UserAdmin(IndexedSearchMixin, BaseUserAdmin):
     # display the list withh email and name ordered by it's id
     ordering = ['id']
     list_display = ['email', 'name']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    # searched by exact email, see IndexedSearchMixin
+    search_fields = ('email',)
+    email_field = 'email'
     # filed sets : Fields that we want to get displayed in admin page
     fieldsets = (
         (None, {
@@ -35,8 +154,54 @@ class UserAdmin(BaseUserAdmin):
     )
 
 
+class TagAdmin(IndexedSearchMixin, ScalableModelAdmin):
+    list_display = ('name', 'owner')
+    # searched by the recipe form autocomplete as well, by name prefix or
+    # the owner's email, see IndexedSearchMixin
+    search_fields = ('name', 'user__email')
+    email_field = 'user__email'
+    name_field = 'name'
+
+
+class IngredientAdmin(IndexedSearchMixin, ScalableModelAdmin):
+    list_display = ('name', 'owner')
+    search_fields = ('name', 'user__email')
+    email_field = 'user__email'
+    name_field = 'name'
+
+
+class RecipeIngredientInline(admin.TabularInline):
+    model = models.RecipeIngredient
+    autocomplete_fields = ('ingredient',)
+    extra = 1
+
+
+class RecipeAdmin(IndexedSearchMixin, ScalableModelAdmin):
+    list_display = ('title', 'owner', 'time_minutes', 'price')
+    # searched by the owner's email, see IndexedSearchMixin
+    search_fields = ('user__email',)
+    email_field = 'user__email'
+    # don't render every tag and ingredient of every user in the form
+    autocomplete_fields = ('tags',)
+    inlines = (RecipeIngredientInline,)
+
+    def save_formset(self, request, form, formset, change):
+        """Save the ingredients with set_ingredients, which sends signals"""
+        if formset.model is not models.RecipeIngredient:
+            return super().save_formset(request, form, formset, change)
+        # only collects the changes, for the admin history
+        formset.save(commit=False)
+        amounts = {}
+        for data in formset.cleaned_data:
+            if data and not data.get('DELETE'):
+                amounts[data['ingredient'].pk] = (
+                    data.get('quantity'), data.get('unit', '')
+                )
+        form.instance.set_ingredients(amounts)
+
+
 # register our custom user to the admin app
 admin.site.register(models.User, UserAdmin)
-admin.site.register(models.Tag)
-admin.site.register(models.Ingredient)
-admin.site.register(models.Recipe)
+admin.site.register(models.Tag, TagAdmin)
+admin.site.register(models.Ingredient, IngredientAdmin)
+admin.site.register(models.Recipe, RecipeAdmin)
@@ -0,0 +1,111 @@
+"""Per-user change feed for syncing clients.
+
+Every create, update and delete of a recipe, tag or ingredient (and every
+change of the tags and ingredients of a recipe) appends an entry to the
+``Change`` table of its owner. The entry ids only grow, so a client keeps
+the id of the last entry it has seen as its cursor and asks for the entries
+after it.
+
+Ids are handed out when the entries are inserted, not when they commit, so
+a transaction could commit an entry below the cursor of a client that has
+already read past it. To rule that out the transactions recording changes
+of a user take turns (a Postgres advisory lock held until the commit):
+within one feed the entries commit in id order.
+
+Entries only say *what* changed, the feed sends the current state of the
+object along. So once an object has a newer entry the older ones are useless,
+and compaction drops them. Tombstones (delete entries) are dropped after
+CHANGE_FEED_RETENTION_DAYS; the user's ``ChangeHorizon`` then remembers the
+newest one dropped, and clients synced up to an older entry are told to
+download everything again.
+
+Deleting a tag or an ingredient also removes it from the recipes, without
+a separate entry per recipe.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import Exists, Max, OuterRef
+from django.utils import timezone
+
+from core.models import Change, ChangeHorizon
+from core import locks, purge
+
+
+def record(user_id, model, object_ids, op=Change.UPSERT):
+    """Append an entry per object to the feed of the user"""
+    using = router.db_for_write(Change)
+    # the lock has to be held until the entries commit
+    with transaction.atomic(using=using, savepoint=False):
+        locks.transaction_lock(locks.CHANGE_FEED, user_id, using)
+        Change.objects.using(using).bulk_create([
+            Change(user_id=user_id, model=model, object_id=object_id, op=op)
+            for object_id in object_ids
+        ])
+
+
+def latest_seq(user_id):
+    """Return the id of the newest entry of the user, 0 if there is none"""
+    last = Change.objects.filter(user_id=user_id).order_by('-id').first()
+    return last.id if last else 0
+
+
+def get_horizon(user_id):
+    horizon = ChangeHorizon.objects.filter(user_id=user_id).first()
+    return horizon.seq if horizon else 0
+
+
+def changes_since(user_id, since, limit):
+    """Return the entries after ``since``, the new cursor and if there's more
+
+    Only the newest entry of every object is returned.
+    """
+    rows = list(
+        Change.objects.filter(user_id=user_id, id__gt=since)
+        .order_by('id')[:limit + 1]
+    )
+    more = len(rows) > limit
+    rows = rows[:limit]
+    cursor = rows[-1].id if rows else since
+
+    latest = {}
+    for row in rows:
+        key = (row.model, row.object_id)
+        latest.pop(key, None)
+        latest[key] = row
+    return list(latest.values()), cursor, more
+
+
+def compact(chunk_size=None, retention_days=None):
+    """Drop the superseded entries and the expired tombstones
+
+    Returns the number of entries dropped.
+    """
+    if retention_days is None:
+        retention_days = settings.CHANGE_FEED_RETENTION_DAYS
+
+    newer = Change.objects.filter(
+        user_id=OuterRef('user_id'),
+        model=OuterRef('model'),
+        object_id=OuterRef('object_id'),
+        id__gt=OuterRef('id'),
+    )
+    dropped = purge.delete_in_chunks(
+        Change.objects.annotate(superseded=Exists(newer))
+        .filter(superseded=True),
+        chunk_size
+    )
+
+    # move the horizons before dropping the tombstones, so no client can
+    # miss a delete in between
+    expired = Change.objects.filter(
+        op=Change.DELETE,
+        created__lt=timezone.now() - timedelta(days=retention_days)
+    )
+    horizons = expired.order_by().values('user_id').annotate(seq=Max('id'))
+    for horizon in horizons:
+        ChangeHorizon.objects.update_or_create(
+            user_id=horizon['user_id'], defaults={'seq': horizon['seq']}
+        )
+    return dropped + purge.delete_in_chunks(expired, chunk_size)
@@ -0,0 +1,51 @@
+"""Content negotiated gzip (and brotli, when installed) compression."""
+import gzip
+
+from django.conf import settings
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+
+def available_encodings():
+    """Return the encodings we can produce, best first"""
+    if brotli is not None:
+        return ('br', 'gzip')
+    return ('gzip',)
+
+
+def negotiate(accept_encoding):
+    """Return the best encoding allowed by an Accept-Encoding header"""
+    accepted = {}
+    for part in accept_encoding.split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+
+    for encoding in available_encodings():
+        quality = accepted.get(encoding, accepted.get('*', 0))
+        if quality > 0:
+            return encoding
+    return None
+
+
+def compress(content, encoding):
+    """Compress the bytes with the given encoding"""
+    if encoding == 'br':
+        return brotli.compress(content, quality=settings.BROTLI_QUALITY)
+    return gzip.compress(content, compresslevel=settings.GZIP_LEVEL)
+
+
+def should_compress(response):
+    """Check if the response is worth compressing"""
+    return (not response.streaming and
+            not response.has_header('Content-Encoding') and
+            len(response.content) >= settings.COMPRESSION_MIN_SIZE)
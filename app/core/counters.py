@@ -0,0 +1,134 @@
+"""Write-behind counters for the recipe views.
+
+Counting a view with an UPDATE per request doubles the writes of the
+detail endpoint, and popular recipes turn into hot rows every request waits
+on. Instead every process adds the views up in memory and a background
+thread writes them every VIEW_COUNTER_FLUSH_INTERVAL seconds, with one
+``UPDATE ... SET views = views + delta`` per day and delta.
+
+The buffer is also flushed when the process exits (atexit, and the
+gunicorn ``worker_exit`` hook), so a restart loses at most the views of
+one interval when the process is killed outright. With an interval of 0
+every view is written right away.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.models import Recipe, RecipeActivity
+from core import rankings
+
+
+logger = logging.getLogger(__name__)
+
+
+def write_views(counts):
+    """Add the views in ``{(recipe_id, day): views}`` to the activity rows"""
+    by_day = defaultdict(dict)
+    for (recipe_id, day), views in counts.items():
+        by_day[day][recipe_id] = views
+
+    for day, views in by_day.items():
+        existing = set(
+            RecipeActivity.objects.filter(day=day, recipe_id__in=views)
+            .values_list('recipe_id', flat=True)
+        )
+        # recipes deleted since their views were counted are skipped
+        new = set(
+            Recipe.objects.filter(id__in=set(views) - existing)
+            .values_list('id', flat=True)
+        )
+        if new:
+            try:
+                with transaction.atomic():
+                    RecipeActivity.objects.bulk_create(
+                        RecipeActivity(recipe_id=recipe_id, day=day,
+                                       views=views[recipe_id])
+                        for recipe_id in new
+                    )
+            except IntegrityError:
+                # some were created in between, one at a time then
+                for recipe_id in new:
+                    rankings.record_activity(
+                        recipe_id, views=views[recipe_id], day=day
+                    )
+
+        by_delta = defaultdict(list)
+        for recipe_id in existing:
+            by_delta[views[recipe_id]].append(recipe_id)
+        for delta, recipe_ids in by_delta.items():
+            RecipeActivity.objects.filter(
+                day=day, recipe_id__in=recipe_ids
+            ).update(views=F('views') + delta)
+
+
+class ViewCounter:
+    """Buffer of the views counted by this process"""
+
+    def __init__(self):
+        self._counts = defaultdict(int)
+        self._lock = threading.Lock()
+        self._flushing = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def add(self, recipe_id, views=1):
+        interval = settings.VIEW_COUNTER_FLUSH_INTERVAL
+        key = (recipe_id, timezone.now().date())
+        if interval <= 0:
+            write_views({key: views})
+            return
+
+        with self._lock:
+            if self._pid != os.getpid():
+                # a forked worker, the thread of the parent isn't running
+                self._counts.clear()
+                self._pid = os.getpid()
+                self._start_thread(interval)
+            self._counts[key] += views
+
+    def pending(self):
+        with self._lock:
+            return dict(self._counts)
+
+    def flush(self):
+        """Write the buffered views, return the number of rows touched"""
+        with self._flushing:
+            with self._lock:
+                counts, self._counts = self._counts, defaultdict(int)
+            if not counts:
+                return 0
+            try:
+                write_views(counts)
+            except Exception:
+                # keep them for the next flush
+                logger.exception('Writing %d view counts failed', len(counts))
+                with self._lock:
+                    for key, views in counts.items():
+                        self._counts[key] += views
+                return 0
+            return len(counts)
+
+    def _start_thread(self, interval):
+        self._thread = threading.Thread(
+            target=self._run, args=(interval,), daemon=True
+        )
+        self._thread.start()
+
+    def _run(self, interval):
+        while True:
+            time.sleep(interval)
+            close_old_connections()
+            self.flush()
+
+
+views = ViewCounter()
+atexit.register(views.flush)
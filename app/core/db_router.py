@@ -0,0 +1,87 @@
+"""Send reads to the replica databases, writes to the primary.
+
+Reads only go to a replica after ``set_use_replica(True)`` or inside
+``use_replica()`` blocks; the ``ReplicaRoutingMiddleware`` turns it on for
+safe requests. Everything else,
+including management commands and migrations, uses the primary.
+
+Clients that just wrote something are pinned to the primary for
+REPLICA_PIN_SECONDS, see ``pin()``.
+"""
+import hashlib
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+PRIMARY = 'default'
+
+PIN_KEY_FORMAT = 'replica_pin_%s'
+
+_state = threading.local()
+
+
+def set_use_replica(enabled):
+    """Route the reads of this thread to a replica (or stop doing so)"""
+    _state.use_replica = enabled
+
+
+@contextmanager
+def use_replica(enabled=True):
+    """Route the reads made in this block to a replica"""
+    previous = getattr(_state, 'use_replica', False)
+    set_use_replica(enabled)
+    try:
+        yield
+    finally:
+        set_use_replica(previous)
+
+
+def user_client(user_id):
+    return 'user_%s' % user_id
+
+
+def address_client(address):
+    return 'address_' + hashlib.sha1(address.encode()).hexdigest()
+
+
+def pin(client):
+    """Read from the primary for the next requests of the client"""
+    cache.set(PIN_KEY_FORMAT % client, True, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(client):
+    return bool(cache.get(PIN_KEY_FORMAT % client))
+
+
+def route_user(user_id):
+    """Stop reading from a replica if the user of the request is pinned
+
+    Called once the request is authenticated, before the view reads.
+    """
+    if getattr(_state, 'use_replica', False) and is_pinned(
+            user_client(user_id)):
+        set_use_replica(False)
+
+
+class PrimaryReplicaRouter:
+    """Database router for one primary and any number of replicas"""
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if replicas and getattr(_state, 'use_replica', False):
+            return random.choice(replicas)
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # the replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class CalibratedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2 with the work factor from PASSWORD_HASH_ITERATIONS
+
+    Pick the value with ``manage.py calibrate_hasher``. Passwords hashed
+    with another number of iterations still work, and are hashed again
+    with the new one on the next login.
+    """
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_HASH_ITERATIONS
@@ -0,0 +1,105 @@
+"""Keep password hashing from starving the rest of the API.
+
+Every login and sign up runs a deliberately slow password hash. A burst of
+them would keep every worker thread busy hashing, so:
+
+* at most LOGIN_HASH_CONCURRENCY hashes run at once per process; requests
+  waiting longer than LOGIN_HASH_QUEUE_TIMEOUT for a slot get a 503.
+* an email with failed logins has to wait longer and longer before the
+  next attempt is even hashed (429 until then).
+"""
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions, status
+
+
+class HashingBusy(exceptions.APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _('Too many logins in progress, try again shortly.')
+    default_code = 'hashing_busy'
+    wait = 1
+
+
+class HashingGate:
+    """Cap the number of password hashes running at the same time"""
+
+    def __init__(self, limit, timeout):
+        self.timeout = timeout
+        self._semaphore = threading.BoundedSemaphore(limit)
+
+    @contextmanager
+    def slot(self):
+        """Wait (up to the timeout) for a free slot and hold it"""
+        if not self._semaphore.acquire(timeout=self.timeout):
+            raise HashingBusy()
+        try:
+            yield
+        finally:
+            self._semaphore.release()
+
+
+_gate = None
+_gate_lock = threading.Lock()
+
+
+def get_gate():
+    global _gate
+    if _gate is None:
+        with _gate_lock:
+            if _gate is None:
+                _gate = HashingGate(
+                    settings.LOGIN_HASH_CONCURRENCY,
+                    settings.LOGIN_HASH_QUEUE_TIMEOUT
+                )
+    return _gate
+
+
+def run_hashing(func, *args, **kwargs):
+    """Call a function that hashes a password within the concurrency cap"""
+    with get_gate().slot():
+        return func(*args, **kwargs)
+
+
+def _failures_key(email):
+    digest = hashlib.sha1(email.strip().lower().encode()).hexdigest()
+    return 'login_failures_%s' % digest
+
+
+def backoff_delay(failures):
+    """Return the seconds to wait after the given number of failures"""
+    if failures < settings.LOGIN_BACKOFF_FREE_ATTEMPTS:
+        return 0
+    return min(
+        2 ** (failures - settings.LOGIN_BACKOFF_FREE_ATTEMPTS),
+        settings.LOGIN_BACKOFF_MAX_DELAY
+    )
+
+
+def check_login_backoff(email):
+    """Raise Throttled if the email has to wait before its next login
+
+    Returns the number of recent failures (0 when there are none).
+    """
+    failures, last_failure = cache.get(_failures_key(email), (0, 0))
+    wait = last_failure + backoff_delay(failures) - time.time()
+    if wait > 0:
+        raise exceptions.Throttled(wait=wait)
+    return failures
+
+
+def record_login_failure(email):
+    failures, _ = cache.get(_failures_key(email), (0, 0))
+    cache.set(
+        _failures_key(email), (failures + 1, time.time()),
+        settings.LOGIN_BACKOFF_WINDOW
+    )
+
+
+def reset_login_failures(email):
+    cache.delete(_failures_key(email))
@@ -0,0 +1,94 @@
+"""Idempotency keys for the create endpoints.
+
+Clients retrying a POST after a timeout can't tell if the first attempt
+created the object. With an ``Idempotency-Key`` header (any unique string
+per create, e.g. a UUID) the response of the first successful attempt is
+stored next to the key, and retries with the same key get it back without
+creating anything, for IDEMPOTENCY_KEY_TTL seconds. A retry costs one
+lookup of the key.
+
+The key row is inserted in the same transaction as the object, so two
+attempts racing each other can't both create it: the second one waits on
+the unique index and replays the response of the first. Failed attempts
+store nothing, the client can fix the request and send it again with the
+same key. Reusing a key for a different request is an error.
+
+The ``prune_idempotency_keys`` command deletes the expired keys.
+"""
+import hashlib
+import json
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from core.models import IdempotencyKey
+
+
+HEADER = 'HTTP_IDEMPOTENCY_KEY'
+
+
+def fingerprint(request):
+    """Return a hash of the method, path and data of the request"""
+    data = json.dumps(request.data, cls=JSONEncoder, sort_keys=True)
+    return hashlib.sha256(
+        '|'.join([request.method, request.path, data]).encode()
+    ).hexdigest()
+
+
+def replay(stored, fingerprint):
+    """Return the stored response, if it was for the same request"""
+    if stored.fingerprint != fingerprint:
+        return Response(
+            {'detail': 'The Idempotency-Key was used for another request.'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    return Response(
+        json.loads(stored.response), status=stored.status_code,
+        headers={'Idempotent-Replayed': 'true'}
+    )
+
+
+class IdempotentCreateMixin:
+    """Replay the response of the create action for retried requests"""
+
+    def create(self, request, *args, **kwargs):
+        key = request.META.get(HEADER)
+        if key is None:
+            return super().create(request, *args, **kwargs)
+        if not key or len(key) > 255:
+            raise ValidationError({'Idempotency-Key': [
+                'Up to 255 characters are allowed.'
+            ]})
+
+        request_fingerprint = fingerprint(request)
+        keys = IdempotencyKey.objects.filter(user=request.user, key=key)
+        stored = keys.first()
+        if stored is not None:
+            if stored.expires > timezone.now():
+                return replay(stored, request_fingerprint)
+            keys.filter(pk=stored.pk).delete()
+
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    stored = IdempotencyKey.objects.create(
+                        user=request.user, key=key,
+                        fingerprint=request_fingerprint
+                    )
+            except IntegrityError:
+                # an attempt racing this one created the key first
+                return replay(keys.get(), request_fingerprint)
+
+            response = super().create(request, *args, **kwargs)
+            if not status.is_success(response.status_code):
+                # keep nothing, the client can fix the request
+                transaction.set_rollback(True)
+                return response
+            stored.status_code = response.status_code
+            stored.response = json.dumps(response.data, cls=JSONEncoder)
+            stored.save(update_fields=['status_code', 'response'])
+        return response
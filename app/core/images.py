@@ -0,0 +1,67 @@
+"""Resized variants of the recipe images.
+
+The variants are made by the ``recipe_image_variants`` background job (see
+core.tasks), never inside the request that uploaded the image.
+"""
+import json
+import os
+
+from django.core.files.storage import default_storage
+from PIL import Image
+
+from core.models import Recipe
+
+
+def variant_path(path, width):
+    """Return the path of the variant of the image with the given width"""
+    root, _ = os.path.splitext(path)
+    return '%s_%d.jpg' % (root, width)
+
+
+def generate_variants(path, widths, quality=85):
+    """Save a JPEG copy of the image for every width smaller than it
+
+    Returns the list of variants (the original image included), from the
+    smallest to the largest, as dictionaries with the width, height and
+    path of every image.
+    """
+    with Image.open(path) as image:
+        variants = [{
+            'width': image.width, 'height': image.height, 'path': path
+        }]
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        for width in sorted(set(widths)):
+            if width >= variants[0]['width']:
+                # never upscale
+                continue
+            height = max(round(image.height * width / image.width), 1)
+            resized = image.resize((width, height), Image.LANCZOS)
+            resized.save(variant_path(path, width), 'JPEG', quality=quality)
+            variants.append({
+                'width': width, 'height': height,
+                'path': variant_path(path, width),
+            })
+
+    return sorted(variants, key=lambda variant: variant['width'])
+
+
+def store_variants(recipe_id, image_name, variants):
+    """Save the variant metadata on the recipe, if its image didn't change"""
+    location = default_storage.path('')
+    for variant in variants:
+        variant['name'] = os.path.relpath(variant.pop('path'), location)
+    Recipe.objects.filter(id=recipe_id, image=image_name).update(
+        image_variants=json.dumps(variants)
+    )
+
+
+def pick_variant(variants, width):
+    """Return the smallest variant at least ``width`` pixels wide
+
+    Falls back to the largest variant when none is wide enough.
+    """
+    for variant in variants:
+        if variant['width'] >= width:
+            return variant
+    return variants[-1]
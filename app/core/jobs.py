@@ -0,0 +1,173 @@
+"""Database backed background jobs.
+
+Jobs are rows of the ``Job`` table. Workers (``manage.py run_workers``)
+claim them with ``SELECT ... FOR UPDATE SKIP LOCKED``, so any number of
+workers can poll the same table without waiting on each other, and no job
+is run twice at the same time. Failed jobs are retried with an exponential
+backoff until they run out of attempts.
+
+Job functions are registered with the ``job`` decorator::
+
+    @job('purge_user')
+    def purge_user_job(user_id):
+        ...
+
+and queued with ``enqueue('purge_user', user_id=1)``.
+"""
+import json
+import logging
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from importlib import import_module
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from core.models import Job
+
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+def job(name):
+    """Register the decorated function as the job with the given name"""
+    def register(func):
+        _registry[name] = func
+        return func
+    return register
+
+
+def get_job_function(name):
+    """Return the function of the job, loading the JOB_MODULES first"""
+    if name not in _registry:
+        for module in settings.JOB_MODULES:
+            import_module(module)
+    return _registry[name]
+
+
+def enqueue(name, user=None, run_at=None, **payload):
+    """Queue a job, the payload has to be JSON serializable"""
+    return Job.objects.create(
+        name=name,
+        user=user,
+        payload=json.dumps(payload),
+        run_at=run_at or timezone.now(),
+        max_attempts=settings.JOB_MAX_ATTEMPTS,
+    )
+
+
+def retry_delay(attempts):
+    """Return how long to wait before the next attempt"""
+    return min(
+        settings.JOB_RETRY_DELAY * 2 ** (attempts - 1),
+        settings.JOB_RETRY_MAX_DELAY
+    )
+
+
+def claim(limit):
+    """Claim up to ``limit`` jobs that are due, return them
+
+    Jobs left running past their lease (their worker died) are claimed
+    again.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        jobs = list(
+            Job.objects.select_for_update(skip_locked=True).filter(
+                Q(status=Job.QUEUED, run_at__lte=now) |
+                Q(status=Job.RUNNING, locked_until__lt=now)
+            ).order_by('run_at')[:limit]
+        )
+        if jobs:
+            Job.objects.filter(pk__in=[j.pk for j in jobs]).update(
+                status=Job.RUNNING,
+                attempts=F('attempts') + 1,
+                locked_until=now + timedelta(
+                    seconds=settings.JOB_LEASE_SECONDS
+                ),
+            )
+    for claimed in jobs:
+        claimed.status = Job.RUNNING
+        claimed.attempts += 1
+    return jobs
+
+
+def run_job(claimed):
+    """Run a claimed job and record how it went"""
+    try:
+        func = get_job_function(claimed.name)
+        result = func(**json.loads(claimed.payload))
+    except Exception:
+        error = traceback.format_exc()
+        logger.exception('Job %s failed', claimed)
+        if claimed.attempts < claimed.max_attempts:
+            # only the changed fields: the job may point to a purged user
+            Job.objects.filter(pk=claimed.pk).update(
+                status=Job.QUEUED,
+                locked_until=None,
+                last_error=error,
+                run_at=timezone.now() + timedelta(
+                    seconds=retry_delay(claimed.attempts)
+                ),
+                updated=timezone.now(),
+            )
+        else:
+            Job.objects.filter(pk=claimed.pk).update(
+                status=Job.FAILED, locked_until=None, last_error=error,
+                updated=timezone.now(),
+            )
+        return False
+
+    Job.objects.filter(pk=claimed.pk).update(
+        status=Job.DONE, locked_until=None,
+        result=json.dumps(result), updated=timezone.now(),
+    )
+    return True
+
+
+def _run_in_thread(claimed):
+    """Run the job in a pool thread, which owns its own connection"""
+    try:
+        return run_job(claimed)
+    finally:
+        connection.close()
+
+
+def run_worker(threads=1, batch_size=None, poll_interval=None, burst=False,
+               stop_event=None):
+    """Claim and run jobs until stopped
+
+    With ``burst`` the worker returns as soon as no job is due. Returns the
+    number of jobs run.
+    """
+    batch_size = batch_size or threads
+    poll_interval = poll_interval or settings.JOB_POLL_INTERVAL
+    stop_event = stop_event or threading.Event()
+    executor = ThreadPoolExecutor(threads) if threads > 1 else None
+    done = 0
+    try:
+        while not stop_event.is_set():
+            close_old_connections()
+            jobs = claim(batch_size)
+            if not jobs:
+                if burst:
+                    break
+                stop_event.wait(poll_interval)
+                continue
+
+            if executor is None:
+                for claimed in jobs:
+                    run_job(claimed)
+            else:
+                list(executor.map(_run_in_thread, jobs))
+            done += len(jobs)
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True)
+    return done
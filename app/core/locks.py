@@ -0,0 +1,25 @@
+"""Postgres advisory locks held until the end of the transaction.
+
+SQLite runs one write transaction at a time, so there the locks are no-ops.
+"""
+from django.db import connections
+
+
+# first key of the locks, the second one is up to the user of the lock:
+# the user id for the change feeds, 0 for the rankings
+CHANGE_FEED = 0x4348
+RANKINGS = 0x524b
+
+
+def transaction_lock(namespace, key, using='default'):
+    """Wait for the other transactions holding the lock, then take it
+
+    The lock is released when the transaction ends, so call it inside one.
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT pg_advisory_xact_lock(%s, %s)', [namespace, key]
+        )
@@ -0,0 +1,83 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core.management.utils import rolled_back
+from core.models import Ingredient, Recipe
+from recipe.cookable import rank_cookable
+
+
+class Command(BaseCommand):
+    """Django command to time the "what can I cook" ranking"""
+    help = ('Time the cookable ranking on a generated account, everything '
+            'is rolled back afterwards')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=50000)
+        parser.add_argument('--ingredients', type=int, default=500,
+                            help='Ingredients of the account')
+        parser.add_argument('--per-recipe', type=int, default=8,
+                            help='Ingredients per recipe')
+        parser.add_argument('--have', type=int, default=20,
+                            help='Ingredients the user has')
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--runs', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            self.run(options)
+
+    def run(self, options):
+        rng = random.Random(0)
+        user = get_user_model().objects.create_user(
+            'bench-cookable@example.com'
+        )
+        Ingredient.objects.bulk_create(
+            Ingredient(user=user, name='ingredient %d' % i)
+            for i in range(options['ingredients'])
+        )
+        ingredient_ids = list(
+            Ingredient.objects.filter(user=user).values_list('id', flat=True)
+        )
+        Recipe.objects.bulk_create((
+            Recipe(user=user, title='recipe %d' % i, time_minutes=10,
+                   price=5)
+            for i in range(options['recipes'])
+        ), batch_size=500)
+        recipe_ids = Recipe.objects.filter(user=user).values_list(
+            'id', flat=True
+        )
+        through = Recipe.ingredients.through
+        through.objects.bulk_create((
+            through(recipe_id=recipe_id, ingredient_id=ingredient_id)
+            for recipe_id in recipe_ids
+            for ingredient_id in rng.sample(
+                ingredient_ids, options['per_recipe']
+            )
+        ), batch_size=500)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE core_recipe_ingredients')
+
+        have = rng.sample(ingredient_ids, options['have'])
+        timings = []
+        for _ in range(options['runs']):
+            start = time.perf_counter()
+            ranked = rank_cookable(user, have, options['limit'])
+            timings.append((time.perf_counter() - start) * 1000)
+
+        timings.sort()
+        self.stdout.write(
+            '%d recipes, %d ingredients each, %d in the pantry' % (
+                options['recipes'], options['per_recipe'], options['have']
+            )
+        )
+        self.stdout.write(self.style.SUCCESS(
+            'cookable: best %.1f ms, median %.1f ms (top recipe misses %d)' % (
+                timings[0], timings[len(timings) // 2],
+                ranked[0]['missing'] if ranked else 0
+            )
+        ))
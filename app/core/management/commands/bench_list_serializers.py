@@ -0,0 +1,128 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from core.management.utils import rolled_back
+from core.models import Ingredient, Recipe, RecipeIngredient, Tag
+from recipe.rows import RecipeRowSerializer
+from recipe.serializers import RecipeSerializer
+
+
+class Command(BaseCommand):
+    """Django command to time the recipe list serialization"""
+    help = ('Time serializing a recipe list with RecipeSerializer and with '
+            'the row fast path, everything is rolled back afterwards')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument('--tags', type=int, default=3,
+                            help='Tags per recipe')
+        parser.add_argument('--ingredients', type=int, default=8,
+                            help='Ingredients per recipe')
+        parser.add_argument('--runs', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            self.run(options)
+
+    def time(self, func, runs):
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            content = func()
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        return timings[0], timings[len(timings) // 2], content
+
+    def run(self, options):
+        rng = random.Random(0)
+        user = get_user_model().objects.create_user(
+            'bench-lists@example.com'
+        )
+        Tag.objects.bulk_create(
+            Tag(user=user, name='tag %d' % i) for i in range(20)
+        )
+        Ingredient.objects.bulk_create(
+            Ingredient(user=user, name='ingredient %d' % i)
+            for i in range(100)
+        )
+        tag_ids = list(
+            Tag.objects.filter(user=user).values_list('id', flat=True)
+        )
+        ingredient_ids = list(
+            Ingredient.objects.filter(user=user).values_list('id', flat=True)
+        )
+        Recipe.objects.bulk_create((
+            Recipe(user=user, title='recipe %d' % i, time_minutes=10,
+                   price=5, link='https://example.com/%d' % i)
+            for i in range(options['recipes'])
+        ), batch_size=500)
+        recipe_ids = list(
+            Recipe.objects.filter(user=user).values_list('id', flat=True)
+        )
+        Recipe.tags.through.objects.bulk_create((
+            Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id in recipe_ids
+            for tag_id in rng.sample(tag_ids, options['tags'])
+        ), batch_size=500)
+        RecipeIngredient.objects.bulk_create((
+            RecipeIngredient(recipe_id=recipe_id, ingredient_id=ingredient_id,
+                             quantity=rng.randint(1, 500), unit='g')
+            for recipe_id in recipe_ids
+            for ingredient_id in rng.sample(
+                ingredient_ids, options['ingredients']
+            )
+        ), batch_size=500)
+
+        queryset = Recipe.objects.filter(user=user).order_by('-id')
+        renderer = JSONRenderer()
+        row_serializer = RecipeRowSerializer()
+
+        def serializers():
+            return renderer.render(
+                RecipeSerializer(queryset.all(), many=True).data
+            )
+
+        def prefetched():
+            # only the CPU cost of the serializers, without the queries per
+            # recipe
+            return renderer.render(RecipeSerializer(
+                queryset.prefetch_related(
+                    'tags', 'ingredients', 'recipe_ingredients'
+                ), many=True
+            ).data)
+
+        def rows():
+            return renderer.render(row_serializer.serialize(
+                queryset.values(*row_serializer.columns)
+            ))
+
+        slow = self.time(serializers, options['runs'])
+        slow_prefetched = self.time(prefetched, options['runs'])
+        fast = self.time(rows, options['runs'])
+        if not slow[2] == slow_prefetched[2] == fast[2]:
+            raise CommandError('The paths rendered different JSON')
+
+        self.stdout.write('%d recipes, %d tags and %d ingredients each' % (
+            options['recipes'], options['tags'], options['ingredients']
+        ))
+        self.stdout.write('serializers: best %.1f ms, median %.1f ms' % (
+            slow[0], slow[1]
+        ))
+        self.stdout.write(
+            'serializers, prefetched: best %.1f ms, median %.1f ms' % (
+                slow_prefetched[0], slow_prefetched[1]
+            )
+        )
+        self.stdout.write('rows: best %.1f ms, median %.1f ms' % (
+            fast[0], fast[1]
+        ))
+        self.stdout.write(self.style.SUCCESS(
+            'rows are %.1fx faster (%.1fx prefetched), same %d bytes of '
+            'JSON' % (
+                slow[0] / fast[0], slow_prefetched[0] / fast[0], len(fast[2])
+            )
+        ))
@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.hashers import CalibratedPBKDF2PasswordHasher
+
+
+class Hasher(CalibratedPBKDF2PasswordHasher):
+    iterations = None
+
+
+class Command(BaseCommand):
+    """Django command to pick the password hashing work factor"""
+    help = ('Find the PBKDF2 iterations giving the target login latency '
+            'on this machine')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target-ms', type=float, default=250,
+            help='Time one password hash should take (default: 250 ms)'
+        )
+        parser.add_argument(
+            '--samples', type=int, default=3,
+            help='Hashes timed per measurement, the fastest counts'
+        )
+
+    def measure(self, iterations, samples):
+        """Return the fastest time of a hash with the iterations (in ms)"""
+        hasher = Hasher()
+        hasher.iterations = iterations
+        salt = hasher.salt()
+        timings = []
+        for _ in range(samples):
+            start = time.perf_counter()
+            hasher.encode('calibration password', salt)
+            timings.append((time.perf_counter() - start) * 1000)
+        return min(timings)
+
+    def handle(self, *args, **options):
+        target = options['target_ms']
+        if target <= 0:
+            raise CommandError('--target-ms must be positive')
+
+        # the hash time grows linearly with the iterations
+        iterations = 10000
+        elapsed = self.measure(iterations, options['samples'])
+        for _ in range(3):
+            iterations = max(int(iterations * target / elapsed), 1000)
+            elapsed = self.measure(iterations, options['samples'])
+
+        iterations = iterations // 1000 * 1000
+        self.stdout.write('%d iterations take %.1f ms' % (
+            iterations, self.measure(iterations, options['samples'])
+        ))
+        self.stdout.write(self.style.SUCCESS(
+            'Set PASSWORD_HASH_ITERATIONS=%d' % iterations
+        ))
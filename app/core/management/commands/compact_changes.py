@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from core import changes
+
+
+class Command(BaseCommand):
+    """Django command to keep the change feed table small"""
+    help = ('Drop superseded change feed entries and tombstones older than '
+            'the retention period')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=None,
+            help='Rows deleted per transaction (default: PURGE_CHUNK_SIZE)'
+        )
+        parser.add_argument(
+            '--retention-days', type=int, default=None,
+            help='Keep tombstones this long '
+                 '(default: CHANGE_FEED_RETENTION_DAYS)'
+        )
+
+    def handle(self, *args, **options):
+        dropped = changes.compact(
+            options['chunk_size'], options['retention_days']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            'Dropped %d change feed entries' % dropped
+        ))
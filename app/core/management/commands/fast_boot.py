@@ -0,0 +1,26 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.migrations.executor import MigrationExecutor
+
+
+class Command(BaseCommand):
+    """Django command to get the database ready in a single process
+
+    Replaces running ``wait_for_db`` and ``migrate`` one after the other:
+    Django is only loaded once, the system checks are skipped and the
+    migrations only run when some are pending.
+    """
+    help = 'Wait for the database and apply pending migrations, if any'
+    requires_system_checks = False
+
+    def handle(self, *args, **options):
+        call_command('wait_for_db', stdout=self.stdout)
+
+        executor = MigrationExecutor(connections['default'])
+        plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+        if not plan:
+            self.stdout.write(self.style.SUCCESS('No migrations to apply'))
+            return
+
+        call_command('migrate', interactive=False, stdout=self.stdout)
@@ -0,0 +1,118 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Runs in a fresh interpreter, so nothing is imported or cached yet.
+PHASES_SCRIPT = '''
+import json, time
+clock = time.perf_counter
+phases = []
+
+def phase(name, func):
+    start = clock()
+    try:
+        func()
+        error = None
+    except Exception as e:
+        error = repr(e)
+    phases.append([name, (clock() - start) * 1000, error])
+
+def load_settings():
+    from django.conf import settings
+    settings.INSTALLED_APPS
+
+def setup():
+    import django
+    django.setup()
+
+def urls():
+    from django.urls import get_resolver
+    get_resolver().reverse_dict
+
+def checks():
+    from django.core import checks
+    checks.run_checks()
+
+def migration_plan():
+    from django.db import connections
+    from django.db.migrations.executor import MigrationExecutor
+    executor = MigrationExecutor(connections['default'])
+    executor.migration_plan(executor.loader.graph.leaf_nodes())
+
+def warm_up():
+    from core.warmup import warm_up
+    warm_up()
+
+phase('settings', load_settings)
+phase('app registry', setup)
+phase('url resolution', urls)
+phase('system checks', checks)
+phase('migration plan check', migration_plan)
+phase('warm up (fast boot)', warm_up)
+print(json.dumps(phases))
+'''
+
+
+def parse_importtime(output):
+    """Parse the ``-X importtime`` output into (module, self, cumulative)
+
+    Times are in milliseconds.
+    """
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        try:
+            self_us, cumulative_us = int(fields[0]), int(fields[1])
+        except (ValueError, IndexError):
+            # the header line
+            continue
+        modules.append(
+            (fields[2].strip(), self_us / 1000.0, cumulative_us / 1000.0)
+        )
+    return modules
+
+
+class Command(BaseCommand):
+    """Django command to report where the startup time of the app goes"""
+    help = 'Report per module import times and per phase startup timings'
+    requires_system_checks = False
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top', type=int, default=20,
+            help='Number of modules to show (default: 20)'
+        )
+
+    def handle(self, *args, **options):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', PHASES_SCRIPT],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            universal_newlines=True, env=dict(os.environ),
+            cwd=os.getcwd()
+        )
+        if result.returncode != 0:
+            raise CommandError(result.stderr[-2000:])
+
+        self.stdout.write('Phases:')
+        total = 0
+        for name, elapsed, error in json.loads(result.stdout):
+            total += elapsed
+            line = '  %-24s %9.1f ms' % (name, elapsed)
+            if error:
+                line += '  (failed: %s)' % error
+            self.stdout.write(line)
+        self.stdout.write('  %-24s %9.1f ms' % ('total', total))
+
+        modules = parse_importtime(result.stderr)
+        self.stdout.write('\nSlowest imports (self time):')
+        for module, self_ms, cumulative_ms in sorted(
+                modules, key=lambda m: m[1], reverse=True)[:options['top']]:
+            self.stdout.write('  %-50s %8.1f ms  (cumulative %.1f ms)' % (
+                module, self_ms, cumulative_ms
+            ))
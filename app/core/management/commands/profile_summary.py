@@ -0,0 +1,90 @@
+import os
+import pstats
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.middleware import parse_profile_file_name
+
+
+SORT_KEYS = {
+    # index in the pstats entries: (primitive calls, total calls, own
+    # time, cumulative time, callers)
+    'cumulative': 3,
+    'own': 2,
+}
+
+
+class Command(BaseCommand):
+    """Django command to summarize the profiles of ProfilingMiddleware"""
+    help = 'Show the functions taking the most time per route, over the ' \
+           'captured request profiles'
+    requires_system_checks = False
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dir', default=None,
+            help='Directory of the profiles (default: PROFILE_DIR)'
+        )
+        parser.add_argument(
+            '--route', default=None,
+            help='Only this route, e.g. recipe.recipe-list'
+        )
+        parser.add_argument(
+            '--top', type=int, default=15,
+            help='Number of functions to show per route (default: 15)'
+        )
+        parser.add_argument(
+            '--sort', choices=sorted(SORT_KEYS), default='cumulative',
+            help='Rank the functions by cumulative or own time'
+        )
+
+    def handle(self, *args, **options):
+        directory = options['dir'] or settings.PROFILE_DIR
+        if not os.path.isdir(directory):
+            raise CommandError('No profiles in %s' % directory)
+
+        routes = defaultdict(list)
+        for name in sorted(os.listdir(directory)):
+            parsed = parse_profile_file_name(name)
+            if parsed is None:
+                continue
+            route, elapsed = parsed
+            if options['route'] in (None, route):
+                routes[route].append((os.path.join(directory, name), elapsed))
+        if not routes:
+            self.stdout.write('No profiles found')
+            return
+
+        # the routes taking the most time in total first
+        for route, profiles in sorted(
+                routes.items(),
+                key=lambda item: -sum(e for _, e in item[1])):
+            self.summarize(route, profiles, options)
+
+    def summarize(self, route, profiles, options):
+        timings = sorted(elapsed for _, elapsed in profiles)
+        self.stdout.write(self.style.SUCCESS(
+            '%s: %d profiles, median %d ms, max %d ms' % (
+                route, len(timings), timings[len(timings) // 2],
+                timings[-1]
+            )
+        ))
+
+        stats = pstats.Stats(*[path for path, _ in profiles])
+        key = SORT_KEYS[options['sort']]
+        entries = sorted(
+            stats.stats.items(), key=lambda item: item[1][key], reverse=True
+        )[:options['top']]
+        # times per request, calls over all of them
+        self.stdout.write(
+            '  %10s %10s %8s  function' % ('cumul ms', 'own ms', 'calls')
+        )
+        for (filename, line, function), entry in entries:
+            self.stdout.write('  %10.1f %10.1f %8d  %s (%s:%d)' % (
+                entry[3] * 1000 / len(profiles),
+                entry[2] * 1000 / len(profiles),
+                entry[1], function, filename, line
+            ))
+        self.stdout.write('')
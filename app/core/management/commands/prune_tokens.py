@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import AuthToken
+from core.purge import delete_in_chunks
+
+
+class Command(BaseCommand):
+    """Django command to delete the expired auth tokens"""
+    help = 'Delete expired auth tokens in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=None,
+            help='Rows deleted per transaction (default: PURGE_CHUNK_SIZE)'
+        )
+
+    def handle(self, *args, **options):
+        deleted = delete_in_chunks(
+            AuthToken.objects.filter(expires__lte=timezone.now()),
+            options['chunk_size']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            'Deleted %d expired tokens' % deleted
+        ))
@@ -0,0 +1,34 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.purge import purge_user
+
+
+class Command(BaseCommand):
+    """Django command to delete accounts and everything they own"""
+    help = 'Delete users (by email) with set based, chunked deletes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('emails', nargs='+')
+        parser.add_argument(
+            '--chunk-size', type=int, default=None,
+            help='Rows deleted per transaction (default: PURGE_CHUNK_SIZE)'
+        )
+
+    def handle(self, *args, **options):
+        users = get_user_model().objects.filter(email__in=options['emails'])
+        found = dict(users.values_list('email', 'id'))
+        missing = set(options['emails']) - set(found)
+        if missing:
+            raise CommandError(
+                'No user with email: %s' % ', '.join(sorted(missing))
+            )
+
+        for email, user_id in found.items():
+            counts = purge_user(user_id, chunk_size=options['chunk_size'])
+            self.stdout.write(self.style.SUCCESS(
+                'Purged %s (%d recipes, %d tags, %d ingredients)' % (
+                    email, counts['recipes'], counts['tags'],
+                    counts['ingredients']
+                )
+            ))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from core import rankings
+
+
+class Command(BaseCommand):
+    """Django command to recompute the recipe rankings, run it from cron"""
+    help = 'Recompute the trending and most saved recipe rankings'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit', type=int, default=None,
+            help='Recipes per ranking (default: RANKING_SIZE)'
+        )
+
+    def handle(self, *args, **options):
+        counts = rankings.refresh(options['limit'])
+        for ranking, count in sorted(counts.items()):
+            self.stdout.write(self.style.SUCCESS(
+                'Ranked %d recipes for %s' % (count, ranking)
+            ))
@@ -0,0 +1,71 @@
+import multiprocessing
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.jobs import run_worker
+
+
+class Command(BaseCommand):
+    """Django command to run the background jobs"""
+    help = 'Run background job workers (processes x threads)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=1,
+            help='Number of worker processes (default: 1)'
+        )
+        parser.add_argument(
+            '--threads', type=int, default=1,
+            help='Number of threads per process (default: 1)'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help='Jobs claimed at once (default: the number of threads)'
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=None,
+            help='Seconds to wait when no job is due '
+                 '(default: JOB_POLL_INTERVAL)'
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Exit once there are no jobs left to run'
+        )
+
+    def handle(self, *args, **options):
+        worker_options = {
+            'threads': options['threads'],
+            'batch_size': options['batch_size'],
+            'poll_interval': options['poll_interval'],
+            'burst': options['burst'],
+        }
+        if options['processes'] <= 1:
+            done = self.run(worker_options)
+            self.stdout.write(self.style.SUCCESS('Ran %d jobs' % done))
+            return
+
+        # the children must open their own database connections
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(target=self.run, args=(worker_options,))
+            for _ in range(options['processes'])
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+    def run(self, worker_options):
+        """Run one worker process until SIGTERM/SIGINT (or out of jobs)"""
+        stop_event = threading.Event()
+
+        def stop(signum, frame):
+            # finish the running jobs, then exit
+            stop_event.set()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        return run_worker(stop_event=stop_event, **worker_options)
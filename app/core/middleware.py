@@ -0,0 +1,183 @@
+import cProfile
+import os
+import random
+import re
+import time
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from rest_framework.throttling import BaseThrottle
+
+from core import compression, db_router
+from core.db_router import set_use_replica
+
+
+class CompressionMiddleware:
+    """Compress responses with gzip, or brotli when it is installed
+
+    Responses smaller than COMPRESSION_MIN_SIZE bytes are sent as they are,
+    compressing them would cost more than it saves.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not compression.should_compress(response):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = compression.negotiate(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        if encoding is None:
+            return response
+
+        response.content = compression.compress(response.content, encoding)
+        response['Content-Length'] = str(len(response.content))
+        response['Content-Encoding'] = encoding
+        # the compressed bytes differ, so a strong ETag isn't valid anymore
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """Serve safe requests from the replicas, with read-your-writes
+
+    After a client makes a write it is pinned to the primary for
+    REPLICA_PIN_SECONDS, so it never reads from a replica that hasn't
+    caught up with its own write yet. Authenticated clients are pinned by
+    user, so a token rotation keeps the pin; the token authentication
+    checks the pin (see ``db_router.route_user``). Anonymous writers, such
+    as a login, are pinned by their address. Only the views in the modules
+    listed in REPLICA_VIEW_MODULES read from the replicas.
+    """
+    safe_methods = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            response = self.get_response(request)
+        finally:
+            set_use_replica(False)
+
+        if settings.DATABASE_REPLICAS and (
+                request.method not in self.safe_methods):
+            # set by DRF once the request is authenticated
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_authenticated:
+                db_router.pin(db_router.user_client(user.pk))
+            else:
+                db_router.pin(self.get_address_client(request))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not settings.DATABASE_REPLICAS:
+            return None
+        if request.method not in self.safe_methods:
+            return None
+
+        view_class = (getattr(view_func, 'cls', None) or
+                      getattr(view_func, 'view_class', None) or view_func)
+        if view_class.__module__ not in settings.REPLICA_VIEW_MODULES:
+            return None
+        if db_router.is_pinned(self.get_address_client(request)):
+            return None
+
+        # reset in __call__, once the response is rendered
+        set_use_replica(True)
+        return None
+
+    def get_address_client(self, request):
+        """Return the pin client of an anonymous request"""
+        # the address the throttles use, honours NUM_PROXIES
+        return db_router.address_client(
+            BaseThrottle().get_ident(request) or ''
+        )
+
+
+class ProfilingMiddleware:
+    """Profile a sample of the requests with cProfile
+
+    Requests are profiled when they are picked by PROFILE_SAMPLE_RATE (0
+    to 1), when their path matches PROFILE_PATH_PATTERN, or when they send
+    PROFILE_HEADER_SECRET in the ``X-Profile`` header. Profiles are written
+    to PROFILE_DIR, named after the time, the route and the duration of the
+    request, and only the newest PROFILE_MAX_FILES are kept. Summarize them
+    with the ``profile_summary`` command.
+    """
+    header = 'HTTP_X_PROFILE'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        elapsed = (time.perf_counter() - start) * 1000
+        self.save(profiler, request, elapsed)
+        return response
+
+    def should_profile(self, request):
+        rate = settings.PROFILE_SAMPLE_RATE
+        if rate and random.random() < rate:
+            return True
+        pattern = settings.PROFILE_PATH_PATTERN
+        if pattern and re.search(pattern, request.path):
+            return True
+        secret = settings.PROFILE_HEADER_SECRET
+        return bool(secret) and request.META.get(self.header) == secret
+
+    def save(self, profiler, request, elapsed):
+        directory = settings.PROFILE_DIR
+        os.makedirs(directory, exist_ok=True)
+        profiler.dump_stats(os.path.join(
+            directory, profile_file_name(request, elapsed)
+        ))
+
+        # the names start with the time, so the oldest sort first
+        names = sorted(
+            name for name in os.listdir(directory) if name.endswith('.prof')
+        )
+        for name in names[:-settings.PROFILE_MAX_FILES]:
+            try:
+                os.remove(os.path.join(directory, name))
+            except FileNotFoundError:
+                # removed by another worker
+                pass
+
+
+def profile_file_name(request, elapsed):
+    """Return ``<time>+<route>+<ms>ms+<pid>.prof`` for the profile"""
+    match = getattr(request, 'resolver_match', None)
+    route = match.view_name if match else 'unresolved'
+    route = re.sub(r'[^\w.-]', '_', route.replace(':', '.'))
+    now = time.time()
+    stamp = time.strftime('%Y%m%dT%H%M%S', time.gmtime(now))
+    return '%s.%03d+%s+%dms+%d.prof' % (
+        stamp, int(now % 1 * 1000), route, elapsed, os.getpid()
+    )
+
+
+def parse_profile_file_name(name):
+    """Return the route and duration (ms) in the name of a profile file"""
+    parts = name[:-len('.prof')].split('+')
+    if len(parts) != 4 or not parts[2].endswith('ms'):
+        return None
+    try:
+        return parts[1], int(parts[2][:-2])
+    except ValueError:
+        return None
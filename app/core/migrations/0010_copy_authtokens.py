@@ -0,0 +1,40 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations
+from django.utils import timezone
+
+
+BATCH_SIZE = 1000
+
+
+def copy_tokens(apps, schema_editor):
+    """Keep the existing tokens working, they expire after one lifetime"""
+    Token = apps.get_model('authtoken', 'Token')
+    AuthToken = apps.get_model('core', 'AuthToken')
+    expires = timezone.now() + timedelta(
+        days=settings.AUTH_TOKEN_LIFETIME_DAYS
+    )
+
+    batch = []
+    for token in Token.objects.order_by('pk').iterator():
+        batch.append(AuthToken(
+            key=token.key, user_id=token.user_id, device='legacy',
+            expires=expires
+        ))
+        if len(batch) == BATCH_SIZE:
+            AuthToken.objects.bulk_create(batch)
+            batch = []
+    AuthToken.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authtoken', '0002_auto_20160226_1747'),
+        ('core', '0009_authtoken'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_tokens, migrations.RunPython.noop),
+    ]
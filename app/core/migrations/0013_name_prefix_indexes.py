@@ -0,0 +1,38 @@
+from django.db import migrations
+
+
+TABLES = ('core_tag', 'core_ingredient')
+
+
+def create_indexes(apps, schema_editor):
+    """Index the lowercased names for the autocomplete prefix searches
+
+    text_pattern_ops lets LIKE 'abc%' use the index whatever the collation.
+    Expression indexes with an operator class can't be declared on the
+    models in this Django version, and only Postgres needs them.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table in TABLES:
+        schema_editor.execute(
+            'CREATE INDEX %s_user_lower_name ON %s '
+            '(user_id, lower(name) text_pattern_ops)' % (table, table)
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table in TABLES:
+        schema_editor.execute('DROP INDEX %s_user_lower_name' % table)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_recipe_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,52 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    """Turn the plain recipe/ingredient many to many into RecipeIngredient
+
+    The model takes over the existing link table, so no rows are copied.
+    The new columns are nullable to be added without rewriting the table,
+    the next migrations fill in the units and make the column required.
+    """
+
+    dependencies = [
+        ('core', '0013_name_prefix_indexes'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='RecipeIngredient',
+                    fields=[
+                        ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.Ingredient')),
+                        ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipe_ingredients', to='core.Recipe')),
+                    ],
+                    options={
+                        'db_table': 'core_recipe_ingredients',
+                    },
+                ),
+                migrations.AlterUniqueTogether(
+                    name='recipeingredient',
+                    unique_together={('recipe', 'ingredient')},
+                ),
+                migrations.AlterField(
+                    model_name='recipe',
+                    name='ingredients',
+                    field=models.ManyToManyField(through='core.RecipeIngredient', to='core.Ingredient'),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='recipeingredient',
+            name='quantity',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True),
+        ),
+        migrations.AddField(
+            model_name='recipeingredient',
+            name='unit',
+            field=models.CharField(blank=True, max_length=20, null=True),
+        ),
+    ]
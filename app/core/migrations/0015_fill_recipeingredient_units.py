@@ -0,0 +1,31 @@
+from django.db import migrations, transaction
+
+
+BATCH_SIZE = 5000
+
+
+def fill_units(apps, schema_editor):
+    """Set the unit of the existing links to '', one id range at a time"""
+    RecipeIngredient = apps.get_model('core', 'RecipeIngredient')
+    links = RecipeIngredient.objects.filter(unit__isnull=True)
+    last = links.order_by('-id').values_list('id', flat=True).first() or 0
+    start = 0
+    while start < last:
+        # every batch commits on its own, so locks are held briefly
+        with transaction.atomic():
+            links.filter(
+                id__gt=start, id__lte=start + BATCH_SIZE
+            ).update(unit='')
+        start += BATCH_SIZE
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('core', '0014_recipeingredient'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_units, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_recipeingredient_unit'),
+    ]
+
+    operations = [
+        # added without a database default, so the existing rows are left
+        # alone; the default only matters to Django
+        migrations.AddField(
+            model_name='recipe',
+            name='is_public',
+            field=models.BooleanField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='is_public',
+            field=models.BooleanField(default=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['is_public', 'id'], name='core_recipe_is_publ_58943b_idx'),
+        ),
+    ]
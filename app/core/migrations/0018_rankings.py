@@ -0,0 +1,60 @@
+# Generated by Django 2.1.15 on 2026-10-19 19:56
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_recipe_is_public'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RankedRecipe',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ranking', models.CharField(choices=[('trending', 'Trending'), ('saved', 'Most saved')], max_length=20)),
+                ('rank', models.PositiveIntegerField()),
+                ('score', models.FloatField()),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rankings', to='core.Recipe')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RecipeActivity',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('saves', models.PositiveIntegerField(default=0)),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.Recipe')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SavedRecipe',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.Recipe')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='savedrecipe',
+            unique_together={('user', 'recipe')},
+        ),
+        migrations.AddIndex(
+            model_name='recipeactivity',
+            index=models.Index(fields=['day'], name='core_recipe_day_7dbbe4_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='recipeactivity',
+            unique_together={('recipe', 'day')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='rankedrecipe',
+            unique_together={('ranking', 'rank')},
+        ),
+    ]
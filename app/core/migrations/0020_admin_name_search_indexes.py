@@ -0,0 +1,37 @@
+from django.db import migrations
+
+
+TABLES = ('core_tag', 'core_ingredient')
+
+
+def create_indexes(apps, schema_editor):
+    """Index the lowercased names for the admin prefix searches
+
+    The (user_id, lower(name)) indexes only serve searches within one
+    user, the admin searches the names of all the users.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table in TABLES:
+        schema_editor.execute(
+            'CREATE INDEX %s_lower_name ON %s '
+            '(lower(name) text_pattern_ops)' % (table, table)
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table in TABLES:
+        schema_editor.execute('DROP INDEX %s_lower_name' % table)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
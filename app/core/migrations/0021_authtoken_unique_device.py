@@ -0,0 +1,38 @@
+# Generated by Django 2.1.15 on 2026-10-19 20:19
+
+from django.db import migrations
+
+
+BATCH_SIZE = 1000
+
+
+def delete_duplicates(apps, schema_editor):
+    """Keep only the newest token of every device"""
+    AuthToken = apps.get_model('core', 'AuthToken')
+    seen = set()
+    duplicates = []
+    for key, user_id, device in (
+            AuthToken.objects.order_by('user_id', 'device', '-created')
+            .values_list('key', 'user_id', 'device').iterator()):
+        if (user_id, device) in seen:
+            duplicates.append(key)
+        seen.add((user_id, device))
+        if len(duplicates) == BATCH_SIZE:
+            AuthToken.objects.filter(key__in=duplicates).delete()
+            duplicates = []
+    AuthToken.objects.filter(key__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_admin_name_search_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicates, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='authtoken',
+            unique_together={('user', 'device')},
+        ),
+    ]
@@ -1,9 +1,23 @@
-from django.db import models
+import binascii
+import json
+import os
+import uuid
+from datetime import timedelta
+
+from django.db import models, router, transaction
+from django.db.models.signals import m2m_changed
 from django.contrib.auth.models import AbstractBaseUser
 from django.contrib.auth.models import BaseUserManager
 from django.contrib.auth.models import PermissionsMixin
 
 from django.conf import settings
+from django.utils import timezone
+
+
+def recipe_image_file_path(instance, filename):
+    """Generate a unique file path for a new recipe image"""
+    ext = os.path.splitext(filename)[1].lower()
+    return os.path.join('uploads', 'recipe', '%s%s' % (uuid.uuid4(), ext))
 
 
 class UserManager(BaseUserManager):
@@ -42,6 +56,37 @@ class User(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'email'
 
 
+def default_token_expiry():
+    return timezone.now() + timedelta(days=settings.AUTH_TOKEN_LIFETIME_DAYS)
+
+
+class AuthToken(models.Model):
+    """Expiring auth token, a user can have one per device"""
+    key = models.CharField(max_length=40, primary_key=True)
+    user = models.ForeignKey(
+        to=settings.AUTH_USER_MODEL,
+        related_name='auth_tokens',
+        on_delete=models.CASCADE
+    )
+    # the name of the device or client that the token was given to
+    device = models.CharField(max_length=100, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    # indexed for pruning the expired tokens
+    expires = models.DateTimeField(default=default_token_expiry,
+                                   db_index=True)
+
+    class Meta:
+        unique_together = ('user', 'device')
+
+    def save(self, *args, **kwargs):
+        if not self.key:
+            self.key = binascii.hexlify(os.urandom(20)).decode()
+        return super().save(*args, **kwargs)
+
+    def __str__(self):
+        return '%s (%s)' % (self.device or 'token', self.user_id)
+
+
 class Tag(models.Model):
     """Tag to be used for a recipe"""
     # name field to the recipe
@@ -84,9 +129,376 @@ class Recipe(models.Model):
     link = models.CharField(max_length=255, blank=True)
 
     # add many to many fields : class_name as a string
-    ingredients = models.ManyToManyField("Ingredient")
+    ingredients = models.ManyToManyField(
+        "Ingredient", through="RecipeIngredient"
+    )
     tags = models.ManyToManyField("Tag")
 
+    image = models.ImageField(
+        null=True, blank=True, upload_to=recipe_image_file_path
+    )
+    # JSON list of the resized copies of the image (see core.images).
+    # Nullable so adding it doesn't rewrite the table.
+    image_variants = models.TextField(null=True, blank=True)
+    # listed in the public feed when set. Nullable so adding it doesn't
+    # rewrite the table, NULL means private.
+    is_public = models.BooleanField(null=True, default=False)
+
+    class Meta:
+        # for filtering and sorting a user's recipes by time and price
+        indexes = [
+            models.Index(fields=['user', 'time_minutes']),
+            models.Index(fields=['user', 'price']),
+            # the public feed, newest first
+            models.Index(fields=['is_public', 'id']),
+        ]
+
     def __str__(self):
         """return title as the recipe"""
         return self.title
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # so saves can tell if the recipe was in the public feed
+        instance._was_public = bool(instance.__dict__.get('is_public'))
+        return instance
+
+    def get_image_variants(self):
+        """Return the variants of the image, from the smallest"""
+        return json.loads(self.image_variants) if self.image_variants else []
+
+    # ingredients.add()/remove()/set() aren't available with a through
+    # model, these take their place and send the same m2m_changed signals.
+    # They also write with fewer statements than the related managers: the
+    # new links with one insert, and no lookups for a ``new`` recipe.
+
+    def _send_links_changed(self, sender, model, action, pk_set, using):
+        m2m_changed.send(
+            sender=sender, instance=self, action=action, reverse=False,
+            model=model, pk_set=set(pk_set), using=using
+        )
+
+    def set_tags(self, tag_ids, new=False):
+        """Link exactly the given tags to the recipe"""
+        through = Recipe.tags.through
+        using = router.db_for_write(through)
+        links = through.objects.using(using).filter(recipe=self)
+        tag_ids = set(tag_ids)
+        with transaction.atomic(using=using, savepoint=False):
+            current = set()
+            if not new:
+                current = set(links.values_list('tag_id', flat=True))
+            removed = current - tag_ids
+            if removed:
+                self._send_links_changed(
+                    through, Tag, 'pre_remove', removed, using
+                )
+                links.filter(tag_id__in=removed)._raw_delete(using)
+                self._send_links_changed(
+                    through, Tag, 'post_remove', removed, using
+                )
+
+            added = tag_ids - current
+            if added:
+                self._send_links_changed(
+                    through, Tag, 'pre_add', added, using
+                )
+                through.objects.using(using).bulk_create(
+                    through(recipe_id=self.pk, tag_id=tag_id)
+                    for tag_id in sorted(added)
+                )
+                self._send_links_changed(
+                    through, Tag, 'post_add', added, using
+                )
+
+    def lock_ingredients(self):
+        """Return the ingredient links of the recipe by ingredient id
+
+        The links stay locked until the transaction ends.
+        """
+        using = router.db_for_write(RecipeIngredient)
+        return {
+            link.ingredient_id: link
+            for link in RecipeIngredient.objects.using(using)
+            .filter(recipe=self).select_for_update()
+        }
+
+    def set_ingredients(self, amounts, current=None):
+        """Link exactly the given ingredients to the recipe
+
+        ``amounts`` maps ingredient ids to ``(quantity, unit)`` tuples.
+        Pass the links from ``lock_ingredients()`` as ``current`` when
+        they're already locked, or ``{}`` for a new recipe.
+        """
+        using = router.db_for_write(RecipeIngredient)
+        links = RecipeIngredient.objects.using(using).filter(recipe=self)
+        with transaction.atomic(using=using, savepoint=False):
+            if current is None:
+                current = self.lock_ingredients()
+            removed = set(current) - set(amounts)
+            if removed:
+                self._send_links_changed(
+                    RecipeIngredient, Ingredient, 'pre_remove', removed,
+                    using
+                )
+                links.filter(ingredient_id__in=removed)._raw_delete(using)
+                self._send_links_changed(
+                    RecipeIngredient, Ingredient, 'post_remove', removed,
+                    using
+                )
+
+            for ingredient_id, (quantity, unit) in amounts.items():
+                link = current.get(ingredient_id)
+                if link and (link.quantity, link.unit) != (quantity, unit):
+                    links.filter(pk=link.pk).update(
+                        quantity=quantity, unit=unit
+                    )
+
+            added = [i for i in amounts if i not in current]
+            if added:
+                self._send_links_changed(
+                    RecipeIngredient, Ingredient, 'pre_add', added, using
+                )
+                RecipeIngredient.objects.using(using).bulk_create(
+                    RecipeIngredient(
+                        recipe=self, ingredient_id=i,
+                        quantity=amounts[i][0], unit=amounts[i][1]
+                    )
+                    for i in added
+                )
+                self._send_links_changed(
+                    RecipeIngredient, Ingredient, 'post_add', added, using
+                )
+
+    def _change_ingredients(self, change):
+        """Apply ``change`` to the amounts of the current ingredients"""
+        using = router.db_for_write(RecipeIngredient)
+        with transaction.atomic(using=using, savepoint=False):
+            current = self.lock_ingredients()
+            amounts = {
+                ingredient_id: (link.quantity, link.unit)
+                for ingredient_id, link in current.items()
+            }
+            change(amounts)
+            self.set_ingredients(amounts, current)
+
+    def add_ingredients(self, *ingredients, quantity=None, unit=''):
+        """Link more ingredients (all with the same quantity) to the recipe"""
+        def add(amounts):
+            for ingredient in ingredients:
+                amounts.setdefault(ingredient.pk, (quantity, unit))
+        self._change_ingredients(add)
+
+    def remove_ingredients(self, *ingredients):
+        def remove(amounts):
+            for ingredient in ingredients:
+                amounts.pop(ingredient.pk, None)
+        self._change_ingredients(remove)
+
+
+class RecipeIngredient(models.Model):
+    """An ingredient of a recipe, and how much of it the recipe needs"""
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE, related_name='recipe_ingredients'
+    )
+    ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE)
+    # no quantity means "some", like for the links from before quantities
+    quantity = models.DecimalField(
+        max_digits=8, decimal_places=2, null=True, blank=True
+    )
+    unit = models.CharField(max_length=20, blank=True, default='')
+
+    class Meta:
+        # the table of the plain many to many field this replaced
+        db_table = 'core_recipe_ingredients'
+        unique_together = (('recipe', 'ingredient'),)
+
+    def __str__(self):
+        return '%s %s %s' % (
+            self.quantity or '', self.unit, self.ingredient_id
+        )
+
+
+class Job(models.Model):
+    """Background job, run by the run_workers management command"""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    )
+
+    name = models.CharField(max_length=100)
+    # JSON keyword arguments of the job function
+    payload = models.TextField(default='{}')
+    # who can see the status of the job, if anyone
+    user = models.ForeignKey(
+        to=settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True, blank=True
+    )
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=QUEUED
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    # not run before this time, pushed back after failures
+    run_at = models.DateTimeField(default=timezone.now)
+    # running jobs still running after this time are claimed again
+    locked_until = models.DateTimeField(null=True, blank=True)
+    result = models.TextField(blank=True)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'run_at'])]
+
+    def __str__(self):
+        return '%s #%s (%s)' % (self.name, self.pk, self.status)
+
+
+class Change(models.Model):
+    """An entry of the change feed of a user, see core.changes
+
+    The id is the sequence number clients sync from.
+    """
+    UPSERT = 'upsert'
+    DELETE = 'delete'
+    OP_CHOICES = (
+        (UPSERT, 'Created or updated'),
+        (DELETE, 'Deleted'),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(
+        to=settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE
+    )
+    # model name of the changed object: recipe, tag or ingredient
+    model = models.CharField(max_length=20)
+    object_id = models.PositiveIntegerField()
+    op = models.CharField(max_length=10, choices=OP_CHOICES)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # reading the feed
+            models.Index(fields=['user', 'id']),
+            # finding the superseded entries when compacting
+            models.Index(fields=['user', 'model', 'object_id']),
+        ]
+
+    def __str__(self):
+        return '%s %s %s' % (self.op, self.model, self.object_id)
+
+
+class ChangeHorizon(models.Model):
+    """The newest entry dropped from the change feed of a user
+
+    Clients synced up to an older entry have missed deletes and have to
+    download everything again.
+    """
+    user = models.OneToOneField(
+        to=settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True
+    )
+    seq = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return '%s at %s' % (self.user_id, self.seq)
+
+
+class SavedRecipe(models.Model):
+    """A public recipe a user saved"""
+    user = models.ForeignKey(
+        to=settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE
+    )
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = (('user', 'recipe'),)
+
+    def __str__(self):
+        return '%s saved %s' % (self.user_id, self.recipe_id)
+
+
+class RecipeActivity(models.Model):
+    """How often a recipe was viewed and saved on a day, see core.rankings"""
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE)
+    day = models.DateField()
+    views = models.PositiveIntegerField(default=0)
+    saves = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = (('recipe', 'day'),)
+        indexes = [
+            # scoring the last days, and dropping the older ones
+            models.Index(fields=['day']),
+        ]
+
+    def __str__(self):
+        return '%s on %s' % (self.recipe_id, self.day)
+
+
+class RankedRecipe(models.Model):
+    """A recipe in a precomputed ranking, see core.rankings"""
+    TRENDING = 'trending'
+    SAVED = 'saved'
+    RANKING_CHOICES = (
+        (TRENDING, 'Trending'),
+        (SAVED, 'Most saved'),
+    )
+
+    ranking = models.CharField(max_length=20, choices=RANKING_CHOICES)
+    rank = models.PositiveIntegerField()
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE, related_name='rankings'
+    )
+    score = models.FloatField()
+
+    class Meta:
+        # reading a ranking in order
+        unique_together = (('ranking', 'rank'),)
+
+    def __str__(self):
+        return '%s #%s: %s' % (self.ranking, self.rank, self.recipe_id)
+
+
+def default_idempotency_key_expiry():
+    return timezone.now() + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+
+
+class IdempotencyKey(models.Model):
+    """The response of a create request, replayed when it is retried
+
+    See core.idempotency.
+    """
+    user = models.ForeignKey(
+        to=settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE
+    )
+    key = models.CharField(max_length=255)
+    # hash of the method, path and data of the request
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    # JSON data of the response
+    response = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    # indexed for pruning the expired keys
+    expires = models.DateTimeField(default=default_idempotency_key_expiry,
+                                   db_index=True)
+
+    class Meta:
+        unique_together = (('user', 'key'),)
+
+    def __str__(self):
+        return '%s (%s)' % (self.key, self.user_id)
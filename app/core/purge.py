@@ -0,0 +1,160 @@
+"""Set based deletion of recipes and whole accounts.
+
+Django's ``delete()`` runs the deletion collector, which loads every related
+row into memory before deleting them. For big accounts that is far too slow,
+so here we delete in dependency order (through rows first, then the rows they
+point to) with plain ``DELETE ... WHERE id IN (...)`` statements. Every chunk
+runs in its own short transaction so locks are only held for one chunk.
+"""
+from functools import partial
+
+from django.conf import settings
+from django.contrib.admin.models import LogEntry
+from django.contrib.auth import get_user_model
+from django.db import router, transaction
+from rest_framework.authtoken.models import Token
+
+from core.models import (
+    Tag, Ingredient, Recipe, Job, AuthToken, Change, ChangeHorizon,
+    SavedRecipe, RecipeActivity, RankedRecipe, IdempotencyKey
+)
+from core import changes, recipe_index, response_cache
+
+
+def get_chunk_size(chunk_size=None):
+    """Return the chunk size to use, falling back to the settings value"""
+    return chunk_size or settings.PURGE_CHUNK_SIZE
+
+
+def delete_in_chunks(queryset, chunk_size=None):
+    """Delete the rows of the queryset without the collector
+
+    No signals are sent and nothing cascades, so callers have to delete
+    the rows pointing to the queryset first. Returns the number of rows
+    deleted.
+    """
+    chunk_size = get_chunk_size(chunk_size)
+    model = queryset.model
+    using = router.db_for_write(model)
+    queryset = queryset.using(using)
+    deleted = 0
+    while True:
+        pks = list(queryset.values_list('pk', flat=True)[:chunk_size])
+        if not pks:
+            return deleted
+        with transaction.atomic(using=using):
+            deleted += model._base_manager.filter(
+                pk__in=pks
+            )._raw_delete(using)
+
+
+def _delete_recipe_chunk(recipe_ids, using):
+    """Delete one chunk of recipes along with their through rows"""
+    with transaction.atomic(using=using):
+        Recipe.tags.through.objects.filter(
+            recipe_id__in=recipe_ids
+        )._raw_delete(using)
+        Recipe.ingredients.through.objects.filter(
+            recipe_id__in=recipe_ids
+        )._raw_delete(using)
+        for model in (SavedRecipe, RecipeActivity, RankedRecipe):
+            model.objects.filter(recipe_id__in=recipe_ids)._raw_delete(using)
+        return Recipe.objects.filter(id__in=recipe_ids)._raw_delete(using)
+
+
+def delete_recipes(queryset, chunk_size=None, record_changes=True):
+    """Delete all the recipes in the queryset, chunk by chunk
+
+    Returns the number of recipes deleted.
+    """
+    chunk_size = get_chunk_size(chunk_size)
+    using = router.db_for_write(Recipe)
+    queryset = queryset.using(using)
+    deleted = 0
+    while True:
+        rows = list(
+            queryset.values_list('id', 'user_id', 'is_public')[:chunk_size]
+        )
+        if not rows:
+            return deleted
+        recipe_ids = [row[0] for row in rows]
+        with transaction.atomic(using=using):
+            deleted += _delete_recipe_chunk(recipe_ids, using)
+            # no signals are sent, so record the tombstones here
+            if record_changes:
+                for user_id in set(row[1] for row in rows):
+                    changes.record(
+                        user_id, 'recipe',
+                        [row[0] for row in rows if row[1] == user_id],
+                        Change.DELETE
+                    )
+        # and invalidate the cached responses and recipe indexes
+        for user_id in set(row[1] for row in rows):
+            response_cache.bump_version_on_commit(
+                response_cache.user_scope(user_id), using
+            )
+            transaction.on_commit(
+                partial(recipe_index.bump_version, user_id), using
+            )
+        if any(row[2] for row in rows):
+            response_cache.bump_version_on_commit(
+                response_cache.PUBLIC_SCOPE, using
+            )
+
+
+def purge_user(user, chunk_size=None):
+    """Delete the user and everything owned by them
+
+    Returns a dictionary with the number of rows deleted per model.
+    """
+    user_id = getattr(user, 'pk', user)
+    counts = {}
+    counts['recipes'] = delete_recipes(
+        Recipe.objects.filter(user_id=user_id), chunk_size,
+        record_changes=False
+    )
+    # other users' recipes can still link to our tags and ingredients.
+    delete_in_chunks(
+        Recipe.tags.through.objects.filter(tag__user_id=user_id), chunk_size
+    )
+    delete_in_chunks(
+        Recipe.ingredients.through.objects.filter(
+            ingredient__user_id=user_id
+        ),
+        chunk_size
+    )
+    counts['tags'] = delete_in_chunks(
+        Tag.objects.filter(user_id=user_id), chunk_size
+    )
+    counts['ingredients'] = delete_in_chunks(
+        Ingredient.objects.filter(user_id=user_id), chunk_size
+    )
+    counts['tokens'] = delete_in_chunks(
+        AuthToken.objects.filter(user_id=user_id), chunk_size
+    )
+    # tokens from before the expiring tokens
+    delete_in_chunks(Token.objects.filter(user_id=user_id), chunk_size)
+    delete_in_chunks(LogEntry.objects.filter(user_id=user_id), chunk_size)
+    delete_in_chunks(Change.objects.filter(user_id=user_id), chunk_size)
+    # the saves of other users' recipes
+    delete_in_chunks(SavedRecipe.objects.filter(user_id=user_id), chunk_size)
+    delete_in_chunks(
+        IdempotencyKey.objects.filter(user_id=user_id), chunk_size
+    )
+    ChangeHorizon.objects.filter(user_id=user_id).delete()
+    Job.objects.filter(user_id=user_id).update(user=None)
+
+    user_model = get_user_model()
+    using = router.db_for_write(user_model)
+    with transaction.atomic(using=using):
+        user_model.groups.through.objects.filter(
+            user_id=user_id
+        )._raw_delete(using)
+        user_model.user_permissions.through.objects.filter(
+            user_id=user_id
+        )._raw_delete(using)
+        counts['users'] = user_model.objects.filter(
+            pk=user_id
+        )._raw_delete(using)
+
+    return counts
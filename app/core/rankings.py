@@ -0,0 +1,111 @@
+"""Precomputed rankings of the public recipes.
+
+Views and saves are counted per recipe and day in ``RecipeActivity``. The
+``refresh_rankings`` command (run it from cron every few minutes) ranks the
+public recipes from these counters and replaces the ``RankedRecipe`` rows
+of every ranking, so reading a ranking is one indexed query.
+
+The trending score adds up ``views + TRENDING_SAVE_WEIGHT * saves`` of the
+last TRENDING_WINDOW_DAYS days, the activity of every day weighted by
+``0.5 ** (age in days / TRENDING_HALF_LIFE_DAYS)``. The most saved ranking
+counts the current saves.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import (
+    Case, Count, ExpressionWrapper, F, FloatField, Sum, Value, When
+)
+from django.utils import timezone
+
+from core.models import RankedRecipe, RecipeActivity, SavedRecipe
+from core import locks, purge
+
+
+def record_activity(recipe_id, views=0, saves=0, day=None):
+    """Add to the counters of the recipe for the day (today by default)"""
+    day = day or timezone.now().date()
+    counters = RecipeActivity.objects.filter(recipe_id=recipe_id, day=day)
+    increment = {'views': F('views') + views, 'saves': F('saves') + saves}
+    if counters.update(**increment):
+        return
+    try:
+        with transaction.atomic():
+            RecipeActivity.objects.create(
+                recipe_id=recipe_id, day=day, views=views, saves=saves
+            )
+    except IntegrityError:
+        # created by a concurrent request in between
+        counters.update(**increment)
+
+
+def trending_scores(limit, today=None):
+    """Return the ``limit`` best trending recipe ids and their scores"""
+    today = today or timezone.now().date()
+    days = settings.TRENDING_WINDOW_DAYS
+    weight = Case(
+        *[When(day=today - timedelta(days=age), then=Value(
+            0.5 ** (age / settings.TRENDING_HALF_LIFE_DAYS)
+        )) for age in range(days)],
+        default=Value(0.0), output_field=FloatField()
+    )
+    points = F('views') + F('saves') * settings.TRENDING_SAVE_WEIGHT
+    rows = (
+        RecipeActivity.objects
+        .filter(day__gt=today - timedelta(days=days),
+                recipe__is_public=True)
+        .values('recipe_id')
+        .annotate(score=Sum(ExpressionWrapper(
+            points * weight, output_field=FloatField()
+        )))
+        .order_by('-score', '-recipe_id')[:limit]
+    )
+    return [(row['recipe_id'], row['score']) for row in rows]
+
+
+def saved_scores(limit):
+    """Return the ``limit`` most saved recipe ids and their saves"""
+    rows = (
+        SavedRecipe.objects.filter(recipe__is_public=True)
+        .values('recipe_id')
+        .annotate(score=Count('id'))
+        .order_by('-score', '-recipe_id')[:limit]
+    )
+    return [(row['recipe_id'], row['score']) for row in rows]
+
+
+RANKINGS = {
+    RankedRecipe.TRENDING: trending_scores,
+    RankedRecipe.SAVED: saved_scores,
+}
+
+
+def refresh(limit=None):
+    """Recompute all the rankings, return the number of recipes per ranking
+
+    Also drops the activity too old to count for trending anymore.
+    """
+    limit = limit or settings.RANKING_SIZE
+    counts = {}
+    for ranking, scores in RANKINGS.items():
+        ranked = scores(limit)
+        # readers see either the old or the new ranking, never a mix, and
+        # overlapping refreshes replace it one after the other
+        with transaction.atomic():
+            locks.transaction_lock(locks.RANKINGS, 0)
+            RankedRecipe.objects.filter(ranking=ranking).delete()
+            RankedRecipe.objects.bulk_create(
+                RankedRecipe(
+                    ranking=ranking, rank=rank, recipe_id=recipe_id,
+                    score=score
+                )
+                for rank, (recipe_id, score) in enumerate(ranked, 1)
+            )
+        counts[ranking] = len(ranked)
+
+    oldest = timezone.now().date() - timedelta(
+        days=settings.TRENDING_WINDOW_DAYS
+    )
+    purge.delete_in_chunks(RecipeActivity.objects.filter(day__lte=oldest))
+    return counts
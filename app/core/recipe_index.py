@@ -0,0 +1,192 @@
+"""In-process inverted index of the tags and ingredients of recipes.
+
+For every user it maps each tag and ingredient id to the set of recipes
+using it, as a bitset in a Python int: the user's recipes get dense
+positions, and bit ``n`` is the recipe at position ``n``. AND, OR and NOT
+queries are then a few big-int operations instead of one join per id.
+
+The index of a user is built from the link tables on first use (three
+queries), kept up to date from the model signals once the changes commit,
+and dropped by LRU once RECIPE_INDEX_MAX_USERS users are indexed.
+
+Every committed change bumps an index version of the user in the shared
+cache. The process making the change applies it to its index if the bump
+was the very next version, so it can't skip a change; the other processes
+see a newer version and rebuild the index on its next use. Raw deletes
+(core.purge) only bump the version.
+"""
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.models import Recipe
+from core import response_cache
+
+
+TAGS = 'tags'
+INGREDIENTS = 'ingredients'
+
+
+class UserIndex:
+    """The bitsets of the recipes of one user"""
+
+    def __init__(self, version):
+        self.version = version
+        # recipe id at every position, and the other way around
+        self.ids = []
+        self.positions = {}
+        # bits of the recipes that still exist
+        self.alive = 0
+        self.bitsets = {TAGS: {}, INGREDIENTS: {}}
+        self.lock = threading.Lock()
+
+    def bit(self, recipe_id):
+        """Return the bit of the recipe, giving new recipes a position"""
+        position = self.positions.get(recipe_id)
+        if position is None:
+            position = len(self.ids)
+            self.ids.append(recipe_id)
+            self.positions[recipe_id] = position
+            self.alive |= 1 << position
+        return 1 << position
+
+    def add_links(self, kind, recipe_id, ids):
+        bit = self.bit(recipe_id)
+        bitsets = self.bitsets[kind]
+        for id_ in ids:
+            bitsets[id_] = bitsets.get(id_, 0) | bit
+
+    def remove_links(self, kind, recipe_id, ids=None):
+        """Unlink the recipe from the ids, or from everything of the kind"""
+        if recipe_id not in self.positions:
+            return
+        bit = self.bit(recipe_id)
+        bitsets = self.bitsets[kind]
+        for id_ in bitsets if ids is None else ids:
+            if id_ in bitsets:
+                bitsets[id_] &= ~bit
+
+    def remove_recipe(self, recipe_id):
+        if recipe_id in self.positions:
+            self.remove_links(TAGS, recipe_id)
+            self.remove_links(INGREDIENTS, recipe_id)
+            self.alive &= ~self.bit(recipe_id)
+
+    def remove_id(self, kind, id_):
+        """Forget a deleted tag or ingredient"""
+        self.bitsets[kind].pop(id_, None)
+
+    def match(self, kind, all_of=(), any_of=(), none_of=()):
+        """Return the bits of the recipes matching the conditions"""
+        bitsets = self.bitsets[kind]
+        bits = self.alive
+        for id_ in all_of:
+            bits &= bitsets.get(id_, 0)
+        if any_of:
+            union = 0
+            for id_ in any_of:
+                union |= bitsets.get(id_, 0)
+            bits &= union
+        for id_ in none_of:
+            bits &= ~bitsets.get(id_, 0)
+        return bits
+
+    def recipe_ids(self, bits):
+        """Return the ids of the recipes of the bits"""
+        # one pass over the digits beats shifting the big int per bit
+        digits = bin(bits)[:1:-1]
+        return [self.ids[i] for i, digit in enumerate(digits)
+                if digit == '1']
+
+
+def _scope(user_id):
+    return 'recipe_index_%s' % user_id
+
+
+def get_version(user_id):
+    return response_cache.get_version(_scope(user_id))
+
+
+def bump_version(user_id):
+    """Bump the index version of the user, return the new version"""
+    try:
+        return cache.incr(response_cache.VERSION_KEY_FORMAT % _scope(user_id))
+    except ValueError:
+        # the version was evicted, every index has to be rebuilt
+        return get_version(user_id)
+
+
+def build(user_id):
+    """Build the index of the user from the database"""
+    index = UserIndex(get_version(user_id))
+    for recipe_id in (Recipe.objects.filter(user_id=user_id)
+                      .order_by('id').values_list('id', flat=True)):
+        index.bit(recipe_id)
+    for kind, through, column in (
+            (TAGS, Recipe.tags.through, 'tag_id'),
+            (INGREDIENTS, Recipe.ingredients.through, 'ingredient_id')):
+        links = through.objects.filter(recipe__user_id=user_id)
+        for recipe_id, id_ in links.values_list('recipe_id', column):
+            index.add_links(kind, recipe_id, (id_,))
+    return index
+
+
+_indexes = OrderedDict()
+_lock = threading.Lock()
+
+
+def get_index(user_id):
+    """Return the up to date index of the user, building it if needed"""
+    version = get_version(user_id)
+    with _lock:
+        index = _indexes.get(user_id)
+        if index is not None:
+            _indexes.move_to_end(user_id)
+    if index is None or index.version != version:
+        index = build(user_id)
+        with _lock:
+            _indexes[user_id] = index
+            while len(_indexes) > settings.RECIPE_INDEX_MAX_USERS:
+                _indexes.popitem(last=False)
+    return index
+
+
+def update(user_id, func, *args):
+    """Apply a committed change to the index of the user, if it is built
+
+    Indexes that missed another change in between are dropped instead.
+    """
+    version = bump_version(user_id)
+    with _lock:
+        index = _indexes.get(user_id)
+    if index is None:
+        return
+    with index.lock:
+        if index.version == version - 1:
+            func(index, *args)
+            index.version = version
+            return
+    with _lock:
+        if _indexes.get(user_id) is index:
+            del _indexes[user_id]
+
+
+def clear():
+    with _lock:
+        _indexes.clear()
+
+
+def query(user_id, conditions):
+    """Return the ids of the recipes of the user matching the conditions
+
+    ``conditions`` maps TAGS and INGREDIENTS to ``(all_of, any_of,
+    none_of)`` tuples of ids.
+    """
+    index = get_index(user_id)
+    with index.lock:
+        bits = index.alive
+        for kind, (all_of, any_of, none_of) in conditions.items():
+            bits &= index.match(kind, all_of, any_of, none_of)
+        return index.recipe_ids(bits)
@@ -0,0 +1,143 @@
+"""Cache of rendered (and compressed) list responses.
+
+Every entry is keyed with its owner (the user) and a version number of the
+owner. Any change to a recipe, tag or ingredient of the user bumps the
+version, so the stale entries are never read again and simply expire. The
+public feed is shared by everyone, its entries are keyed with the public
+scope and its version instead, which only changes with the public recipes.
+
+The entries keep the rendered JSON next to its compressed variants, so a
+hit costs neither serialization nor compression.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+from core import compression
+
+
+VERSION_KEY_FORMAT = 'resp_version_%s'
+
+PUBLIC_SCOPE = 'public'
+
+
+def get_version(scope):
+    """Return the current version of the cached responses of the scope"""
+    key = VERSION_KEY_FORMAT % scope
+    version = cache.get(key)
+    if version is None:
+        # start from the clock so a flushed cache doesn't reuse versions
+        version = int(time.time() * 1000)
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_version(scope):
+    """Invalidate all the cached responses of the scope"""
+    try:
+        cache.incr(VERSION_KEY_FORMAT % scope)
+    except ValueError:
+        get_version(scope)
+
+
+def bump_version_on_commit(scope, using=None):
+    """Invalidate the cached responses of the scope for a change being made
+
+    Inside a transaction the version is bumped right away and again once
+    the change commits: a concurrent request may cache the old rows under
+    the first new version in between, the second bump drops them.
+    """
+    if transaction.get_connection(using).in_atomic_block:
+        bump_version(scope)
+    transaction.on_commit(lambda: bump_version(scope), using=using)
+
+
+def user_scope(user_id):
+    return 'user_%s' % user_id
+
+
+def apply_encoding(request, response, entry):
+    """Set the best cached (or new) encoding of the entry on the response
+
+    Returns True when a new compressed variant was added to the entry.
+    """
+    patch_vary_headers(response, ('Accept-Encoding',))
+    content = entry['identity']
+    if len(content) < settings.COMPRESSION_MIN_SIZE:
+        return False
+
+    encoding = compression.negotiate(
+        request.META.get('HTTP_ACCEPT_ENCODING', '')
+    )
+    if encoding is None:
+        return False
+
+    added = encoding not in entry
+    if added:
+        entry[encoding] = compression.compress(content, encoding)
+    response.content = entry[encoding]
+    response['Content-Encoding'] = encoding
+    return added
+
+
+class CachedListMixin:
+    """Serve the list action from the response cache of the user"""
+
+    def get_list_cache_scope(self, request):
+        """Return the scope whose version the cached lists are keyed with"""
+        return user_scope(request.user.pk)
+
+    def get_list_cache_key(self, request):
+        """Return the cache key of the list response for this request"""
+        scope = self.get_list_cache_scope(request)
+        # the versions of two scopes may be equal, the scope tells them apart
+        parts = [
+            scope,
+            self.__class__.__name__,
+            request.get_host(),
+            request.path,
+            '&'.join(sorted(request.META.get('QUERY_STRING', '').split('&'))),
+            request.META.get('HTTP_ACCEPT', ''),
+            str(get_version(scope)),
+        ]
+        digest = hashlib.sha1('|'.join(parts).encode()).hexdigest()
+        return 'resp_list_%s' % digest
+
+    def list(self, request, *args, **kwargs):
+        key = self.get_list_cache_key(request)
+        entry = cache.get(key)
+        if entry is None:
+            response = super().list(request, *args, **kwargs)
+            response.list_cache_key = key
+            return response
+
+        response = HttpResponse(
+            entry['identity'], content_type=entry['content_type']
+        )
+        if apply_encoding(request, response, entry):
+            cache.set(key, entry, settings.RESPONSE_CACHE_TIMEOUT)
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        key = getattr(response, 'list_cache_key', None)
+        if (key is None or response.status_code != 200 or
+                response.accepted_renderer.format != 'json'):
+            return response
+
+        response.render()
+        entry = {
+            'content_type': response['Content-Type'],
+            'identity': response.content,
+        }
+        apply_encoding(request, response, entry)
+        cache.set(key, entry, settings.RESPONSE_CACHE_TIMEOUT)
+        return response
@@ -0,0 +1,43 @@
+import json
+
+from django.conf import settings
+from rest_framework import serializers
+
+from core.models import Job
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """Serializer for the status of background jobs"""
+    result = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = ('id', 'name', 'status', 'attempts', 'result', 'created',
+                  'updated')
+        read_only_fields = fields
+
+    def get_result(self, obj):
+        return json.loads(obj.result) if obj.result else None
+
+
+class SubRequestSerializer(serializers.Serializer):
+    """One request of a batch"""
+    method = serializers.ChoiceField(
+        choices=('GET', 'POST', 'PUT', 'PATCH', 'DELETE')
+    )
+    path = serializers.RegexField(r'^/api/', max_length=500)
+    body = serializers.JSONField(required=False)
+
+
+class BatchSerializer(serializers.Serializer):
+    """Serializer for batches of API requests"""
+    requests = SubRequestSerializer(many=True, allow_empty=False)
+    # roll back all the writes when a request fails
+    atomic = serializers.BooleanField(default=False)
+
+    def validate_requests(self, value):
+        if len(value) > settings.BATCH_MAX_REQUESTS:
+            raise serializers.ValidationError(
+                'At most %d requests per batch.' % settings.BATCH_MAX_REQUESTS
+            )
+        return value
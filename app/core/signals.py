@@ -0,0 +1,165 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (
+    post_save, post_delete, pre_delete, m2m_changed
+)
+from django.dispatch import receiver
+
+from core.models import Tag, Ingredient, Recipe, Change
+from core import changes, recipe_index, response_cache
+from core.recipe_index import UserIndex, TAGS, INGREDIENTS
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+def user_data_changed(sender, instance, **kwargs):
+    """Invalidate the cached responses of the owner"""
+    response_cache.bump_version_on_commit(
+        response_cache.user_scope(instance.user_id)
+    )
+
+
+@receiver(post_save, sender=get_user_model())
+def user_saved(sender, instance, created, **kwargs):
+    """Make sure a new user never sees entries of a deleted one"""
+    if created:
+        response_cache.bump_version_on_commit(
+            response_cache.user_scope(instance.pk)
+        )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_links_changed(sender, instance, action, **kwargs):
+    """Invalidate the cached responses when tags or ingredients change"""
+    # instance is the recipe, or the tag/ingredient for reverse changes
+    if action.startswith('post_'):
+        response_cache.bump_version_on_commit(
+            response_cache.user_scope(instance.user_id)
+        )
+
+
+def bump_public():
+    response_cache.bump_version_on_commit(response_cache.PUBLIC_SCOPE)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def public_recipe_changed(sender, instance, **kwargs):
+    """Invalidate the public feed when a recipe in or leaving it changes"""
+    if instance.is_public or getattr(instance, '_was_public', False):
+        bump_public()
+    instance._was_public = bool(instance.is_public)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def public_name_changed(sender, instance, created=False, **kwargs):
+    """The public feed shows the names of the tags and ingredients"""
+    if not created and instance.recipe_set.filter(is_public=True).exists():
+        bump_public()
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def public_links_changed(sender, instance, action, reverse, pk_set,
+                         **kwargs):
+    if not reverse:
+        if action.startswith('post_') and instance.is_public:
+            bump_public()
+    elif action == 'pre_clear':
+        if instance.recipe_set.filter(is_public=True).exists():
+            bump_public()
+    elif action in ('post_add', 'post_remove'):
+        if Recipe.objects.filter(id__in=pk_set, is_public=True).exists():
+            bump_public()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_save, sender=Recipe)
+def record_upsert(sender, instance, **kwargs):
+    changes.record(instance.user_id, sender._meta.model_name, [instance.pk])
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+def record_delete(sender, instance, **kwargs):
+    changes.record(
+        instance.user_id, sender._meta.model_name, [instance.pk],
+        Change.DELETE
+    )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def record_links_changed(sender, instance, action, reverse, pk_set,
+                         **kwargs):
+    """Record the recipes whose tags or ingredients changed"""
+    if not reverse:
+        if action.startswith('post_'):
+            changes.record(instance.user_id, 'recipe', [instance.pk])
+    elif action == 'pre_clear':
+        # the links are gone after the clear
+        recipe_ids = instance.recipe_set.values_list('id', flat=True)
+        changes.record(instance.user_id, 'recipe', list(recipe_ids))
+    elif action in ('post_add', 'post_remove'):
+        changes.record(instance.user_id, 'recipe', sorted(pk_set))
+
+
+def update_index(user_id, func, *args):
+    """Update the recipe index once the change is committed"""
+    if settings.RECIPE_INDEX_ENABLED:
+        transaction.on_commit(
+            lambda: recipe_index.update(user_id, func, *args)
+        )
+
+
+@receiver(post_save, sender=Recipe)
+def index_recipe_saved(sender, instance, created, **kwargs):
+    if created:
+        update_index(instance.user_id, UserIndex.bit, instance.pk)
+
+
+@receiver(post_delete, sender=Recipe)
+def index_recipe_deleted(sender, instance, **kwargs):
+    update_index(instance.user_id, UserIndex.remove_recipe, instance.pk)
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def index_attr_deleted(sender, instance, **kwargs):
+    kind = TAGS if sender is Tag else INGREDIENTS
+    update_index(instance.user_id, UserIndex.remove_id, kind, instance.pk)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def index_links_changed(sender, instance, action, reverse, pk_set,
+                        **kwargs):
+    kind = TAGS if sender is Recipe.tags.through else INGREDIENTS
+    user_id = instance.user_id
+    if not reverse:
+        if action == 'post_add':
+            update_index(user_id, UserIndex.add_links, kind, instance.pk,
+                         set(pk_set))
+        elif action == 'post_remove':
+            update_index(user_id, UserIndex.remove_links, kind,
+                         instance.pk, set(pk_set))
+        elif action == 'post_clear':
+            update_index(user_id, UserIndex.remove_links, kind, instance.pk)
+    elif action in ('post_add', 'post_remove'):
+        func = (UserIndex.add_links if action == 'post_add'
+                else UserIndex.remove_links)
+        for recipe_id in pk_set:
+            update_index(user_id, func, kind, recipe_id, {instance.pk})
+    elif action == 'post_clear':
+        update_index(user_id, UserIndex.remove_id, kind, instance.pk)
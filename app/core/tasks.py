@@ -0,0 +1,28 @@
+"""The background jobs of the app (see core.jobs)."""
+from django.conf import settings
+
+from core import images
+from core.jobs import job
+from core.models import Recipe
+from core.purge import purge_user
+
+
+@job('purge_user')
+def purge_user_job(user_id):
+    """Delete a user and everything they own"""
+    return purge_user(user_id)
+
+
+@job('recipe_image_variants')
+def recipe_image_variants_job(recipe_id, image_name):
+    """Make the resized copies of a recipe image"""
+    recipe = Recipe.objects.filter(id=recipe_id, image=image_name).first()
+    if recipe is None:
+        # deleted, or the image was replaced since
+        return {'variants': 0}
+
+    variants = images.generate_variants(
+        recipe.image.path, settings.RECIPE_IMAGE_WIDTHS
+    )
+    images.store_variants(recipe_id, image_name, variants)
+    return {'variants': len(variants)}
@@ -9,6 +9,8 @@ from django.urls import reverse
 # application in our unit tests
 from django.test import Client
 
+from core.models import Recipe, Tag, Ingredient
+
 
 class AdminSiteTests(TestCase):
 
@@ -62,3 +64,99 @@ class AdminSiteTests(TestCase):
         res = self.client.get(url)
 
         self.assertEqual(res.status_code, 200)
+
+    def test_recipe_changelist_filtered_by_owner(self):
+        """Test that the recipe changelist can be scoped to one owner"""
+        Recipe.objects.create(
+            user=self.user, title='Own recipe', time_minutes=5, price=1.00
+        )
+        Recipe.objects.create(
+            user=self.admin_user, title='Admin recipe', time_minutes=5,
+            price=1.00
+        )
+        url = reverse('admin:core_recipe_changelist')
+
+        res = self.client.get(url, {'user': self.user.id})
+
+        self.assertEqual(res.status_code, 200)
+        self.assertContains(res, 'Own recipe')
+        self.assertNotContains(res, 'Admin recipe')
+
+    def test_recipe_change_page(self):
+        """Test that the recipe edit page works"""
+        recipe = Recipe.objects.create(
+            user=self.user, title='Own recipe', time_minutes=5, price=1.00
+        )
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        url = reverse('admin:core_recipe_change', args=[recipe.id])
+
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, 200)
+
+    def test_recipe_ingredients_saved_with_quantities(self):
+        """Test the ingredient inline saves the quantities"""
+        recipe = Recipe.objects.create(
+            user=self.user, title='Own recipe', time_minutes=5, price=1.00
+        )
+        flour = Ingredient.objects.create(user=self.user, name='Flour')
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        url = reverse('admin:core_recipe_change', args=[recipe.id])
+
+        res = self.client.post(url, {
+            'user': self.user.id, 'title': 'Own recipe', 'time_minutes': 5,
+            'price': '1.00', 'link': '', 'tags': [tag.id],
+            'recipe_ingredients-TOTAL_FORMS': 1,
+            'recipe_ingredients-INITIAL_FORMS': 0,
+            'recipe_ingredients-0-ingredient': flour.id,
+            'recipe_ingredients-0-quantity': '200',
+            'recipe_ingredients-0-unit': 'g',
+        })
+
+        self.assertEqual(res.status_code, 302)
+        link = recipe.recipe_ingredients.get()
+        self.assertEqual((link.ingredient, link.quantity, link.unit),
+                         (flour, 200, 'g'))
+
+    def test_tag_autocomplete_search(self):
+        """Test that tags can be searched by name prefix"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        Tag.objects.create(user=self.user, name='Dessert')
+        url = reverse('admin:core_tag_changelist')
+
+        res = self.client.get(url, {'q': 'Veg'})
+
+        self.assertContains(res, 'Vegan')
+        self.assertNotContains(res, 'Dessert')
+
+    def test_tag_search_ignores_case(self):
+        """Test the name prefix search is case insensitive"""
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.get(
+            reverse('admin:core_tag_changelist'), {'q': 'vEG'}
+        )
+
+        self.assertContains(res, 'Vegan')
+
+    def test_search_by_owner_email(self):
+        """Test the objects of a user can be found by their email"""
+        other = get_user_model().objects.create_user('other@ram.com', 'pass')
+        Recipe.objects.create(
+            user=self.user, title='Toast', time_minutes=2, price=1.00
+        )
+        Recipe.objects.create(
+            user=other, title='Pasta', time_minutes=20, price=4.00
+        )
+        url = reverse('admin:core_recipe_changelist')
+
+        res = self.client.get(url, {'q': ' ram@123.COM '})
+
+        self.assertContains(res, 'Toast')
+        self.assertNotContains(res, 'Pasta')
+
+        res = self.client.get(reverse('admin:core_user_changelist'), {
+            'q': 'other@ram.com'
+        })
+        self.assertContains(res, 'other@ram.com')
+        self.assertNotContains(res, 'ram@123.com')
@@ -0,0 +1,110 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.authentication import ExpiringTokenAuthentication
+from core.models import AuthToken, Recipe, Tag
+from core.throttling import get_store
+
+
+BATCH_URL = reverse('core:batch')
+
+
+class BatchApiTests(TestCase):
+    """Test running many requests with the batch endpoint"""
+
+    def setUp(self):
+        cache.clear()
+        get_store().clear()
+        self.user = get_user_model().objects.create_user(
+            'test@ram.com', 'testpass', name='Test'
+        )
+        self.token = AuthToken.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        Tag.objects.create(user=self.user, name='Vegan')
+
+    def batch(self, requests, **params):
+        return self.client.post(
+            BATCH_URL, dict(params, requests=requests), format='json'
+        )
+
+    def test_login_required(self):
+        """Test batches need authentication"""
+        res = APIClient().post(BATCH_URL, {'requests': []}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_home_screen_batch(self):
+        """Test the responses match the separate requests"""
+        paths = ['/api/user/me/', '/api/recipe/recipes/',
+                 '/api/recipe/tags/', '/api/recipe/ingredients/']
+
+        with patch.object(
+            ExpiringTokenAuthentication, 'authenticate_credentials',
+            wraps=ExpiringTokenAuthentication().authenticate_credentials
+        ) as authenticate:
+            res = self.batch([{'method': 'GET', 'path': p} for p in paths])
+
+        # the token is only checked once, for the batch request
+        self.assertEqual(authenticate.call_count, 1)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        for path, sub in zip(paths, res.data['responses']):
+            self.assertEqual(sub['status'], status.HTTP_200_OK)
+            self.assertEqual(sub['body'], self.client.get(path).json())
+
+    def test_query_string_and_unknown_path(self):
+        """Test query strings are passed on and unknown paths give a 404"""
+        res = self.batch([
+            {'method': 'GET', 'path': '/api/recipe/changes/?since=abc'},
+            {'method': 'GET', 'path': '/api/nothing-here/'},
+        ])
+
+        statuses = [sub['status'] for sub in res.data['responses']]
+        self.assertEqual(statuses, [400, 404])
+
+    def test_writes(self):
+        """Test sub-requests can create objects"""
+        res = self.batch([
+            {'method': 'POST', 'path': '/api/recipe/tags/',
+             'body': {'name': 'Dessert'}},
+            {'method': 'GET', 'path': '/api/recipe/tags/'},
+        ])
+
+        created, listed = res.data['responses']
+        self.assertEqual(created['status'], status.HTTP_201_CREATED)
+        self.assertEqual(len(listed['body']), 2)
+        self.assertFalse(res.data['rolled_back'])
+
+    def test_atomic_rolls_back(self):
+        """Test a failing request rolls back an atomic batch"""
+        res = self.batch([
+            {'method': 'POST', 'path': '/api/recipe/recipes/',
+             'body': {'title': 'Toast', 'time_minutes': 2, 'price': '1.00',
+                      'tags': [], 'ingredients': []}},
+            {'method': 'POST', 'path': '/api/recipe/tags/', 'body': {}},
+            {'method': 'POST', 'path': '/api/recipe/tags/',
+             'body': {'name': 'Never'}},
+        ], atomic=True)
+
+        self.assertTrue(res.data['rolled_back'])
+        statuses = [sub['status'] for sub in res.data['responses']]
+        self.assertEqual(statuses, [201, 400])
+        self.assertFalse(Recipe.objects.exists())
+        self.assertFalse(Tag.objects.filter(name='Never').exists())
+
+    @override_settings(BATCH_MAX_REQUESTS=2)
+    def test_limits(self):
+        """Test too many requests and nested batches are rejected"""
+        res = self.batch([{'method': 'GET', 'path': '/api/user/me/'}] * 3)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.batch([{'method': 'POST', 'path': '/api/batch/',
+                           'body': {'requests': []}}])
+        self.assertEqual(res.data['responses'][0]['status'], 400)
@@ -1,13 +1,20 @@
 # This allows us to mock the behaviour of the django get_database() function.
 # With this we can simulate database being available and not being available
 # whn we run our commands.
+from io import StringIO
 from unittest.mock import patch
 
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
+from django.core.management.base import CommandError
 # import this, that django throws when the database is not available.
 from django.db.utils import OperationalError
 from django.test import TestCase
 
+from core.management.commands.profile_startup import parse_importtime
+from core.models import Recipe, Tag, Ingredient
+from core.warmup import warm_up
+
 
 class CommandTest(TestCase):
 
@@ -28,3 +35,84 @@ class CommandTest(TestCase):
             call_command('wait_for_db')
 
             self.assertEqual(gi.call_count, 6)
+
+    def test_purge_user(self):
+        """Test purging a user deletes the user and all their data"""
+        user = get_user_model().objects.create_user('purge@ram.com', 'test')
+        other = get_user_model().objects.create_user('other@ram.com', 'test')
+        tag = Tag.objects.create(user=user, name='Vegan')
+        ingredient = Ingredient.objects.create(user=user, name='Salt')
+        for i in range(5):
+            recipe = Recipe.objects.create(
+                user=user, title='Recipe %d' % i, time_minutes=5, price=1.00
+            )
+            recipe.tags.add(tag)
+            recipe.add_ingredients(ingredient)
+        # a recipe of another user that links to the purged user's tag
+        other_recipe = Recipe.objects.create(
+            user=other, title='Other', time_minutes=5, price=1.00
+        )
+        other_recipe.tags.add(tag)
+
+        call_command('purge_user', 'purge@ram.com', chunk_size=2)
+
+        self.assertFalse(get_user_model().objects.filter(id=user.id).exists())
+        self.assertFalse(Recipe.objects.filter(user_id=user.id).exists())
+        self.assertFalse(Tag.objects.filter(user_id=user.id).exists())
+        self.assertFalse(Ingredient.objects.filter(user_id=user.id).exists())
+        self.assertTrue(Recipe.objects.filter(id=other_recipe.id).exists())
+        self.assertEqual(other_recipe.tags.count(), 0)
+
+    def test_purge_unknown_user(self):
+        """Test purging an unknown email raises an error"""
+        with self.assertRaises(CommandError):
+            call_command('purge_user', 'nobody@ram.com')
+
+    def test_fast_boot_skips_migrate_when_up_to_date(self):
+        """Test fast_boot doesn't run migrate without pending migrations"""
+        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi, \
+                patch('core.management.commands.fast_boot.MigrationExecutor'
+                      ) as executor:
+            gi.return_value = True
+            executor.return_value.migration_plan.return_value = []
+            with patch('core.management.commands.fast_boot.call_command',
+                       wraps=call_command) as cc:
+                call_command('fast_boot')
+
+        commands = [c[0][0] for c in cc.call_args_list]
+        self.assertEqual(commands, ['wait_for_db'])
+
+    def test_parse_importtime(self):
+        """Test parsing the output of python -X importtime"""
+        output = (
+            'import time: self [us] | cumulative | imported package\n'
+            'import time:       120 |        120 |   _io\n'
+            'import time:      2500 |       4000 | django.db\n'
+        )
+
+        modules = parse_importtime(output)
+
+        self.assertEqual(modules, [('_io', 0.12, 0.12),
+                                   ('django.db', 2.5, 4.0)])
+
+    def test_warm_up(self):
+        """Test warming the resolver and serializer caches"""
+        warm_up()
+
+    def test_bench_cookable(self):
+        """Test the cookable benchmark runs and leaves no data behind"""
+        out = StringIO()
+        call_command('bench_cookable', recipes=50, ingredients=20,
+                     per_recipe=3, have=5, runs=1, stdout=out)
+
+        self.assertIn('cookable: best', out.getvalue())
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bench_list_serializers(self):
+        """Test the list benchmark runs and leaves no data behind"""
+        out = StringIO()
+        call_command('bench_list_serializers', recipes=20, runs=1,
+                     stdout=out)
+
+        self.assertIn('same', out.getvalue())
+        self.assertFalse(Recipe.objects.exists())
@@ -0,0 +1,51 @@
+import gzip
+
+from django.http import HttpResponse
+from django.test import TestCase, RequestFactory, override_settings
+
+from core import compression
+from core.middleware import CompressionMiddleware
+
+
+@override_settings(COMPRESSION_MIN_SIZE=100)
+class CompressionTests(TestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def get(self, content, **headers):
+        middleware = CompressionMiddleware(lambda request: HttpResponse(
+            content, content_type='application/json'
+        ))
+        return middleware(self.factory.get('/', **headers))
+
+    def test_negotiate(self):
+        """Test picking the encoding from the Accept-Encoding header"""
+        self.assertEqual(compression.negotiate('gzip, deflate'), 'gzip')
+        self.assertEqual(compression.negotiate('*'), 'gzip')
+        self.assertIsNone(compression.negotiate('gzip;q=0, identity'))
+        self.assertIsNone(compression.negotiate(''))
+
+    def test_large_response_compressed(self):
+        """Test that responses over the threshold are gzipped"""
+        content = b'{"title": "Sample recipe"}' * 20
+
+        res = self.get(content, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertEqual(res['Content-Length'], str(len(res.content)))
+        self.assertIn('Accept-Encoding', res['Vary'])
+        self.assertEqual(gzip.decompress(res.content), content)
+
+    def test_small_response_not_compressed(self):
+        """Test that responses under the threshold are sent as they are"""
+        res = self.get(b'{}', HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertFalse(res.has_header('Content-Encoding'))
+        self.assertEqual(res.content, b'{}')
+
+    def test_not_compressed_when_not_accepted(self):
+        """Test that clients not accepting gzip get plain responses"""
+        res = self.get(b'{"title": "Sample recipe"}' * 20)
+
+        self.assertFalse(res.has_header('Content-Encoding'))
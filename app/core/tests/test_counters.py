@@ -0,0 +1,79 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+
+from core import counters
+from core.models import Recipe, RecipeActivity
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class ViewCounterTests(TestCase):
+    """Test the write-behind counting of recipe views"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@ram.com', 'testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=10, price=5
+        )
+        self.addCleanup(counters.views.flush)
+
+    def views(self, recipe):
+        activity = RecipeActivity.objects.filter(recipe=recipe).first()
+        return activity.views if activity else 0
+
+    # buffered, but without a thread flushing into the other tests
+    @override_settings(VIEW_COUNTER_FLUSH_INTERVAL=60)
+    @patch.object(counters.ViewCounter, '_start_thread')
+    def test_views_buffered_until_flush(self, start_thread):
+        """Test views are only written, added up, when flushed"""
+        self.client.get(detail_url(self.recipe.id))
+        self.client.get(detail_url(self.recipe.id))
+        self.assertEqual(self.views(self.recipe), 0)
+
+        # two lookups and the insert (in a savepoint)
+        with self.assertNumQueries(5):
+            self.assertEqual(counters.views.flush(), 1)
+        self.assertEqual(self.views(self.recipe), 2)
+
+        self.client.get(detail_url(self.recipe.id))
+        counters.views.flush()
+        self.assertEqual(self.views(self.recipe), 3)
+
+    @override_settings(VIEW_COUNTER_FLUSH_INTERVAL=0)
+    def test_views_written_right_away(self):
+        """Test every view is written without a flush interval"""
+        self.client.get(detail_url(self.recipe.id))
+
+        self.assertEqual(self.views(self.recipe), 1)
+
+    def test_write_views_batches(self):
+        """Test one update per delta, skipping deleted recipes"""
+        other = Recipe.objects.create(
+            user=self.user, title='Stew', time_minutes=10, price=5
+        )
+        today = timezone.now().date()
+        counters.write_views({(self.recipe.id, today): 1})
+        counters.write_views({(other.id, today): 1})
+
+        with self.assertNumQueries(3):
+            counters.write_views({
+                (self.recipe.id, today): 2,
+                (other.id, today): 2,
+                (other.id + 1, today): 5,
+            })
+
+        self.assertEqual(self.views(self.recipe), 3)
+        self.assertEqual(self.views(other), 3)
+        self.assertEqual(RecipeActivity.objects.count(), 2)
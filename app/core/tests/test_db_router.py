@@ -0,0 +1,170 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import router
+from django.test import TestCase, RequestFactory, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.authentication import ExpiringTokenAuthentication
+from core.db_router import route_user, use_replica
+from core.middleware import ReplicaRoutingMiddleware
+from core.models import AuthToken, Recipe
+from recipe.views import RecipeViewSet
+
+
+TOKEN_URL = reverse('user:token')
+ME_URL = reverse('user:me')
+ROTATE_URL = reverse('user:token-rotate')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def other_view(request):
+    """A view outside of the recipe and user apps"""
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class PrimaryReplicaRouterTests(TestCase):
+
+    def test_reads_use_primary_by_default(self):
+        """Test that reads outside of requests go to the primary"""
+        self.assertEqual(router.db_for_read(Recipe), 'default')
+
+    def test_reads_use_replica_when_enabled(self):
+        """Test reads go to the replica and writes to the primary"""
+        with use_replica():
+            self.assertEqual(router.db_for_read(Recipe), 'replica')
+            self.assertEqual(router.db_for_write(Recipe), 'default')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas_configured(self):
+        """Test that everything uses the primary without replicas"""
+        with use_replica():
+            self.assertEqual(router.db_for_read(Recipe), 'default')
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingMiddlewareTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.view = RecipeViewSet.as_view({'get': 'list', 'post': 'create'})
+        self.middleware = ReplicaRoutingMiddleware(self.get_response)
+
+    def get_response(self, request):
+        """Record where the view would read from"""
+        self.middleware.process_view(request, self.view, (), {})
+        self.read_db = router.db_for_read(Recipe)
+        return None
+
+    def request(self, method, token='Token abc', address='10.0.0.1',
+                user=None):
+        request = getattr(self.factory, method)(
+            '/api/recipe/recipes/', HTTP_AUTHORIZATION=token,
+            REMOTE_ADDR=address
+        )
+        if user is not None:
+            # what DRF sets once the request is authenticated
+            request.user = user
+        self.middleware(request)
+        return self.read_db
+
+    def test_safe_request_reads_from_replica(self):
+        """Test GET requests of the recipe views read from the replica"""
+        self.assertEqual(self.request('get'), 'replica')
+        # the routing is reset after the request
+        self.assertEqual(router.db_for_read(Recipe), 'default')
+
+    def test_write_request_uses_primary(self):
+        """Test that writes read from the primary"""
+        self.assertEqual(self.request('post'), 'default')
+
+    def test_reads_pinned_to_primary_after_write(self):
+        """Test the client reads its own writes from the primary"""
+        self.request('post')
+
+        self.assertEqual(self.request('get'), 'default')
+        # other clients still read from the replica
+        self.assertEqual(
+            self.request('get', 'Token other', '10.0.0.2'), 'replica'
+        )
+
+    def test_pin_kept_when_token_changes(self):
+        """Test a login (or token rotation) pins the requests after it"""
+        self.request('post', token='')
+
+        self.assertEqual(self.request('get', 'Token new'), 'default')
+
+    def test_authenticated_writes_pin_the_user(self):
+        """Test a user's write doesn't pin everyone at the same address"""
+        user = get_user_model().objects.create_user('test@ram.com', 'pass')
+        self.request('post', user=user)
+
+        self.assertEqual(self.request('get', 'Token other'), 'replica')
+        with use_replica():
+            route_user(user.pk)
+            self.assertEqual(router.db_for_read(Recipe), 'default')
+        with use_replica():
+            route_user(user.pk + 1)
+            self.assertEqual(router.db_for_read(Recipe), 'replica')
+
+    def test_other_views_use_primary(self):
+        """Test only the listed view modules read from the replica"""
+        self.view = other_view
+
+        self.assertEqual(self.request('get'), 'default')
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReadYourLoginTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_get_right_after_login(self):
+        """Test the new token works on the request right after the login"""
+        get_user_model().objects.create_user('test@ram.com', 'testpass')
+        client = APIClient()
+        res = client.post(TOKEN_URL, {
+            'email': 'test@ram.com', 'password': 'testpass'
+        })
+        client.credentials(HTTP_AUTHORIZATION='Token ' + res.data['token'])
+
+        # the replica alias isn't configured, reading from it would fail
+        res = client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], 'test@ram.com')
+
+    def test_get_right_after_token_rotation(self):
+        """Test the rotated token reads the user's writes from the primary"""
+        get_user_model().objects.create_user('test@ram.com', 'testpass')
+        client = APIClient()
+        res = client.post(TOKEN_URL, {
+            'email': 'test@ram.com', 'password': 'testpass'
+        })
+        client.credentials(HTTP_AUTHORIZATION='Token ' + res.data['token'])
+        # the pin of the login is gone
+        cache.clear()
+
+        res = client.post(ROTATE_URL)
+        client.credentials(HTTP_AUTHORIZATION='Token ' + res.data['token'])
+        res = client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_token_looked_up_on_primary(self):
+        """Test tokens are found even when the reads use a replica"""
+        user = get_user_model().objects.create_user('test@ram.com', 'pass')
+        token = AuthToken.objects.create(user=user)
+
+        with use_replica():
+            authenticated, _ = (
+                ExpiringTokenAuthentication().authenticate_credentials(
+                    token.key
+                )
+            )
+
+        self.assertEqual(authenticated, user)
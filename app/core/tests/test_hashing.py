@@ -0,0 +1,135 @@
+import threading
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import hashing
+from core.hashers import CalibratedPBKDF2PasswordHasher
+from core.throttling import get_store
+
+
+TOKEN_URL = reverse('user:token')
+
+
+class HashingGateTests(TestCase):
+    """Test the cap on concurrent password hashing"""
+
+    def test_busy_when_no_slot_frees_up(self):
+        """Test waiting for a slot past the timeout raises HashingBusy"""
+        gate = hashing.HashingGate(limit=1, timeout=0.01)
+        holding = threading.Event()
+        release = threading.Event()
+
+        def hold():
+            with gate.slot():
+                holding.set()
+                release.wait(5)
+
+        thread = threading.Thread(target=hold)
+        thread.start()
+        holding.wait(5)
+        try:
+            with self.assertRaises(hashing.HashingBusy):
+                with gate.slot():
+                    pass
+        finally:
+            release.set()
+            thread.join()
+
+        # the slot is free again
+        with gate.slot():
+            pass
+
+    @override_settings(PASSWORD_HASH_ITERATIONS=1000)
+    def test_hasher_uses_setting(self):
+        """Test the hasher takes its iterations from the settings"""
+        hasher = CalibratedPBKDF2PasswordHasher()
+        encoded = hasher.encode('testpass', hasher.salt())
+
+        self.assertTrue(encoded.startswith('pbkdf2_sha256$1000$'))
+        self.assertTrue(hasher.verify('testpass', encoded))
+
+
+@override_settings(LOGIN_BACKOFF_FREE_ATTEMPTS=2)
+class LoginBackoffTests(TestCase):
+    """Test failed logins slow down further attempts for the email"""
+
+    def setUp(self):
+        cache.clear()
+        get_store().clear()
+        self.payload = {'email': 'test@ram.com', 'password': 'testpass'}
+        get_user_model().objects.create_user(**self.payload)
+        self.client = APIClient()
+
+    def fail_login(self):
+        return self.client.post(
+            TOKEN_URL, dict(self.payload, password='wrong')
+        )
+
+    def test_backoff_after_failed_logins(self):
+        """Test the email is throttled once the free attempts are used up"""
+        for _ in range(2):
+            res = self.fail_login()
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.post(TOKEN_URL, self.payload)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', res)
+
+    def test_backoff_is_per_email(self):
+        """Test other emails can still log in"""
+        get_user_model().objects.create_user('other@ram.com', 'testpass')
+        for _ in range(2):
+            self.fail_login()
+
+        res = self.client.post(
+            TOKEN_URL, {'email': 'OTHER@ram.com ', 'password': 'testpass'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.client.post(
+            TOKEN_URL, {'email': 'other@ram.com', 'password': 'testpass'}
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_success_resets_failures(self):
+        """Test a successful login forgets the earlier failures"""
+        self.fail_login()
+        res = self.client.post(TOKEN_URL, self.payload)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        self.fail_login()
+        res = self.client.post(TOKEN_URL, self.payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_busy_gate_returns_503(self):
+        """Test logins get a 503 when no hashing slot frees up in time"""
+        gate = hashing.HashingGate(limit=1, timeout=0)
+        with gate.slot():
+            hashing._gate, previous = gate, hashing._gate
+            try:
+                res = self.client.post(TOKEN_URL, self.payload)
+            finally:
+                hashing._gate = previous
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertIn('Retry-After', res)
+
+
+class CalibrateHasherTests(TestCase):
+
+    def test_calibrate_hasher(self):
+        """Test the command suggests a number of iterations"""
+        out = StringIO()
+        call_command('calibrate_hasher', target_ms=5, samples=1, stdout=out)
+
+        self.assertIn('PASSWORD_HASH_ITERATIONS=', out.getvalue())
@@ -0,0 +1,114 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import IdempotencyKey, Recipe, Tag
+
+
+TAGS_URL = reverse('recipe:tag-list')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class IdempotencyKeyTests(TestCase):
+    """Test replaying create requests sent with an Idempotency-Key"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@ram.com', 'testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post(self, url, data, key='key-1'):
+        return self.client.post(url, data, format='json',
+                                HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_response(self):
+        """Test a retry gets the first response and creates nothing"""
+        first = self.post(TAGS_URL, {'name': 'Vegan'})
+
+        with self.assertNumQueries(1):
+            retry = self.post(TAGS_URL, {'name': 'Vegan'})
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Tag.objects.count(), 1)
+
+    def test_recipe_retry(self):
+        """Test recipe creates are replayed too"""
+        payload = {'title': 'Soup', 'time_minutes': 10, 'price': '5.00',
+                   'tags': [], 'ingredients': []}
+        first = self.post(RECIPES_URL, payload)
+        retry = self.post(RECIPES_URL, payload)
+
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(Recipe.objects.count(), 1)
+
+    def test_without_key(self):
+        """Test requests without a key aren't deduplicated"""
+        self.client.post(TAGS_URL, {'name': 'Vegan'})
+        self.client.post(TAGS_URL, {'name': 'Vegan'})
+
+        self.assertEqual(Tag.objects.count(), 2)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_other_request_rejected(self):
+        """Test a key can't be reused for a different request"""
+        self.post(TAGS_URL, {'name': 'Vegan'})
+
+        res = self.post(TAGS_URL, {'name': 'Dessert'})
+
+        self.assertEqual(res.status_code,
+                         status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(Tag.objects.count(), 1)
+
+    def test_failed_request_not_stored(self):
+        """Test a failed create can be fixed and sent with the same key"""
+        res = self.post(TAGS_URL, {'name': ''})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.post(TAGS_URL, {'name': 'Vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Tag.objects.count(), 1)
+
+    def test_keys_are_per_user(self):
+        """Test the same key of another user is another request"""
+        self.post(TAGS_URL, {'name': 'Vegan'})
+        other = get_user_model().objects.create_user(
+            'other@ram.com', 'testpass'
+        )
+        self.client.force_authenticate(other)
+
+        res = self.post(TAGS_URL, {'name': 'Vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Tag.objects.count(), 2)
+
+    def test_expired_key_reused(self):
+        """Test an expired key creates again, and is pruned"""
+        self.post(TAGS_URL, {'name': 'Vegan'})
+        IdempotencyKey.objects.update(
+            expires=timezone.now() - timedelta(seconds=1)
+        )
+
+        self.post(TAGS_URL, {'name': 'Vegan'})
+        self.assertEqual(Tag.objects.count(), 2)
+
+        IdempotencyKey.objects.update(
+            expires=timezone.now() - timedelta(seconds=1)
+        )
+        out = StringIO()
+        call_command('prune_idempotency_keys', stdout=out)
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.assertIn('Deleted 1 expired', out.getvalue())
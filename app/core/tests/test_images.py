@@ -0,0 +1,59 @@
+import json
+import os
+import tempfile
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from core import images
+from core.models import Recipe
+
+
+class ImageVariantTests(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.media_root.name, 'recipe.png')
+        Image.new('RGBA', (800, 400)).save(self.path)
+
+    def tearDown(self):
+        self.media_root.cleanup()
+
+    def test_generate_variants(self):
+        """Test resized copies are made for widths smaller than the image"""
+        variants = images.generate_variants(self.path, (1280, 160, 320))
+
+        self.assertEqual(
+            [(v['width'], v['height']) for v in variants],
+            [(160, 80), (320, 160), (800, 400)]
+        )
+        for variant in variants:
+            self.assertTrue(os.path.exists(variant['path']))
+
+    def test_pick_variant(self):
+        """Test picking the smallest variant that is wide enough"""
+        variants = [{'width': 160}, {'width': 320}, {'width': 800}]
+
+        self.assertEqual(images.pick_variant(variants, 200)['width'], 320)
+        self.assertEqual(images.pick_variant(variants, 0)['width'], 160)
+        self.assertEqual(images.pick_variant(variants, 2000)['width'], 800)
+
+    def test_store_variants(self):
+        """Test the variants are saved on the recipe relative to the media"""
+        user = get_user_model().objects.create_user('test@ram.com', 'pass')
+        recipe = Recipe.objects.create(
+            user=user, title='Toast', time_minutes=2, price=1.00,
+            image='recipe.png'
+        )
+        variants = images.generate_variants(self.path, (160,))
+
+        with override_settings(MEDIA_ROOT=self.media_root.name):
+            images.store_variants(recipe.id, 'recipe.png', variants)
+
+        recipe.refresh_from_db()
+        self.assertEqual(
+            [v['name'] for v in json.loads(recipe.image_variants)],
+            ['recipe_160.jpg', 'recipe.png']
+        )
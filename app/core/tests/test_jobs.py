@@ -0,0 +1,173 @@
+import os
+import tempfile
+from io import StringIO
+from datetime import timedelta
+from unittest.mock import patch
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import jobs
+from core.models import Job, Recipe
+
+
+calls = []
+
+
+@jobs.job('test_add')
+def add_job(a, b):
+    calls.append((a, b))
+    return a + b
+
+
+@jobs.job('test_fail')
+def fail_job():
+    raise RuntimeError('broken')
+
+
+def job_url(job_id):
+    return reverse('core:job', args=[job_id])
+
+
+class JobTests(TestCase):
+
+    def setUp(self):
+        del calls[:]
+
+    def test_run_job(self):
+        """Test a queued job is run once and its result saved"""
+        job = jobs.enqueue('test_add', a=1, b=2)
+
+        call_command('run_workers', burst=True, stdout=StringIO())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(job.result, '3')
+        self.assertEqual(calls, [(1, 2)])
+
+    def test_job_not_run_before_run_at(self):
+        """Test jobs scheduled in the future are left alone"""
+        jobs.enqueue(
+            'test_add', run_at=timezone.now() + timedelta(hours=1), a=1, b=2
+        )
+
+        self.assertEqual(jobs.run_worker(burst=True), 0)
+
+    @override_settings(JOB_RETRY_DELAY=10)
+    @patch('core.jobs.logger')
+    def test_failed_job_retried_with_backoff(self, logger):
+        """Test a failing job is queued again later"""
+        job = jobs.enqueue('test_fail')
+        before = timezone.now()
+
+        jobs.run_worker(burst=True)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.attempts, 1)
+        self.assertIn('RuntimeError', job.last_error)
+        self.assertGreaterEqual(job.run_at, before + timedelta(seconds=10))
+
+    @patch('core.jobs.logger')
+    def test_job_failed_after_max_attempts(self, logger):
+        """Test a job that keeps failing is marked as failed"""
+        job = jobs.enqueue('test_fail')
+        Job.objects.filter(pk=job.pk).update(attempts=4, max_attempts=5)
+
+        jobs.run_worker(burst=True)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 5)
+
+    def test_lost_job_claimed_again(self):
+        """Test jobs whose worker died are run again after the lease"""
+        job = jobs.enqueue('test_add', a=2, b=2)
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.RUNNING,
+            locked_until=timezone.now() - timedelta(seconds=1)
+        )
+
+        jobs.run_worker(burst=True)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+
+    def test_retry_delay(self):
+        """Test the retry delay doubles up to the maximum"""
+        with self.settings(JOB_RETRY_DELAY=10, JOB_RETRY_MAX_DELAY=60):
+            delays = [jobs.retry_delay(n) for n in range(1, 6)]
+
+        self.assertEqual(delays, [10, 20, 40, 60, 60])
+
+    def test_recipe_image_variants_job(self):
+        """Test the image job saves the variants on the recipe"""
+        user = get_user_model().objects.create_user('test@ram.com', 'pass')
+        with tempfile.TemporaryDirectory() as media_root, \
+                override_settings(MEDIA_ROOT=media_root,
+                                  RECIPE_IMAGE_WIDTHS=(100,)):
+            Image.new('RGB', (400, 200)).save(
+                os.path.join(media_root, 'recipe.jpg')
+            )
+            recipe = Recipe.objects.create(
+                user=user, title='Toast', time_minutes=2, price=1.00,
+                image='recipe.jpg'
+            )
+            jobs.enqueue(
+                'recipe_image_variants', recipe_id=recipe.id,
+                image_name='recipe.jpg'
+            )
+
+            jobs.run_worker(burst=True)
+
+        recipe.refresh_from_db()
+        self.assertEqual(
+            [v['width'] for v in recipe.get_image_variants()], [100, 400]
+        )
+
+
+class JobStatusApiTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@ram.com', 'testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_job_status(self):
+        """Test the user can follow their jobs"""
+        job = jobs.enqueue('test_add', user=self.user, a=1, b=2)
+
+        res = self.client.get(job_url(job.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['status'], Job.QUEUED)
+
+    def test_job_status_limited_to_user(self):
+        """Test the jobs of other users can't be seen"""
+        other = get_user_model().objects.create_user('other@ram.com', 'pass')
+        job = jobs.enqueue('test_add', user=other, a=1, b=2)
+
+        res = self.client.get(job_url(job.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    @patch('core.jobs.logger')
+    def test_failed_job_status(self, logger):
+        """Test a failed job shows up as failed"""
+        job = jobs.enqueue('test_fail', user=self.user)
+        Job.objects.filter(pk=job.pk).update(max_attempts=1)
+
+        jobs.run_worker(burst=True)
+        res = self.client.get(job_url(job.id))
+
+        self.assertEqual(res.data['status'], Job.FAILED)
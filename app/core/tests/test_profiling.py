@@ -0,0 +1,91 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.middleware import parse_profile_file_name
+
+
+TAGS_URL = reverse('recipe:tag-list')
+
+
+class ProfilingMiddlewareTests(TestCase):
+    """Test capturing and summarizing request profiles"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.settings = override_settings(PROFILE_DIR=self.directory.name)
+        self.settings.enable()
+        self.addCleanup(self.settings.disable)
+
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user(
+            'test@ram.com', 'testpass'
+        ))
+
+    def profiles(self):
+        return sorted(os.listdir(self.directory.name))
+
+    def test_off_by_default(self):
+        """Test nothing is profiled without a rate, pattern or secret"""
+        self.client.get(TAGS_URL)
+
+        self.assertEqual(self.profiles(), [])
+
+    @override_settings(PROFILE_SAMPLE_RATE=1)
+    def test_sampled_requests_profiled(self):
+        """Test profiles are named after the route and duration"""
+        self.client.get(TAGS_URL)
+
+        profiles = self.profiles()
+        self.assertEqual(len(profiles), 1)
+        route, elapsed = parse_profile_file_name(profiles[0])
+        self.assertEqual(route, 'recipe.tag-list')
+        self.assertGreaterEqual(elapsed, 0)
+
+    @override_settings(PROFILE_PATH_PATTERN=r'^/api/recipe/ingredients/')
+    def test_path_pattern(self):
+        """Test the requests with matching paths are profiled"""
+        self.client.get(TAGS_URL)
+        self.client.get(reverse('recipe:ingredient-list'))
+
+        self.assertEqual(len(self.profiles()), 1)
+
+    @override_settings(PROFILE_HEADER_SECRET='s3cret')
+    def test_header_secret(self):
+        """Test requests sending the secret header are profiled"""
+        self.client.get(TAGS_URL, HTTP_X_PROFILE='wrong')
+        self.assertEqual(self.profiles(), [])
+
+        self.client.get(TAGS_URL, HTTP_X_PROFILE='s3cret')
+        self.assertEqual(len(self.profiles()), 1)
+
+    @override_settings(PROFILE_SAMPLE_RATE=1, PROFILE_MAX_FILES=2)
+    def test_rotation(self):
+        """Test only the newest profiles are kept"""
+        for _ in range(4):
+            self.client.get(TAGS_URL)
+
+        self.assertEqual(len(self.profiles()), 2)
+
+    @override_settings(PROFILE_SAMPLE_RATE=1)
+    def test_profile_summary(self):
+        """Test the summary lists the top functions per route"""
+        self.client.get(TAGS_URL)
+        self.client.get(TAGS_URL)
+        self.client.get(reverse('recipe:ingredient-list'))
+        out = StringIO()
+
+        call_command('profile_summary', top=5, stdout=out)
+
+        output = out.getvalue()
+        self.assertIn('recipe.tag-list: 2 profiles', output)
+        self.assertIn('recipe.ingredient-list: 1 profiles', output)
+        self.assertIn('get_response', output)
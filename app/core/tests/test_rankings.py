@@ -0,0 +1,101 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from core import rankings
+from core.models import Recipe, RecipeActivity, RankedRecipe, SavedRecipe
+
+
+def sample_recipe(user, **params):
+    defaults = {'title': 'Sample recipe', 'time_minutes': 10, 'price': 5.00,
+                'is_public': True}
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class RankingsTests(TestCase):
+    """Test the precomputed recipe rankings"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@ram.com', 'testpass'
+        )
+        self.today = timezone.now().date()
+
+    def ranked(self, ranking):
+        return list(
+            RankedRecipe.objects.filter(ranking=ranking)
+            .order_by('rank').values_list('recipe_id', flat=True)
+        )
+
+    def test_record_activity_adds_up(self):
+        """Test the counters of a day are incremented in place"""
+        recipe = sample_recipe(self.user)
+
+        rankings.record_activity(recipe.id, views=2)
+        rankings.record_activity(recipe.id, views=1, saves=1)
+
+        activity = RecipeActivity.objects.get(recipe=recipe)
+        self.assertEqual((activity.views, activity.saves), (3, 1))
+
+    def test_trending_decays(self):
+        """Test older activity counts less than recent activity"""
+        old = sample_recipe(self.user)
+        new = sample_recipe(self.user)
+        rankings.record_activity(
+            old.id, views=30, day=self.today - timedelta(days=6)
+        )
+        rankings.record_activity(new.id, views=10)
+
+        scores = rankings.trending_scores(10, self.today)
+
+        self.assertEqual([s[0] for s in scores], [new.id, old.id])
+        self.assertAlmostEqual(scores[0][1], 10)
+        self.assertAlmostEqual(scores[1][1], 30 * 0.5 ** 3)
+
+    def test_refresh(self):
+        """Test refreshing replaces the rankings of the public recipes"""
+        saved = sample_recipe(self.user)
+        viewed = sample_recipe(self.user)
+        private = sample_recipe(self.user, is_public=False)
+        SavedRecipe.objects.create(user=self.user, recipe=saved)
+        rankings.record_activity(viewed.id, views=10)
+        rankings.record_activity(saved.id, saves=1)
+        rankings.record_activity(private.id, views=100)
+        RankedRecipe.objects.create(
+            ranking=RankedRecipe.TRENDING, rank=1, recipe=private, score=1
+        )
+
+        counts = rankings.refresh()
+
+        self.assertEqual(counts, {'trending': 2, 'saved': 1})
+        self.assertEqual(
+            self.ranked(RankedRecipe.TRENDING), [viewed.id, saved.id]
+        )
+        self.assertEqual(self.ranked(RankedRecipe.SAVED), [saved.id])
+
+    def test_refresh_drops_old_activity(self):
+        """Test activity older than the trending window is dropped"""
+        recipe = sample_recipe(self.user)
+        rankings.record_activity(
+            recipe.id, views=1, day=self.today - timedelta(days=30)
+        )
+
+        rankings.refresh()
+
+        self.assertFalse(RecipeActivity.objects.exists())
+
+    def test_refresh_rankings_command(self):
+        """Test the command refreshes the rankings"""
+        recipe = sample_recipe(self.user)
+        rankings.record_activity(recipe.id, views=1)
+        out = StringIO()
+
+        call_command('refresh_rankings', limit=5, stdout=out)
+
+        self.assertEqual(self.ranked(RankedRecipe.TRENDING), [recipe.id])
+        self.assertIn('Ranked 1 recipes for trending', out.getvalue())
@@ -0,0 +1,102 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import recipe_index
+from core.models import Recipe, Tag, Ingredient
+from core.purge import delete_recipes
+from core.recipe_index import TAGS, INGREDIENTS
+
+
+def conditions(kind, all_of=(), any_of=(), none_of=()):
+    return {kind: (all_of, any_of, none_of)}
+
+
+# the index is updated once changes commit, so this needs real transactions
+@override_settings(RECIPE_INDEX_ENABLED=True)
+class RecipeIndexTests(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+        recipe_index.clear()
+        self.user = get_user_model().objects.create_user(
+            'test@ram.com', 'testpass'
+        )
+        self.garlic = Ingredient.objects.create(user=self.user, name='Garlic')
+        self.nuts = Ingredient.objects.create(user=self.user, name='Nuts')
+        self.pesto = self.recipe('Pesto', self.garlic, self.nuts)
+        self.bread = self.recipe('Garlic bread', self.garlic)
+
+    def recipe(self, title, *ingredients):
+        recipe = Recipe.objects.create(
+            user=self.user, title=title, time_minutes=10, price=5
+        )
+        recipe.add_ingredients(*ingredients)
+        return recipe
+
+    def query(self, **params):
+        return sorted(recipe_index.query(
+            self.user.pk, conditions(INGREDIENTS, **params)
+        ))
+
+    def test_queries(self):
+        """Test the AND, OR and NOT queries"""
+        self.assertEqual(self.query(all_of=[self.garlic.id]),
+                         sorted([self.pesto.id, self.bread.id]))
+        self.assertEqual(
+            self.query(all_of=[self.garlic.id, self.nuts.id]), [self.pesto.id]
+        )
+        self.assertEqual(self.query(none_of=[self.nuts.id]), [self.bread.id])
+        self.assertEqual(self.query(any_of=[12345]), [])
+
+    @override_settings(RECIPE_INDEX_MAX_IDS=1)
+    def test_many_matches_filtered_by_joins(self):
+        """Test the filter falls back to the joins for long id lists"""
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        res = client.get(reverse('recipe:recipe-list'), {
+            'ingredients': str(self.garlic.id)
+        })
+
+        self.assertEqual(
+            sorted(recipe['id'] for recipe in res.json()),
+            sorted([self.pesto.id, self.bread.id])
+        )
+
+    def test_updated_without_rebuild(self):
+        """Test committed changes are applied to the warm index"""
+        self.query(all_of=[self.garlic.id])
+        soup = self.recipe('Soup', self.garlic)
+        self.pesto.remove_ingredients(self.garlic)
+        self.bread.delete()
+        tag = Tag.objects.create(user=self.user, name='Hot')
+        tag.recipe_set.add(soup)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.query(all_of=[self.garlic.id]), [soup.id])
+            self.assertEqual(
+                recipe_index.query(self.user.pk, conditions(
+                    TAGS, all_of=[tag.id]
+                )),
+                [soup.id]
+            )
+
+    def test_rebuilt_after_missed_change(self):
+        """Test changes the index didn't see (raw deletes) force a rebuild"""
+        self.query(all_of=[self.garlic.id])
+        delete_recipes(Recipe.objects.filter(id=self.pesto.id))
+
+        self.assertEqual(self.query(all_of=[self.garlic.id]), [self.bread.id])
+
+    @override_settings(RECIPE_INDEX_MAX_USERS=1)
+    def test_least_recently_used_evicted(self):
+        """Test only the most recently used indexes are kept"""
+        other = get_user_model().objects.create_user('o@ram.com', 'pass')
+        self.query()
+        recipe_index.query(other.pk, {})
+
+        self.assertEqual(list(recipe_index._indexes), [other.pk])
@@ -0,0 +1,107 @@
+import gzip
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from core import response_cache
+
+
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+@override_settings(COMPRESSION_MIN_SIZE=10)
+class ResponseCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'test@ram.com', 'testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        Recipe.objects.create(
+            user=self.user, title='Toast', time_minutes=2, price=1.00
+        )
+
+    def test_list_served_from_cache(self):
+        """Test that a repeated list request doesn't query the recipes"""
+        first = self.client.get(RECIPE_URL)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(RECIPE_URL)
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.content, first.content)
+
+    def test_compressed_bytes_cached(self):
+        """Test that the compressed response is cached and replayed"""
+        first = self.client.get(RECIPE_URL, HTTP_ACCEPT_ENCODING='gzip')
+        second = self.client.get(RECIPE_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(first['Content-Encoding'], 'gzip')
+        self.assertEqual(second['Content-Encoding'], 'gzip')
+        self.assertEqual(second.content, first.content)
+        self.assertIn(b'Toast', gzip.decompress(second.content))
+
+    def test_cache_invalidated_on_change(self):
+        """Test that changes of the user's data are seen right away"""
+        self.client.get(RECIPE_URL)
+        recipe = Recipe.objects.create(
+            user=self.user, title='Pasta', time_minutes=20, price=4.00
+        )
+
+        res = self.client.get(RECIPE_URL)
+        self.assertContains(res, 'Pasta')
+
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Italian'))
+        res = self.client.get(RECIPE_URL)
+        pasta = next(r for r in res.json() if r['title'] == 'Pasta')
+        self.assertIn(recipe.tags.get().id, pasta['tags'])
+
+    def test_cache_not_shared_between_users(self):
+        """Test that users never see the cached list of another user"""
+        self.client.get(RECIPE_URL)
+        other = get_user_model().objects.create_user('other@ram.com', 'pass')
+        self.client.force_authenticate(other)
+
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.json(), [])
+
+    def test_equal_versions_not_shared_between_users(self):
+        """Test that users with the same cache version get their own lists"""
+        other = get_user_model().objects.create_user('other@ram.com', 'pass')
+        for user in (self.user, other):
+            cache.set(
+                response_cache.VERSION_KEY_FORMAT %
+                response_cache.user_scope(user.pk), 1000, None
+            )
+        self.client.get(RECIPE_URL)
+        self.client.force_authenticate(other)
+
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.json(), [])
+
+
+class ResponseCacheCommitTests(TransactionTestCase):
+
+    def test_version_bumped_again_on_commit(self):
+        """Test lists cached before a change commits aren't served after"""
+        user = get_user_model().objects.create_user('test@ram.com', 'pass')
+        scope = response_cache.user_scope(user.pk)
+        with transaction.atomic():
+            Recipe.objects.create(
+                user=user, title='Toast', time_minutes=2, price=1.00
+            )
+            # what a concurrent request would cache the old rows under
+            version = response_cache.get_version(scope)
+
+        self.assertGreater(response_cache.get_version(scope), version)
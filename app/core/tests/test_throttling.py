@@ -0,0 +1,98 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import throttling
+from recipe.views import RecipeViewSet
+
+
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+class TwoReadsThrottle(throttling.ReadThrottle):
+    rate = '2/min'
+
+
+class BucketStoreTests(TestCase):
+
+    def assert_token_bucket(self, store):
+        """Check a bucket of 2 tokens refilling one token every 30s"""
+        # two requests fit in the bucket
+        self.assertEqual(store.consume('key', 30, 60, 1000), 0)
+        self.assertEqual(store.consume('key', 30, 60, 1000), 0)
+        # the third has to wait for one token to come back
+        self.assertAlmostEqual(store.consume('key', 30, 60, 1000), 30)
+        # other keys have their own bucket
+        self.assertEqual(store.consume('other', 30, 60, 1000), 0)
+
+    def test_local_memory_store(self):
+        """Test the in process bucket store"""
+        store = throttling.LocalMemoryBucketStore()
+        self.assert_token_bucket(store)
+        # after one interval one token is available again
+        self.assertEqual(store.consume('key', 30, 60, 1030), 0)
+
+    def test_cache_store(self):
+        """Test the bucket store shared through the cache"""
+        store = throttling.CacheBucketStore()
+        store.clear()
+        self.assert_token_bucket(store)
+        # after one interval one token is available again
+        self.assertEqual(store.consume('key', 30, 60, 1030), 0)
+
+    def test_cache_store_rejections_not_counted(self):
+        """Test retrying while throttled doesn't extend the wait"""
+        store = throttling.CacheBucketStore()
+        store.clear()
+        for _ in range(2):
+            store.consume('key', 30, 60, 1000)
+
+        for _ in range(5):
+            self.assertAlmostEqual(store.consume('key', 30, 60, 1000), 30)
+        self.assertEqual(store.consume('key', 30, 60, 1030), 0)
+
+    def test_cache_store_resyncs_after_idle(self):
+        """Test an idle bucket is full again but doesn't keep credit"""
+        store = throttling.CacheBucketStore()
+        store.clear()
+        store.consume('key', 30, 60, 1000)
+
+        for _ in range(2):
+            self.assertEqual(store.consume('key', 30, 60, 5000), 0)
+        self.assertGreater(store.consume('key', 30, 60, 5000), 0)
+
+
+class ThrottleApiTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@ram.com', 'testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        throttling.get_store().clear()
+
+    @patch.object(RecipeViewSet, 'throttle_classes', (TwoReadsThrottle,))
+    def test_reads_throttled(self):
+        """Test that reads over the rate are rejected with Retry-After"""
+        for _ in range(2):
+            res = self.client.get(RECIPE_URL)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', res)
+
+    @patch.object(RecipeViewSet, 'throttle_classes', (TwoReadsThrottle,))
+    def test_writes_not_counted_as_reads(self):
+        """Test that the read throttle ignores writes"""
+        payload = {'title': 'Toast', 'time_minutes': 2, 'price': 1.00}
+        for _ in range(3):
+            res = self.client.post(RECIPE_URL, payload)
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
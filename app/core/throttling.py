@@ -0,0 +1,184 @@
+"""Token bucket throttles for the API.
+
+Every client (auth token, or IP address for anonymous requests) gets one
+bucket per scope (reads, writes, logins). The buckets are tracked with the
+GCRA formulation of a token bucket: instead of storing the number of tokens
+left we only store the "theoretical arrival time" (TAT) of the next request,
+which fits in one integer and can be advanced with a single atomic ``incr``.
+
+Rates use the usual DRF format (``'600/min'``): the bucket holds 600 tokens
+and refills at 600 tokens per minute.
+"""
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class LocalMemoryBucketStore:
+    """Keep the buckets in the memory of this process
+
+    Costs no round trip at all, but every process has its own buckets, so
+    use it only when one process serves the API.
+    """
+    # drop buckets that are full again once we track this many
+    max_keys = 10000
+
+    def __init__(self):
+        self._tats = {}
+        self._lock = threading.Lock()
+
+    def consume(self, key, interval, burst, now):
+        """Take a token from the bucket, return the seconds to wait if empty
+
+        ``interval`` is the time it takes to refill one token and ``burst``
+        the time it takes to refill the whole bucket.
+        """
+        with self._lock:
+            tat = max(self._tats.get(key, now), now) + interval
+            wait = tat - now - burst
+            if wait > 0:
+                return wait
+            if len(self._tats) >= self.max_keys:
+                self._prune(now)
+            self._tats[key] = tat
+            return 0
+
+    def _prune(self, now):
+        """Forget the buckets that have refilled completely"""
+        self._tats = {k: v for k, v in self._tats.items() if v > now}
+
+    def clear(self):
+        with self._lock:
+            self._tats.clear()
+
+
+class CacheBucketStore:
+    """Keep the buckets in a Django cache shared by all processes
+
+    The TAT is stored in milliseconds and advanced with ``cache.incr``, so
+    an allowed request costs exactly one round trip. The Django cache API
+    has no compare-and-set, so the other cases cost two:
+
+    * a rejected request takes its increment back with ``cache.decr``, so
+      clients retrying in a loop while throttled don't push their own TAT
+      further out.
+    * the first request of a client (or after its key expired) falls back
+      to ``cache.add`` once the ``incr`` finds no key.
+    * the first request after the bucket has been full for a whole refill
+      period writes the TAT back to "now" with ``cache.set``.
+
+    Because of the last one a TAT that fell behind "now" by less than a
+    refill period is kept: right after an idle period a client can get up
+    to twice the bucket size within one refill period.
+    """
+    # keys expire after this many refill periods
+    key_ttl_periods = 10
+
+    def __init__(self, alias=None):
+        self.cache = caches[alias or settings.THROTTLE_CACHE_ALIAS]
+
+    def consume(self, key, interval, burst, now):
+        """Take a token from the bucket, return the seconds to wait if empty"""
+        now_ms = int(now * 1000)
+        interval_ms = max(int(interval * 1000), 1)
+        burst_ms = int(burst * 1000)
+        timeout = int(burst * self.key_ttl_periods) + 1
+
+        try:
+            tat = self.cache.incr(key, interval_ms)
+        except ValueError:
+            # first request of this client, or the key expired
+            tat = now_ms + interval_ms
+            if not self.cache.add(key, tat, timeout):
+                tat = self.cache.incr(key, interval_ms)
+
+        if tat - interval_ms < now_ms - burst_ms:
+            # idle for longer than a refill period, resync the TAT
+            tat = now_ms + interval_ms
+            self.cache.set(key, tat, timeout)
+
+        wait_ms = tat - now_ms - burst_ms
+        if wait_ms <= 0:
+            return 0
+        try:
+            self.cache.decr(key, interval_ms)
+        except ValueError:
+            # the key expired in between, nothing to take back
+            pass
+        return wait_ms / 1000.0
+
+    def clear(self):
+        self.cache.clear()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Return the bucket store configured with THROTTLE_STORE"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = import_string(settings.THROTTLE_STORE)()
+    return _store
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """Throttle requests per token (or IP for anonymous users) and scope"""
+    cache_format = 'throttle_%(scope)s_%(ident)s'
+    # the HTTP methods this throttle applies to, None for all of them
+    methods = None
+
+    def get_cache_key(self, request, view):
+        token = getattr(request.auth, 'key', None)
+        if token:
+            # don't put raw tokens in cache keys
+            ident = 'token_' + hashlib.sha1(token.encode()).hexdigest()
+        elif request.user and request.user.is_authenticated:
+            ident = 'user_%s' % request.user.pk
+        else:
+            ident = self.get_ident(request)
+
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+    def allow_request(self, request, view):
+        self._wait = 0
+        if self.rate is None:
+            return True
+        if self.methods is not None and request.method not in self.methods:
+            return True
+
+        key = self.get_cache_key(request, view)
+        interval = self.duration / self.num_requests
+        self._wait = get_store().consume(
+            key, interval, self.duration, time.time()
+        )
+        return self._wait == 0
+
+    def wait(self):
+        return self._wait
+
+
+class ReadThrottle(TokenBucketThrottle):
+    """Throttle for GET, HEAD and OPTIONS requests"""
+    scope = 'read'
+    methods = SAFE_METHODS
+
+
+class WriteThrottle(TokenBucketThrottle):
+    """Throttle for the requests that change data"""
+    scope = 'write'
+    methods = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+
+class LoginThrottle(TokenBucketThrottle):
+    """Throttle for obtaining auth tokens"""
+    scope = 'login'
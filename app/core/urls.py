@@ -0,0 +1,10 @@
+from django.urls import path
+
+from core import views
+
+app_name = 'core'
+
+urlpatterns = [
+    path('jobs/<int:pk>/', views.JobStatusView.as_view(), name='job'),
+    path('batch/', views.BatchView.as_view(), name='batch'),
+]
@@ -0,0 +1,59 @@
+from contextlib import nullcontext
+
+from django.db import transaction
+from rest_framework import generics
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core import batch
+from core.authentication import ExpiringTokenAuthentication
+from core.models import Job
+from core.serializers import JobSerializer, BatchSerializer
+
+
+class JobStatusView(generics.RetrieveAPIView):
+    """Show the status of a background job of the authenticated user"""
+    serializer_class = JobSerializer
+    queryset = Job.objects.all()
+    authentication_classes = (ExpiringTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self):
+        """Only the jobs of the authenticated user"""
+        return self.queryset.filter(user=self.request.user)
+
+
+class BatchView(APIView):
+    """Run many API requests in one round trip
+
+    Takes ``{"requests": [{"method": ..., "path": ..., "body": ...}]}``
+    and returns the status and data of every request, in order. With
+    ``"atomic": true`` the requests run in one transaction, and the first
+    one failing stops the batch and rolls back the others.
+    """
+    authentication_classes = (ExpiringTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    # the sub-requests are throttled one by one
+    throttle_classes = ()
+
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        atomic = serializer.validated_data['atomic']
+
+        responses = []
+        rolled_back = False
+        with transaction.atomic() if atomic else nullcontext():
+            for sub in serializer.validated_data['requests']:
+                status_code, body = batch.run(
+                    request, sub['method'], sub['path'], sub.get('body'),
+                    exclude=(BatchView,)
+                )
+                responses.append({'status': status_code, 'body': body})
+                if atomic and status_code >= 400:
+                    transaction.set_rollback(True)
+                    rolled_back = True
+                    break
+
+        return Response({'responses': responses, 'rolled_back': rolled_back})
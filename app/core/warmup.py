@@ -0,0 +1,33 @@
+"""Warm the lazy caches of the app before it serves the first request."""
+from django.contrib.auth import get_user_model
+from django.urls import get_resolver
+
+from recipe import serializers as recipe_serializers
+from user import serializers as user_serializers
+
+
+WARM_SERIALIZERS = (
+    recipe_serializers.TagSerializer,
+    recipe_serializers.IngredientSerializer,
+    recipe_serializers.RecipeSerializer,
+    recipe_serializers.RecipeDetailSerializer,
+    user_serializers.UserSerializer,
+)
+
+
+def warm_up():
+    """Populate the URL resolver and build the serializer fields once
+
+    Both are built lazily on the first request otherwise. Run it in the
+    gunicorn master (preload_app) so the workers inherit the warm caches.
+    """
+    resolver = get_resolver()
+    # builds the reverse lookup tables and the namespace dictionaries
+    resolver.reverse_dict
+    resolver.namespace_dict
+    resolver.resolve('/api/recipe/recipes/')
+
+    # the model _meta caches and the field mappings of DRF
+    get_user_model()._meta.get_fields()
+    for serializer_class in WARM_SERIALIZERS:
+        serializer_class().fields
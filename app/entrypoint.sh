@@ -0,0 +1,15 @@
+#!/bin/sh
+# Start the app in production: wait for the database, apply the
+# migrations and hand the process over to gunicorn (so it gets the
+# signals for graceful shutdowns).
+set -e
+
+if [ "$DJANGO_FAST_BOOT" = "1" ]; then
+    # one process, no system checks, migrate only when needed
+    python manage.py fast_boot
+else
+    python manage.py wait_for_db
+    python manage.py migrate --noinput
+fi
+
+exec gunicorn -c python:app.gunicorn_conf app.wsgi
@@ -0,0 +1,57 @@
+"""Rank recipes by the ingredients a user already has.
+
+The ranking is one GROUP BY over the recipe/ingredient link table. Only the
+recipes using at least one of the given ingredients are aggregated (found
+through the index on ingredient_id), so the cost grows with the recipes
+that match, not with all the recipes of the user.
+"""
+from django.db.models import Count, F, Q
+
+from core.models import Recipe
+
+
+RecipeIngredient = Recipe.ingredients.through
+
+
+def rank_cookable(user, ingredient_ids, limit):
+    """Return the ``limit`` recipes of the user missing the fewest ingredients
+
+    Ties go to the recipe using more of the given ingredients, then to the
+    newest. Every recipe comes with the ingredients it still needs.
+    """
+    ingredient_ids = list(ingredient_ids)
+    candidates = RecipeIngredient.objects.filter(
+        ingredient_id__in=ingredient_ids, recipe__user=user
+    ).values('recipe_id')
+    rows = list(
+        RecipeIngredient.objects.filter(recipe_id__in=candidates)
+        .values('recipe_id', 'recipe__title')
+        .annotate(
+            total=Count('ingredient_id'),
+            matched=Count(
+                'ingredient_id', filter=Q(ingredient_id__in=ingredient_ids)
+            ),
+        )
+        .annotate(missing=F('total') - F('matched'))
+        .order_by('missing', '-matched', '-recipe_id')[:limit]
+    )
+
+    missing = {row['recipe_id']: [] for row in rows}
+    if any(row['missing'] for row in rows):
+        links = (
+            RecipeIngredient.objects
+            .filter(recipe_id__in=list(missing))
+            .exclude(ingredient_id__in=ingredient_ids)
+            .order_by('ingredient__name')
+            .values_list('recipe_id', 'ingredient_id', 'ingredient__name')
+        )
+        for recipe_id, ingredient_id, name in links:
+            missing[recipe_id].append({'id': ingredient_id, 'name': name})
+
+    return [{
+        'id': row['recipe_id'],
+        'title': row['recipe__title'],
+        'matched': row['matched'],
+        'missing': row['missing'],
+        'missing_ingredients': missing[row['recipe_id']],
+    } for row in rows]
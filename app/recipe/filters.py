@@ -0,0 +1,133 @@
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db.models import Count
+from rest_framework import filters
+from rest_framework.exceptions import ValidationError
+
+from core import recipe_index
+from core.models import Recipe
+
+
+class StableOrderingFilter(filters.OrderingFilter):
+    """Ordering filter that breaks ties by id
+
+    Without it recipes with the same price or time come back in any order,
+    and could move between pages.
+    """
+
+    def get_ordering(self, request, queryset, view):
+        ordering = list(super().get_ordering(request, queryset, view) or [])
+        if not {'id', '-id', 'pk', '-pk'} & set(ordering):
+            ordering.append('-id')
+        return ordering
+
+
+def _parse(params, name, convert):
+    value = params.get(name)
+    if value is None:
+        return None
+    try:
+        value = convert(value)
+    except (ValueError, InvalidOperation):
+        value = None
+    if value is None or value < 0:
+        raise ValidationError({name: ['A valid positive number is required.']})
+    return value
+
+
+def _decimal(value):
+    value = Decimal(value)
+    return value if value.is_finite() else None
+
+
+class RecipeRangeFilter(filters.BaseFilterBackend):
+    """Filter recipes with ?max_time=, ?min_price= and ?max_price="""
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        max_time = _parse(params, 'max_time', int)
+        min_price = _parse(params, 'min_price', _decimal)
+        max_price = _parse(params, 'max_price', _decimal)
+
+        if max_time is not None:
+            queryset = queryset.filter(time_minutes__lte=max_time)
+        if min_price is not None:
+            queryset = queryset.filter(price__gte=min_price)
+        if max_price is not None:
+            queryset = queryset.filter(price__lte=max_price)
+        return queryset
+
+
+def _parse_ids(params, name):
+    value = params.get(name)
+    if not value:
+        return ()
+    ids = value.split(',')
+    if not all(id_.isdigit() for id_ in ids):
+        raise ValidationError(
+            {name: ['A comma separated list of ids is required.']}
+        )
+    return tuple(sorted(set(int(id_) for id_ in ids)))
+
+
+class RecipeSetFilter(filters.BaseFilterBackend):
+    """Filter recipes by their tags and ingredients
+
+    ``?ingredients=1,2`` keeps the recipes with all of them,
+    ``?any_ingredients=`` the ones with at least one and
+    ``?no_ingredients=`` the ones with none of them; the same goes for
+    tags. With RECIPE_INDEX_ENABLED the in-process index answers, unless
+    more than RECIPE_INDEX_MAX_IDS recipes match: a long ``IN`` list costs
+    more than the joins, and SQLite limits the number of parameters.
+    Otherwise every condition is one subquery on the link table.
+    """
+    kinds = {
+        recipe_index.TAGS: (Recipe.tags.through, 'tag_id'),
+        recipe_index.INGREDIENTS: (Recipe.ingredients.through,
+                                   'ingredient_id'),
+    }
+
+    def get_conditions(self, request):
+        conditions = {}
+        for kind in self.kinds:
+            condition = tuple(
+                _parse_ids(request.query_params, prefix + kind)
+                for prefix in ('', 'any_', 'no_')
+            )
+            if any(condition):
+                conditions[kind] = condition
+        return conditions
+
+    def filter_queryset(self, request, queryset, view):
+        conditions = self.get_conditions(request)
+        if not conditions:
+            return queryset
+        if settings.RECIPE_INDEX_ENABLED:
+            ids = recipe_index.query(request.user.pk, conditions)
+            if len(ids) <= settings.RECIPE_INDEX_MAX_IDS:
+                return queryset.filter(id__in=ids)
+        return self.filter_by_links(queryset, conditions)
+
+    def filter_by_links(self, queryset, conditions):
+        for kind, (all_of, any_of, none_of) in conditions.items():
+            through, column = self.kinds[kind]
+            if all_of:
+                queryset = queryset.filter(id__in=(
+                    through.objects.filter(**{column + '__in': all_of})
+                    .values('recipe_id')
+                    .annotate(found=Count('recipe_id'))
+                    .filter(found=len(all_of))
+                    .values('recipe_id')
+                ))
+            if any_of:
+                queryset = queryset.filter(id__in=(
+                    through.objects.filter(**{column + '__in': any_of})
+                    .values('recipe_id')
+                ))
+            if none_of:
+                queryset = queryset.exclude(id__in=(
+                    through.objects.filter(**{column + '__in': none_of})
+                    .values('recipe_id')
+                ))
+        return queryset
@@ -0,0 +1,27 @@
+from rest_framework.pagination import CursorPagination
+
+
+class OptionalCursorPagination(CursorPagination):
+    """Cursor pagination for clients asking for it with ?page_size=
+
+    Pages are fetched with ``WHERE <ordering field> > <last value>``, which
+    the (user, field) indexes answer without scanning the earlier pages.
+    Clients not asking for pages still get the whole list.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+    def get_page_size(self, request):
+        if (self.page_size_query_param not in request.query_params and
+                self.cursor_query_param not in request.query_params):
+            return None
+        return super().get_page_size(request)
+
+
+class PublicFeedPagination(CursorPagination):
+    """Pages of the public feed, newest recipes first"""
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = '-id'
@@ -1,6 +1,8 @@
 # import serializers and the model
+from django.db import models, transaction
 from rest_framework import serializers
-from core.models import Tag, Ingredient, Recipe
+from rest_framework.relations import MANY_RELATION_KWARGS
+from core.models import Tag, Ingredient, Recipe, RecipeIngredient
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -21,28 +23,217 @@ class IngredientSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
+class UserManyRelatedField(serializers.ManyRelatedField):
+    """List of primary keys, all looked up with one query"""
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        child = self.child_relation
+        pks = []
+        for item in data:
+            if isinstance(item, bool) or not isinstance(item, (int, str)):
+                child.fail('incorrect_type', data_type=type(item).__name__)
+            try:
+                pks.append(int(item))
+            except ValueError:
+                child.fail('incorrect_type', data_type=type(item).__name__)
+
+        objects = {obj.pk: obj for obj in child.get_queryset().filter(
+            pk__in=set(pks)
+        )}
+        for pk in pks:
+            if pk not in objects:
+                child.fail('does_not_exist', pk_value=pk)
+        return [objects[pk] for pk in dict.fromkeys(pks)]
+
+    def to_representation(self, iterable):
+        # in id order whatever order the database (or a prefetch) gives,
+        # like recipe.rows
+        return sorted(super().to_representation(iterable))
+
+
+class UserPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Primary key of one of the objects of the requesting user"""
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return UserManyRelatedField(**list_kwargs)
+
+    def get_queryset(self):
+        request = self.context.get('request')
+        if request is None:
+            return super().get_queryset().none()
+        return super().get_queryset().filter(user=request.user)
+
+
+class RecipeIngredientListSerializer(serializers.ListSerializer):
+    """Quantities in the order they were added, like recipe.rows"""
+
+    def to_representation(self, data):
+        if isinstance(data, models.Manager):
+            data = data.all()
+        return super().to_representation(
+            sorted(data, key=lambda item: item.pk)
+        )
+
+
+class RecipeIngredientSerializer(serializers.ModelSerializer):
+    """Serializer for the quantity of an ingredient in a recipe"""
+    # no lookup, validate() checks it's an ingredient of the recipe
+    ingredient = serializers.IntegerField(source='ingredient_id')
+
+    class Meta:
+        model = RecipeIngredient
+        fields = ('ingredient', 'quantity', 'unit')
+        list_serializer_class = RecipeIngredientListSerializer
+
+
 class RecipeSerializer(serializers.ModelSerializer):
     """serilizing for Recipe object"""
 
     # mention the primaryKey related fields
-    ingredients = serializers.PrimaryKeyRelatedField(
+    ingredients = UserPrimaryKeyRelatedField(
         many=True,
         queryset=Ingredient.objects.all()
     )
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = UserPrimaryKeyRelatedField(
         many=True,
         queryset=Tag.objects.all()
     )
+    # how much of the ingredients the recipe needs, optional
+    quantities = RecipeIngredientSerializer(
+        many=True, required=False, source='recipe_ingredients'
+    )
+    # listed in the public feed
+    is_public = serializers.BooleanField(required=False)
 
     class Meta:
         model = Recipe
-        fields = ('id', 'title', 'ingredients', 'tags', 'time_minutes',
-                  'price', 'link')
+        fields = ('id', 'title', 'ingredients', 'quantities', 'tags',
+                  'time_minutes', 'price', 'link', 'is_public')
         # this prevents the user from changing id field.
         read_only_fields = ('id', )
 
+    def validate(self, attrs):
+        """Check the quantities are for ingredients of the recipe"""
+        if 'recipe_ingredients' in attrs:
+            if 'ingredients' in attrs:
+                ingredient_ids = set(i.pk for i in attrs['ingredients'])
+            elif self.instance is not None:
+                ingredient_ids = set(
+                    self.instance.ingredients.values_list('id', flat=True)
+                )
+            else:
+                ingredient_ids = set()
+            for amount in attrs['recipe_ingredients']:
+                if amount['ingredient_id'] not in ingredient_ids:
+                    raise serializers.ValidationError({'quantities': [
+                        'Ingredient %s is not an ingredient of the recipe.'
+                        % amount['ingredient_id']
+                    ]})
+        return attrs
+
+    def save_ingredients(self, recipe, ingredients, quantities, new=False):
+        """Link the ingredients with their quantities to the recipe"""
+        current = {} if new else recipe.lock_ingredients()
+        if ingredients is None:
+            amounts = {
+                ingredient_id: (link.quantity, link.unit)
+                for ingredient_id, link in current.items()
+            }
+        else:
+            amounts = {}
+            for ingredient in ingredients:
+                link = current.get(ingredient.pk)
+                amounts[ingredient.pk] = (
+                    (link.quantity, link.unit) if link else (None, '')
+                )
+        for amount in quantities or ():
+            amounts[amount['ingredient_id']] = (
+                amount.get('quantity'), amount.get('unit', '')
+            )
+        recipe.set_ingredients(amounts, current)
+
+    def create(self, validated_data):
+        """Create the recipe and its links, one insert per table"""
+        tags = validated_data.pop('tags', [])
+        ingredients = validated_data.pop('ingredients', [])
+        quantities = validated_data.pop('recipe_ingredients', None)
+        with transaction.atomic():
+            recipe = super().create(validated_data)
+            recipe.set_tags([tag.pk for tag in tags], new=True)
+            self.save_ingredients(recipe, ingredients, quantities, new=True)
+        return recipe
+
+    def update(self, instance, validated_data):
+        tags = validated_data.pop('tags', None)
+        ingredients = validated_data.pop('ingredients', None)
+        quantities = validated_data.pop('recipe_ingredients', None)
+        with transaction.atomic():
+            recipe = super().update(instance, validated_data)
+            if tags is not None:
+                recipe.set_tags([tag.pk for tag in tags])
+            if ingredients is not None or quantities is not None:
+                self.save_ingredients(recipe, ingredients, quantities)
+        return recipe
+
 
 class RecipeDetailSerializer(RecipeSerializer):
     """Serialize a recipe detail"""
     ingredients = IngredientSerializer(many=True, read_only=True)
     tags = TagSerializer(many=True, read_only=True)
+
+
+class PublicRecipeIngredientSerializer(serializers.ModelSerializer):
+    """Serializer for the ingredients of a public recipe"""
+    name = serializers.CharField(source='ingredient.name')
+
+    class Meta:
+        model = RecipeIngredient
+        fields = ('name', 'quantity', 'unit')
+
+
+class PublicRecipeSerializer(serializers.ModelSerializer):
+    """Serializer for the recipes in the public feed"""
+    # the ids only mean something to the owner, show the names
+    tags = serializers.SlugRelatedField(
+        many=True, read_only=True, slug_field='name'
+    )
+    ingredients = PublicRecipeIngredientSerializer(
+        many=True, read_only=True, source='recipe_ingredients'
+    )
+
+    class Meta:
+        model = Recipe
+        fields = ('id', 'title', 'ingredients', 'tags', 'time_minutes',
+                  'price', 'link')
+
+
+class RecipeImageSerializer(serializers.ModelSerializer):
+    """Serializer for uploading images to recipes"""
+
+    class Meta:
+        model = Recipe
+        fields = ('id', 'image')
+        read_only_fields = ('id',)
+
+    def update(self, instance, validated_data):
+        """Save the new image, its variants have to be made again"""
+        instance.image_variants = None
+        return super().update(instance, validated_data)
+
+
+class RecipeBulkDeleteSerializer(serializers.Serializer):
+    """Serializer for the ids of the recipes to delete in bulk"""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False
+    )
@@ -0,0 +1,151 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe, Change
+from core.throttling import get_store
+
+
+CHANGES_URL = reverse('recipe:changes')
+BULK_DELETE_URL = reverse('recipe:recipe-bulk-delete')
+
+
+def sample_recipe(user, **params):
+    defaults = {'title': 'Sample recipe', 'time_minutes': 10, 'price': 5.00}
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class ChangeFeedApiTests(TestCase):
+    """Test the incremental change feed"""
+
+    def setUp(self):
+        get_store().clear()
+        self.user = get_user_model().objects.create_user(
+            'test@ram.com', 'testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def sync(self, since=0):
+        res = self.client.get(CHANGES_URL, {'since': since})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def test_login_required(self):
+        """Test the feed needs authentication"""
+        res = APIClient().get(CHANGES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_only_changes_since_cursor(self):
+        """Test the feed returns what changed after the cursor only"""
+        recipe = sample_recipe(self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        first = self.sync()
+        self.assertEqual(
+            [(c['model'], c['id']) for c in first['changes']],
+            [('recipe', recipe.id), ('tag', tag.id)]
+        )
+        self.assertEqual(first['changes'][1]['data']['name'], 'Vegan')
+
+        recipe.tags.add(tag)
+        recipe.title = 'Renamed'
+        recipe.save()
+        second = self.sync(first['cursor'])
+
+        # only the latest state of the recipe, once
+        self.assertEqual(len(second['changes']), 1)
+        change = second['changes'][0]
+        self.assertEqual(change['op'], Change.UPSERT)
+        self.assertEqual(change['data']['title'], 'Renamed')
+        self.assertEqual(change['data']['tags'], [tag.id])
+        self.assertEqual(self.sync(second['cursor'])['changes'], [])
+
+    def test_queries_independent_of_page_size(self):
+        """Test the related objects of the recipes are prefetched"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        salt = Ingredient.objects.create(user=self.user, name='Salt')
+        for i in range(20):
+            recipe = sample_recipe(self.user, title='Recipe %d' % i)
+            recipe.tags.add(tag)
+            recipe.set_ingredients({salt.id: (1, 'g')})
+
+        # horizon, entries, recipes with their tags, ingredients and
+        # quantities, then the changed tag and the changed ingredient
+        with self.assertNumQueries(8):
+            data = self.sync()
+
+        recipes = [c['data'] for c in data['changes']
+                   if c['model'] == 'recipe']
+        self.assertEqual(len(recipes), 20)
+        self.assertEqual(recipes[0]['quantities'], [
+            {'ingredient': salt.id, 'quantity': '1.00', 'unit': 'g'}
+        ])
+
+    def test_tombstones(self):
+        """Test deletes, bulk deletes included, show up as tombstones"""
+        recipes = [sample_recipe(self.user) for _ in range(3)]
+        ids = [r.id for r in recipes]
+        cursor = self.sync()['cursor']
+
+        recipes[0].delete()
+        self.client.post(
+            BULK_DELETE_URL, {'ids': ids[1:]},
+            format='json'
+        )
+        data = self.sync(cursor)
+
+        self.assertEqual(
+            sorted(c['id'] for c in data['changes']),
+            ids
+        )
+        for change in data['changes']:
+            self.assertEqual(change['op'], Change.DELETE)
+            self.assertIsNone(change['data'])
+
+    def test_other_users_changes_hidden(self):
+        """Test the feed only has the user's own changes"""
+        other = get_user_model().objects.create_user(
+            'other@ram.com', 'testpass'
+        )
+        sample_recipe(other)
+
+        self.assertEqual(self.sync()['changes'], [])
+
+    def test_invalid_cursor(self):
+        """Test a cursor that isn't a number is rejected"""
+        res = self.client.get(CHANGES_URL, {'since': 'abc'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_compaction(self):
+        """Test compaction drops old entries and resets clients behind"""
+        recipe = sample_recipe(self.user)
+        old_cursor = self.sync()['cursor']
+        recipe.title = 'Renamed'
+        recipe.save()
+        gone = sample_recipe(self.user)
+        gone.delete()
+        Change.objects.filter(op=Change.DELETE).update(
+            created=timezone.now() - timedelta(days=60)
+        )
+
+        call_command('compact_changes', retention_days=30, stdout=StringIO())
+
+        # the first save and the create of the deleted recipe are superseded
+        # and its tombstone expired
+        self.assertEqual(Change.objects.count(), 1)
+        data = self.sync(old_cursor)
+        self.assertTrue(data['reset'])
+        self.assertEqual(data['changes'], [])
+        data = self.sync(data['cursor'])
+        self.assertFalse(data['reset'])
@@ -106,3 +106,29 @@ class PrivateIngredientsApiTests(TestCase):
         res = self.client.post(INGREDIENTS_URL, payload)
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class IngredientAutocompleteTests(TestCase):
+    """Test the ingredient name autocomplete"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@ram.com', 'testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_autocomplete_limited(self):
+        """Test at most AUTOCOMPLETE_LIMIT names are returned, sorted"""
+        for i in range(12):
+            Ingredient.objects.create(user=self.user, name='Salt %02d' % i)
+
+        with self.settings(AUTOCOMPLETE_LIMIT=3):
+            res = self.client.get(
+                reverse('recipe:ingredient-autocomplete'), {'q': 'salt'}
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [i['name'] for i in res.data], ['Salt 00', 'Salt 01', 'Salt 02']
+        )
@@ -0,0 +1,205 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import rankings
+from core.models import Tag, Ingredient, Recipe, SavedRecipe
+from core.purge import delete_recipes
+
+
+PUBLIC_URL = reverse('recipe:public-recipe-list')
+TRENDING_URL = reverse('recipe:public-recipe-trending')
+
+
+def save_url(recipe_id):
+    return reverse('recipe:public-recipe-save-recipe', args=[recipe_id])
+
+
+def sample_recipe(user, **params):
+    defaults = {'title': 'Sample recipe', 'time_minutes': 10, 'price': 5.00}
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class PublicFeedApiTests(TestCase):
+    """Test the public recipe feed"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'test@ram.com', 'testpass'
+        )
+        self.client = APIClient()
+
+    def titles(self, params=None):
+        res = self.client.get(PUBLIC_URL, params or {})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        # cached pages come back as plain responses
+        return [r['title'] for r in json.loads(res.content)['results']]
+
+    def test_lists_public_recipes_only(self):
+        """Test anyone can list the public recipes, newest first"""
+        sample_recipe(self.user, title='Soup', is_public=True)
+        sample_recipe(self.user, title='Secret')
+        recipe = sample_recipe(self.user, title='Pasta', is_public=True)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        recipe.add_ingredients(
+            Ingredient.objects.create(user=self.user, name='Salt'),
+            quantity=2, unit='g'
+        )
+
+        res = self.client.get(PUBLIC_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [r['title'] for r in res.data['results']], ['Pasta', 'Soup']
+        )
+        self.assertEqual(res.data['results'][0]['tags'], ['Vegan'])
+        self.assertEqual(res.data['results'][0]['ingredients'], [
+            {'name': 'Salt', 'quantity': '2.00', 'unit': 'g'}
+        ])
+
+    def test_pages(self):
+        """Test the feed is paginated with cursors"""
+        for i in range(3):
+            sample_recipe(self.user, title='Recipe %s' % i, is_public=True)
+
+        res = self.client.get(PUBLIC_URL, {'page_size': 2})
+        self.assertEqual(
+            [r['title'] for r in res.data['results']],
+            ['Recipe 2', 'Recipe 1']
+        )
+        res = self.client.get(res.data['next'])
+
+        self.assertEqual(
+            [r['title'] for r in res.data['results']], ['Recipe 0']
+        )
+
+    def test_cached_for_everyone(self):
+        """Test a page is served from the cache to other readers too"""
+        sample_recipe(self.user, title='Soup', is_public=True)
+        self.titles()
+        other = APIClient()
+        other.force_authenticate(get_user_model().objects.create_user(
+            'other@ram.com', 'testpass'
+        ))
+
+        with self.assertNumQueries(0):
+            res = other.get(PUBLIC_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_private_changes_keep_cache(self):
+        """Test changes to private recipes don't invalidate the feed"""
+        self.titles()
+        sample_recipe(self.user, title='Secret')
+
+        with self.assertNumQueries(0):
+            self.titles()
+
+    def test_invalidated_by_public_changes(self):
+        """Test the feed is invalidated when a public recipe changes"""
+        recipe = sample_recipe(self.user, title='Soup', is_public=True)
+        self.titles()
+
+        recipe.title = 'Stew'
+        recipe.save()
+        self.assertEqual(self.titles(), ['Stew'])
+
+        recipe = Recipe.objects.get(id=recipe.id)
+        recipe.is_public = False
+        recipe.save()
+        self.assertEqual(self.titles(), [])
+
+    def test_invalidated_by_tag_rename(self):
+        """Test renaming a tag of a public recipe invalidates the feed"""
+        recipe = sample_recipe(self.user, is_public=True)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe.tags.add(tag)
+        self.client.get(PUBLIC_URL)
+
+        tag.name = 'Vegetarian'
+        tag.save()
+        res = self.client.get(PUBLIC_URL)
+
+        self.assertEqual(res.data['results'][0]['tags'], ['Vegetarian'])
+
+    def test_invalidated_by_bulk_delete(self):
+        """Test deleting public recipes in bulk invalidates the feed"""
+        sample_recipe(self.user, title='Soup', is_public=True)
+        self.titles()
+
+        delete_recipes(Recipe.objects.filter(user=self.user))
+
+        self.assertEqual(self.titles(), [])
+
+    def test_filters(self):
+        """Test the feed takes the time and price filters"""
+        sample_recipe(self.user, title='Quick', time_minutes=5,
+                      is_public=True)
+        sample_recipe(self.user, title='Slow', time_minutes=90,
+                      is_public=True)
+
+        self.assertEqual(self.titles({'max_time': 10}), ['Quick'])
+
+
+class RankingApiTests(TestCase):
+    """Test saving public recipes and reading the rankings"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'test@ram.com', 'testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_save_recipe(self):
+        """Test saving a public recipe, once"""
+        recipe = sample_recipe(self.user, is_public=True)
+
+        res = self.client.post(save_url(recipe.id))
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        res = self.client.post(save_url(recipe.id))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(SavedRecipe.objects.filter(recipe=recipe).count(), 1)
+        self.assertEqual(recipe.recipeactivity_set.get().saves, 1)
+
+        res = self.client.delete(save_url(recipe.id))
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(SavedRecipe.objects.exists())
+
+    def test_save_needs_login_and_public_recipe(self):
+        """Test only users can save, and only public recipes"""
+        public = sample_recipe(self.user, is_public=True)
+        private = sample_recipe(self.user)
+
+        res = APIClient().post(save_url(public.id))
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        res = self.client.post(save_url(private.id))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_trending(self):
+        """Test the rankings are listed in order"""
+        first = sample_recipe(self.user, title='First', is_public=True)
+        second = sample_recipe(self.user, title='Second', is_public=True)
+        rankings.record_activity(first.id, views=10)
+        rankings.record_activity(second.id, views=5)
+        rankings.refresh()
+        first.is_public = False
+        first.save()
+
+        res = self.client.get(TRENDING_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['title'] for r in res.data], ['Second'])
+        res = self.client.get(TRENDING_URL, {'ranking': 'saved'})
+        self.assertEqual(res.data, [])
+        res = self.client.get(TRENDING_URL, {'ranking': 'nope'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
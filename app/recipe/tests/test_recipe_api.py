@@ -1,16 +1,30 @@
+import json
+import os
+import tempfile
+from decimal import Decimal
+
+from PIL import Image
+
 from django.contrib.auth import get_user_model
 from django.urls import reverse
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
 
 from core.models import Recipe, Tag, Ingredient
 
-from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
+from recipe.rows import RecipeRowSerializer, TagRowSerializer
+from recipe.serializers import (
+    RecipeSerializer, RecipeDetailSerializer, TagSerializer
+)
 
 # reverse(app_name:identifier)
 RECIPE_URL = reverse('recipe:recipe-list')
+BULK_DELETE_URL = reverse('recipe:recipe-bulk-delete')
+COOKABLE_URL = reverse('recipe:recipe-cookable')
+SHOPPING_LIST_URL = reverse('recipe:recipe-shopping-list')
 
 
 # helper functions to create he urls
@@ -22,6 +36,16 @@ def detail_url(recipe_id):
     return reverse('recipe:recipe-detail', args=[recipe_id])
 
 
+def image_upload_url(recipe_id):
+    """Return the url for uploading a recipe image"""
+    return reverse('recipe:recipe-upload-image', args=[recipe_id])
+
+
+def image_url(recipe_id):
+    """Return the url for getting a recipe image variant"""
+    return reverse('recipe:recipe-image', args=[recipe_id])
+
+
 def sample_tag(user, name='Main Course'):
     """create and reuturn a sample tag"""
     return Tag.objects.create(user=user, name=name)
@@ -110,12 +134,13 @@ class PrivateRecipeApiTests(TestCase):
         self.assertEqual(len(res.data), 1)
         self.assertEqual(res.data, serializer.data)
 
+    # write the view right away, not from a background thread
     def test_view_recipe_detail(self):
         """Test viewing a recipe detail"""
         recipe = sample_recipe(self.user)
         # add tag and ingredient to this recipe
         recipe.tags.add(sample_tag(self.user))
-        recipe.ingredients.add(sample_ingredient(self.user))
+        recipe.add_ingredients(sample_ingredient(self.user))
 
         # generate the detail recipe url with this id
         url = detail_url(recipe.id)
@@ -235,3 +260,538 @@ class PrivateRecipeApiTests(TestCase):
         # tags needs to be empty
         tags = recipe.tags.all()
         self.assertEqual(len(tags), 0)
+
+    def test_bulk_delete_recipes(self):
+        """Test deleting many recipes with one request"""
+        recipe1 = sample_recipe(self.user)
+        recipe1.tags.add(sample_tag(self.user))
+        recipe1.add_ingredients(sample_ingredient(self.user))
+        recipe2 = sample_recipe(self.user, title='Kept recipe')
+        # recipes of other users can't be deleted
+        user2 = get_user_model().objects.create_user('other@ram.com', 'pass')
+        recipe3 = sample_recipe(user2)
+
+        payload = {'ids': [recipe1.id, recipe3.id]}
+        res = self.client.post(BULK_DELETE_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'deleted': 1})
+        self.assertFalse(Recipe.objects.filter(id=recipe1.id).exists())
+        self.assertTrue(Recipe.objects.filter(id=recipe2.id).exists())
+        self.assertTrue(Recipe.objects.filter(id=recipe3.id).exists())
+        self.assertFalse(
+            Recipe.tags.through.objects.filter(recipe_id=recipe1.id).exists()
+        )
+
+    def test_bulk_delete_requires_ids(self):
+        """Test bulk delete with no ids fails"""
+        res = self.client.post(BULK_DELETE_URL, {'ids': []}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RecipeImageUploadTests(TestCase):
+    """Test uploading and serving recipe images"""
+
+    def setUp(self):
+        self.media_root = tempfile.TemporaryDirectory()
+        self.settings = override_settings(MEDIA_ROOT=self.media_root.name)
+        self.settings.enable()
+        self.user = get_user_model().objects.create_user(
+            'test@ram.com', 'testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = sample_recipe(user=self.user)
+
+    def tearDown(self):
+        self.recipe.image.delete()
+        self.settings.disable()
+        self.media_root.cleanup()
+
+    def upload(self, size=(100, 50)):
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            Image.new('RGB', size).save(image_file, format='JPEG')
+            image_file.seek(0)
+            return self.client.post(
+                image_upload_url(self.recipe.id), {'image': image_file},
+                format='multipart'
+            )
+
+    def test_upload_image_to_recipe(self):
+        """Test uploading an image to the recipe"""
+        res = self.upload()
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('image', res.data)
+        self.assertTrue(os.path.exists(self.recipe.image.path))
+
+    def test_upload_image_bad_request(self):
+        """Test uploading an invalid image"""
+        url = image_upload_url(self.recipe.id)
+        res = self.client.post(url, {'image': 'notimage'}, format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_image_serves_smallest_fitting_variant(self):
+        """Test the smallest variant wide enough for the client is served"""
+        self.upload(size=(800, 400))
+        self.recipe.refresh_from_db()
+        self.recipe.image_variants = json.dumps([
+            {'width': 160, 'height': 80, 'name': 'small.jpg'},
+            {'width': 800, 'height': 400, 'name': self.recipe.image.name},
+        ])
+        self.recipe.save()
+
+        res = self.client.get(image_url(self.recipe.id), {'width': 100})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['width'], 160)
+        self.assertTrue(res.data['url'].endswith('/media/small.jpg'))
+
+    def test_image_without_variants_serves_original(self):
+        """Test the original is served until the variants are made"""
+        self.upload(size=(800, 400))
+
+        res = self.client.get(image_url(self.recipe.id), {'width': 100})
+
+        self.assertEqual(res.data['width'], 800)
+
+
+class RecipeFilterTests(TestCase):
+    """Test ordering and filtering the recipe list"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@ram.com', 'testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.quick = sample_recipe(self.user, title='Quick', time_minutes=5,
+                                   price=8.00)
+        self.cheap = sample_recipe(self.user, title='Cheap', time_minutes=20,
+                                   price=2.00)
+        self.slow = sample_recipe(self.user, title='Slow', time_minutes=90,
+                                  price=8.00)
+
+    def titles(self, params):
+        res = self.client.get(RECIPE_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [recipe['title'] for recipe in res.data]
+
+    def test_ordering(self):
+        """Test ordering by an allowed field, ties broken by newest"""
+        self.assertEqual(
+            self.titles({'ordering': 'price'}), ['Cheap', 'Slow', 'Quick']
+        )
+        self.assertEqual(
+            self.titles({'ordering': '-time_minutes'}),
+            ['Slow', 'Cheap', 'Quick']
+        )
+
+    def test_ordering_not_allowed_ignored(self):
+        """Test ordering by a field outside the allow-list is ignored"""
+        self.assertEqual(
+            self.titles({'ordering': 'user__password'}),
+            ['Slow', 'Cheap', 'Quick']
+        )
+
+    def test_range_filters(self):
+        """Test filtering by time and price ranges"""
+        self.assertEqual(
+            self.titles({'max_time': 30, 'ordering': 'price'}),
+            ['Cheap', 'Quick']
+        )
+        self.assertEqual(self.titles({'min_price': '5.5'}), ['Slow', 'Quick'])
+        self.assertEqual(self.titles({'max_price': '2'}), ['Cheap'])
+
+    def test_invalid_filter_value(self):
+        """Test filter values that aren't numbers are rejected"""
+        for params in ({'max_time': 'soon'}, {'min_price': 'nan'},
+                       {'max_price': '-1'}):
+            res = self.client.get(RECIPE_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_cursor_pagination(self):
+        """Test paging through a sorted list with the cursor"""
+        res = self.client.get(
+            RECIPE_URL, {'ordering': 'price', 'page_size': 2}
+        )
+        titles = [recipe['title'] for recipe in res.data['results']]
+        self.assertIsNone(res.data['previous'])
+
+        res = self.client.get(res.data['next'])
+        titles += [recipe['title'] for recipe in res.data['results']]
+
+        self.assertEqual(titles, ['Cheap', 'Slow', 'Quick'])
+        self.assertIsNone(res.data['next'])
+
+
+class CookableRecipeTests(TestCase):
+    """Test ranking recipes by the ingredients the user has"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@ram.com', 'testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.eggs = sample_ingredient(self.user, 'Eggs')
+        self.flour = sample_ingredient(self.user, 'Flour')
+        self.milk = sample_ingredient(self.user, 'Milk')
+        self.sugar = sample_ingredient(self.user, 'Sugar')
+
+    def recipe(self, title, *ingredients):
+        recipe = sample_recipe(self.user, title=title)
+        recipe.add_ingredients(*ingredients)
+        return recipe
+
+    def test_ranked_by_missing_ingredients(self):
+        """Test recipes missing fewer ingredients come first"""
+        self.recipe('Cake', self.eggs, self.flour, self.milk, self.sugar)
+        self.recipe('Omelette', self.eggs)
+        self.recipe('Pancakes', self.eggs, self.flour, self.milk)
+        self.recipe('Sweet milk', self.milk, self.sugar)
+
+        res = self.client.get(COOKABLE_URL, {
+            'ingredients': '%d,%d' % (self.eggs.id, self.flour.id)
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(r['title'], r['matched'], r['missing']) for r in res.data],
+            [('Omelette', 1, 0), ('Pancakes', 2, 1), ('Cake', 2, 2)]
+        )
+        self.assertEqual(
+            [i['name'] for i in res.data[2]['missing_ingredients']],
+            ['Milk', 'Sugar']
+        )
+
+    def test_limit_and_other_users(self):
+        """Test the limit and that other users' recipes are left out"""
+        other = get_user_model().objects.create_user('o@ram.com', 'pass')
+        other_recipe = sample_recipe(other, title='Not mine')
+        other_recipe.add_ingredients(self.eggs)
+        self.recipe('Omelette', self.eggs)
+        self.recipe('Pancakes', self.eggs, self.flour)
+
+        res = self.client.get(COOKABLE_URL, {
+            'ingredients': str(self.eggs.id), 'limit': 1
+        })
+
+        self.assertEqual([r['title'] for r in res.data], ['Omelette'])
+
+    def test_invalid_parameters(self):
+        """Test ids and limits that aren't numbers are rejected"""
+        for params in ({}, {'ingredients': 'eggs'},
+                       {'ingredients': '1', 'limit': '0'}):
+            res = self.client.get(COOKABLE_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RecipeSetFilterTests(TestCase):
+    """Test filtering recipes by tags and ingredients"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@ram.com', 'testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.garlic = sample_ingredient(self.user, 'Garlic')
+        self.basil = sample_ingredient(self.user, 'Basil')
+        self.nuts = sample_ingredient(self.user, 'Nuts')
+        self.vegan = sample_tag(self.user, 'Vegan')
+        self.pesto = sample_recipe(self.user, title='Pesto')
+        self.pesto.add_ingredients(self.garlic, self.basil, self.nuts)
+        self.pasta = sample_recipe(self.user, title='Pasta')
+        self.pasta.add_ingredients(self.garlic, self.basil)
+        self.pasta.tags.add(self.vegan)
+        self.bread = sample_recipe(self.user, title='Garlic bread')
+        self.bread.add_ingredients(self.garlic)
+
+    def titles(self, params):
+        res = self.client.get(RECIPE_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [recipe['title'] for recipe in res.data]
+
+    def test_all_any_none(self):
+        """Test the AND, OR and NOT filters and their combinations"""
+        ids = '%d,%d' % (self.garlic.id, self.basil.id)
+        self.assertEqual(self.titles({'ingredients': ids}),
+                         ['Pasta', 'Pesto'])
+        self.assertEqual(
+            self.titles({'any_ingredients': '%d' % self.basil.id}),
+            ['Pasta', 'Pesto']
+        )
+        self.assertEqual(
+            self.titles({'ingredients': ids,
+                         'no_ingredients': str(self.nuts.id)}),
+            ['Pasta']
+        )
+        self.assertEqual(
+            self.titles({'any_ingredients': str(self.garlic.id),
+                         'no_tags': str(self.vegan.id)}),
+            ['Garlic bread', 'Pesto']
+        )
+
+    def test_invalid_ids(self):
+        """Test ids that aren't numbers are rejected"""
+        res = self.client.get(RECIPE_URL, {'tags': 'vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RecipeQuantityTests(TestCase):
+    """Test ingredient quantities and the shopping list"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@ram.com', 'testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.flour = sample_ingredient(self.user, 'Flour')
+        self.milk = sample_ingredient(self.user, 'Milk')
+
+    def create(self, quantities, ingredients=None):
+        payload = {
+            'title': 'Pancakes', 'time_minutes': 20, 'price': '4.00',
+            'tags': [], 'quantities': quantities,
+            'ingredients': ingredients or [q['ingredient'] for q in quantities]
+        }
+        return self.client.post(RECIPE_URL, payload, format='json')
+
+    def test_create_with_quantities(self):
+        """Test creating a recipe with ingredient quantities"""
+        res = self.create([
+            {'ingredient': self.flour.id, 'quantity': '200', 'unit': 'g'},
+        ], ingredients=[self.flour.id, self.milk.id])
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        amounts = {
+            link.ingredient_id: (link.quantity, link.unit)
+            for link in recipe.recipe_ingredients.all()
+        }
+        self.assertEqual(amounts, {
+            self.flour.id: (200, 'g'), self.milk.id: (None, '')
+        })
+
+    def test_quantity_for_other_ingredient_rejected(self):
+        """Test quantities must be for ingredients of the recipe"""
+        res = self.create([
+            {'ingredient': self.flour.id, 'quantity': '200', 'unit': 'g'},
+        ], ingredients=[self.milk.id])
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_patch_quantities_only(self):
+        """Test changing a quantity keeps the other ingredients"""
+        recipe = sample_recipe(self.user)
+        recipe.add_ingredients(self.flour, self.milk, quantity=1, unit='cup')
+
+        res = self.client.patch(detail_url(recipe.id), {'quantities': [
+            {'ingredient': self.milk.id, 'quantity': '0.5', 'unit': 'l'},
+        ]}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(sorted(res.data['ingredients']),
+                         sorted([self.flour.id, self.milk.id]))
+        milk = recipe.recipe_ingredients.get(ingredient=self.milk)
+        self.assertEqual((milk.quantity, milk.unit), (Decimal('0.5'), 'l'))
+
+    def test_shopping_list(self):
+        """Test quantities are summed up per ingredient and unit"""
+        pancakes = self.create([
+            {'ingredient': self.flour.id, 'quantity': '200', 'unit': 'g'},
+            {'ingredient': self.milk.id, 'quantity': '0.5', 'unit': 'l'},
+        ]).data['id']
+        bread = self.create([
+            {'ingredient': self.flour.id, 'quantity': '500', 'unit': 'g'},
+            {'ingredient': self.milk.id, 'quantity': '1', 'unit': 'cup'},
+        ]).data['id']
+        # not on the list
+        self.create([
+            {'ingredient': self.flour.id, 'quantity': '50', 'unit': 'g'},
+        ])
+
+        with self.assertNumQueries(1):
+            res = self.client.get(SHOPPING_LIST_URL, {
+                'ids': '%d,%d' % (pancakes, bread)
+            })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(r['name'], r['quantity'], r['unit'], r['recipes'])
+             for r in res.data],
+            [('Flour', Decimal('700'), 'g', 2),
+             ('Milk', Decimal('1'), 'cup', 1),
+             ('Milk', Decimal('0.5'), 'l', 1)]
+        )
+
+
+class RowSerializerTests(TestCase):
+    """Test the list fast path renders like the serializers"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@ram.com', 'testpass'
+        )
+
+    def render(self, data):
+        return JSONRenderer().render(data)
+
+    def test_recipes_render_the_same(self):
+        """Test recipe rows render to the same bytes as RecipeSerializer"""
+        # created in reverse so link order and id order differ
+        tags = [sample_tag(self.user, name) for name in ('b', 'a', 'c')]
+        ingredients = [sample_ingredient(self.user, n) for n in ('x', 'y')]
+        first = sample_recipe(self.user, title='Soup', price=Decimal('3.5'),
+                              link='http://soup', is_public=True)
+        first.tags.add(tags[2], tags[0])
+        first.set_ingredients({
+            ingredients[1].id: (Decimal('1.25'), 'kg'),
+            ingredients[0].id: (None, ''),
+        })
+        sample_recipe(self.user, title='Bare')
+        Recipe.objects.filter(title='Bare').update(is_public=None)
+        queryset = Recipe.objects.order_by('-id')
+
+        expected = RecipeSerializer(queryset, many=True).data
+        rows = RecipeRowSerializer().serialize(
+            queryset.values(*RecipeRowSerializer().columns)
+        )
+
+        self.assertEqual(self.render(rows), self.render(expected))
+        prefetched = RecipeSerializer(queryset.prefetch_related(
+            'tags', 'ingredients', 'recipe_ingredients'
+        ), many=True).data
+        self.assertEqual(self.render(rows), self.render(prefetched))
+
+    def test_tags_render_the_same(self):
+        """Test tag rows render to the same bytes as TagSerializer"""
+        sample_tag(self.user, 'Vegan')
+        sample_tag(self.user, 'Dessert')
+        queryset = Tag.objects.order_by('-name')
+
+        rows = TagRowSerializer().serialize(queryset.values('id', 'name'))
+
+        self.assertEqual(
+            self.render(rows),
+            self.render(TagSerializer(queryset, many=True).data)
+        )
+
+    def test_list_queries(self):
+        """Test the recipe list costs the same few queries for any size"""
+        client = APIClient()
+        client.force_authenticate(self.user)
+        tag = sample_tag(self.user)
+        for i in range(5):
+            sample_recipe(self.user, title='Recipe %s' % i).tags.add(tag)
+
+        # the recipes, their ingredients and their tags
+        with self.assertNumQueries(3):
+            res = client.get(RECIPE_URL)
+        self.assertEqual(len(res.data), 5)
+
+
+class RecipeWriteQueryTests(TestCase):
+    """Test the statements recipe writes cost"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@ram.com', 'testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.tags = [sample_tag(self.user, n) for n in ('a', 'b', 'c')]
+        self.ingredients = [
+            sample_ingredient(self.user, n) for n in ('x', 'y', 'z')
+        ]
+
+    def payload(self, tags, ingredients, **params):
+        payload = {
+            'title': 'Soup',
+            'time_minutes': 20,
+            'price': '4.00',
+            'tags': [t.id for t in tags],
+            'ingredients': [i.id for i in ingredients],
+        }
+        payload.update(params)
+        return payload
+
+    def test_create_queries(self):
+        """Test a create looks up the links once and inserts them in bulk"""
+        payload = self.payload(self.tags, self.ingredients, quantities=[
+            {'ingredient': self.ingredients[0].id, 'quantity': '2.00',
+             'unit': 'kg'},
+        ])
+
+        # the tag and ingredient lookups, then in a savepoint the recipe,
+        # the tag links and the ingredient links with a change feed entry
+        # each, and the three reads of the response
+        with self.assertNumQueries(13):
+            res = self.client.post(RECIPE_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(recipe.tags.count(), 3)
+        self.assertEqual(
+            recipe.recipe_ingredients.get(
+                ingredient=self.ingredients[0]
+            ).unit, 'kg'
+        )
+
+    def test_update_queries(self):
+        """Test a full update only writes the links that changed"""
+        recipe = sample_recipe(self.user)
+        recipe.set_tags([self.tags[0].id, self.tags[1].id])
+        recipe.set_ingredients({self.ingredients[0].id: (None, '')})
+        payload = self.payload(self.tags[1:], self.ingredients[:2])
+
+        # the recipe, the tag and ingredient lookups, then in a savepoint
+        # the recipe update, the current tags, one delete and one insert,
+        # the locked ingredient links and one insert, each write with a
+        # change feed entry, and the three reads of the response
+        with self.assertNumQueries(18):
+            res = self.client.put(detail_url(recipe.id), payload,
+                                  format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted(res.data['tags']), [self.tags[1].id, self.tags[2].id]
+        )
+        self.assertEqual(
+            sorted(res.data['ingredients']),
+            [self.ingredients[0].id, self.ingredients[1].id]
+        )
+
+    def test_partial_update_queries(self):
+        """Test a partial update leaves the links it wasn't given alone"""
+        recipe = sample_recipe(self.user)
+        recipe.set_tags([self.tags[0].id])
+
+        # the recipe, then in a savepoint its update with its change feed
+        # entry, and the three reads of the response
+        with self.assertNumQueries(8):
+            res = self.client.patch(detail_url(recipe.id), {'title': 'Stew'},
+                                    format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['tags'], [self.tags[0].id])
+
+    def test_links_of_other_users_rejected(self):
+        """Test only the user's own tags and ingredients can be linked"""
+        other = get_user_model().objects.create_user(
+            'other@ram.com', 'testpass'
+        )
+        tag = sample_tag(other)
+
+        res = self.client.post(
+            RECIPE_URL, self.payload([tag], self.ingredients), format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.exists())
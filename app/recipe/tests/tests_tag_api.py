@@ -1,6 +1,7 @@
 # import get_user_model
 from django.contrib.auth import get_user_model
 # import reverse for generating the url
+from django.core.cache import cache
 from django.urls import reverse
 from django.test import TestCase
 
@@ -10,6 +11,7 @@ from rest_framework.test import APIClient
 
 # model( Tag ) and serializer for that model
 from core.models import Tag
+from core import response_cache
 from recipe.serializers import TagSerializer
 
 # create tag's url ( for api calls )
@@ -102,3 +104,69 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.post(TAGS_URL, payload)
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TagAutocompleteTests(TestCase):
+    """Test the tag name autocomplete"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@ram.com', 'testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('recipe:tag-autocomplete')
+        for name in ('Vegan', 'vegetarian', 'Dessert', 'Veg_out'):
+            Tag.objects.create(user=self.user, name=name)
+
+    def test_prefix_match(self):
+        """Test names are matched by prefix, ignoring case"""
+        res = self.client.get(self.url, {'q': 'VEGA'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([t['name'] for t in res.data], ['Vegan'])
+
+        res = self.client.get(self.url, {'q': 've'})
+        self.assertEqual(
+            [t['name'] for t in res.data], ['Veg_out', 'Vegan', 'vegetarian']
+        )
+
+    def test_wildcards_are_literal(self):
+        """Test LIKE wildcards in the prefix aren't treated as patterns"""
+        res = self.client.get(self.url, {'q': 'veg_'})
+
+        self.assertEqual([t['name'] for t in res.data], ['Veg_out'])
+
+    def test_new_names_seen_despite_cache(self):
+        """Test the cached results are dropped when the tags change"""
+        self.client.get(self.url, {'q': 'des'})
+        Tag.objects.create(user=self.user, name='Desserts')
+
+        res = self.client.get(self.url, {'q': 'des'})
+
+        self.assertEqual(len(res.data), 2)
+
+    def test_limited_to_user(self):
+        """Test other users' tags aren't suggested"""
+        other = get_user_model().objects.create_user('o@ram.com', 'pass')
+        Tag.objects.create(user=other, name='Vegetables')
+
+        res = self.client.get(self.url, {'q': 'vege'})
+
+        self.assertEqual([t['name'] for t in res.data], ['vegetarian'])
+
+    def test_equal_versions_not_shared_between_users(self):
+        """Test users with the same cache version get their own names"""
+        other = get_user_model().objects.create_user('o@ram.com', 'pass')
+        Tag.objects.create(user=other, name='Vegetables')
+        for user in (self.user, other):
+            cache.set(
+                response_cache.VERSION_KEY_FORMAT %
+                response_cache.user_scope(user.pk), 1000, None
+            )
+        self.client.get(self.url, {'q': 'vege'})
+        self.client.force_authenticate(other)
+
+        res = self.client.get(self.url, {'q': 'vege'})
+
+        self.assertEqual([t['name'] for t in res.data], ['Vegetables'])
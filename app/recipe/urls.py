@@ -7,9 +7,12 @@ router = DefaultRouter()
 router.register('tags', views.TagViewSet)
 router.register('ingredients', views.IngredientViewSet)
 router.register('recipes', views.RecipeViewSet)
+router.register('public', views.PublicRecipeViewSet,
+                base_name='public-recipe')
 
 app_name = 'recipe'
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('changes/', views.ChangeFeedView.as_view(), name='changes'),
 ]
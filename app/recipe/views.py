@@ -1,18 +1,49 @@
-from rest_framework import viewsets, mixins
-from rest_framework.authentication import TokenAuthentication
-from rest_framework.permissions import IsAuthenticated
+import hashlib
 
-from core.models import Tag, Ingredient, Recipe
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db.models import Count, Sum
+from django.db.models.functions import Lower
+from rest_framework import viewsets, mixins, status
+from rest_framework.decorators import action
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core import (
+    changes, counters, images, jobs, rankings, response_cache
+)
+from core.authentication import ExpiringTokenAuthentication
+from core.idempotency import IdempotentCreateMixin
+from core.models import (
+    Tag, Ingredient, Recipe, RecipeIngredient, Change, RankedRecipe,
+    SavedRecipe
+)
+from core.purge import delete_recipes
+from core.response_cache import CachedListMixin
 
 from recipe import serializers
+from recipe.cookable import rank_cookable
+from recipe.filters import (
+    RecipeRangeFilter, RecipeSetFilter, StableOrderingFilter
+)
+from recipe.pagination import OptionalCursorPagination, PublicFeedPagination
+from recipe.rows import (
+    RowListMixin, TagRowSerializer, IngredientRowSerializer,
+    RecipeRowSerializer
+)
 
 
-class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
+class BaseRecipeAttrViewSet(IdempotentCreateMixin,
+                            CachedListMixin,
+                            RowListMixin,
+                            viewsets.GenericViewSet,
                             mixins.ListModelMixin,
                             mixins.CreateModelMixin):
     """Base Viewset for user owned recipe attributes"""
     # add authentication classes as this requires one
-    authentication_classes = (TokenAuthentication, )
+    authentication_classes = (ExpiringTokenAuthentication, )
     # add IsAuthenticated as one of the permission classes
     permission_classes = (IsAuthenticated, )
 
@@ -24,11 +55,43 @@ class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
         """create a new object with this user as the author"""
         serializer.save(user=self.request.user)
 
+    @action(methods=['get'], detail=False)
+    def autocomplete(self, request):
+        """Return the first names starting with ?q=, case insensitive
+
+        Served by the (user_id, lower(name)) index, and cached for a few
+        seconds per user and prefix.
+        """
+        prefix = request.query_params.get('q', '').strip().lower()
+        if not prefix:
+            return Response([])
+
+        version = response_cache.get_version(
+            response_cache.user_scope(request.user.pk)
+        )
+        # versions of different users can be equal
+        key = 'autocomplete_%s' % hashlib.sha1('|'.join([
+            self.queryset.model.__name__, str(request.user.pk), prefix,
+            str(version)
+        ]).encode()).hexdigest()
+        names = cache.get(key)
+        if names is None:
+            names = list(
+                self.queryset.filter(user=request.user)
+                .annotate(lower_name=Lower('name'))
+                .filter(lower_name__startswith=prefix)
+                .order_by('lower_name', 'id')
+                .values('id', 'name')[:settings.AUTOCOMPLETE_LIMIT]
+            )
+            cache.set(key, names, settings.AUTOCOMPLETE_CACHE_TIMEOUT)
+        return Response(names)
+
 
 class TagViewSet(BaseRecipeAttrViewSet):
     """manage tags in the database"""
     queryset = Tag.objects.all()
     serializer_class = serializers.TagSerializer
+    row_serializer_class = TagRowSerializer
 
 
 class IngredientViewSet(BaseRecipeAttrViewSet):
@@ -37,14 +100,25 @@ class IngredientViewSet(BaseRecipeAttrViewSet):
     queryset = Ingredient.objects.all()
     # mention the serializer for this viewset
     serializer_class = serializers.IngredientSerializer
+    row_serializer_class = IngredientRowSerializer
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(IdempotentCreateMixin,
+                    CachedListMixin,
+                    RowListMixin,
+                    viewsets.ModelViewSet):
     """Manage recipes in the database"""
     serializer_class = serializers.RecipeSerializer
+    row_serializer_class = RecipeRowSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = (TokenAuthentication, )
+    authentication_classes = (ExpiringTokenAuthentication, )
     permission_classes = (IsAuthenticated, )
+    filter_backends = (RecipeRangeFilter, RecipeSetFilter,
+                       StableOrderingFilter)
+    # ?ordering= is limited to the indexed fields (and title)
+    ordering_fields = ('id', 'title', 'time_minutes', 'price')
+    ordering = ('-id', )
+    pagination_class = OptionalCursorPagination
 
     def get_queryset(self):
         """Retrieve the recipes for the authenticated user"""
@@ -55,9 +129,269 @@ class RecipeViewSet(viewsets.ModelViewSet):
         # 'retrieve' is the action when detail page is called.
         if self.action == 'retrieve':
             return serializers.RecipeDetailSerializer
+        elif self.action == 'bulk_delete':
+            return serializers.RecipeBulkDeleteSerializer
+        elif self.action == 'upload_image':
+            return serializers.RecipeImageSerializer
 
         return self.serializer_class
 
+    def retrieve(self, request, *args, **kwargs):
+        """Return the recipe, counting the view (written behind)"""
+        response = super().retrieve(request, *args, **kwargs)
+        counters.views.add(response.data['id'])
+        return response
+
     def perform_create(self, serializer):
         """Create a new recipe by the authenticated user"""
         serializer.save(user=self.request.user)
+
+    @action(methods=['post'], detail=False, url_path='bulk-delete')
+    def bulk_delete(self, request):
+        """Delete many recipes of the user with set based deletes"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        deleted = delete_recipes(
+            self.get_queryset().filter(id__in=serializer.data['ids'])
+        )
+
+        return Response({'deleted': deleted}, status=status.HTTP_200_OK)
+
+    @action(methods=['get'], detail=False)
+    def cookable(self, request):
+        """Rank the recipes by the ingredients the user has
+
+        Takes the ids of the ingredients with ``?ingredients=1,2,3`` and
+        returns up to ``?limit=`` recipes, the ones missing the fewest
+        ingredients first.
+        """
+        ids = request.query_params.get('ingredients', '').split(',')
+        if not all(i.isdigit() for i in ids):
+            return Response(
+                {'ingredients': ['A comma separated list of ids is needed.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        limit = request.query_params.get('limit', '20')
+        if not limit.isdigit() or not 0 < int(limit) <= 100:
+            return Response(
+                {'limit': ['A number between 1 and 100 is required.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(
+            rank_cookable(request.user, map(int, ids), int(limit))
+        )
+
+    @action(methods=['get'], detail=False, url_path='shopping-list')
+    def shopping_list(self, request):
+        """Sum up the ingredients of the recipes in ?ids=1,2,3
+
+        One row per ingredient and unit, quantities in different units
+        aren't added up.
+        """
+        ids = request.query_params.get('ids', '').split(',')
+        if not all(i.isdigit() for i in ids) or len(ids) > 500:
+            return Response(
+                {'ids': ['A comma separated list of ids is needed.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        rows = (
+            RecipeIngredient.objects
+            .filter(recipe__user=request.user, recipe_id__in=set(ids))
+            .values('ingredient_id', 'ingredient__name', 'unit')
+            .annotate(quantity=Sum('quantity'), recipes=Count('recipe_id'))
+            .order_by('ingredient__name', 'unit')
+        )
+        return Response([{
+            'ingredient': row['ingredient_id'],
+            'name': row['ingredient__name'],
+            'quantity': row['quantity'],
+            'unit': row['unit'],
+            'recipes': row['recipes'],
+        } for row in rows])
+
+    @action(methods=['post'], detail=True, url_path='upload-image')
+    def upload_image(self, request, pk=None):
+        """Upload an image to a recipe
+
+        The upload is streamed to the storage in chunks, the resized
+        variants are made by a background job.
+        """
+        recipe = self.get_object()
+        serializer = self.get_serializer(recipe, data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        job = jobs.enqueue(
+            'recipe_image_variants', user=request.user,
+            recipe_id=recipe.id, image_name=recipe.image.name
+        )
+        data = dict(serializer.data, job=job.id)
+        return Response(data, status=status.HTTP_200_OK)
+
+    @action(methods=['get'], detail=True)
+    def image(self, request, pk=None):
+        """Return the smallest image variant at least ?width= pixels wide"""
+        recipe = self.get_object()
+        if not recipe.image:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
+        width = request.query_params.get('width', '0')
+        if not width.isdigit():
+            return Response(
+                {'width': ['A positive integer is required.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        variants = recipe.get_image_variants() or [{
+            'width': recipe.image.width,
+            'height': recipe.image.height,
+            'name': recipe.image.name,
+        }]
+        variant = images.pick_variant(variants, int(width))
+        return Response({
+            'url': request.build_absolute_uri(
+                default_storage.url(variant['name'])
+            ),
+            'width': variant['width'],
+            'height': variant['height'],
+        })
+
+
+class PublicRecipeViewSet(CachedListMixin,
+                          viewsets.GenericViewSet,
+                          mixins.ListModelMixin):
+    """List the public recipes of all users, newest first
+
+    The pages are cached once for all readers, keyed only by the cursor and
+    the filters, until a public recipe changes.
+    """
+    serializer_class = serializers.PublicRecipeSerializer
+    queryset = Recipe.objects.filter(is_public=True).prefetch_related(
+        'tags', 'recipe_ingredients__ingredient'
+    )
+    authentication_classes = (ExpiringTokenAuthentication, )
+    permission_classes = (AllowAny, )
+    filter_backends = (RecipeRangeFilter, )
+    pagination_class = PublicFeedPagination
+
+    def get_list_cache_scope(self, request):
+        return response_cache.PUBLIC_SCOPE
+
+    @action(methods=['get'], detail=False)
+    def trending(self, request):
+        """List the ranking in ?ranking=, trending (default) or saved
+
+        The rankings are precomputed by the refresh_rankings command.
+        """
+        ranking = request.query_params.get('ranking', RankedRecipe.TRENDING)
+        if ranking not in rankings.RANKINGS:
+            return Response(
+                {'ranking': ['Unknown ranking.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        recipes = self.get_queryset().filter(
+            rankings__ranking=ranking
+        ).order_by('rankings__rank')
+        return Response(self.get_serializer(recipes, many=True).data)
+
+    @action(methods=['post', 'delete'], detail=True, url_path='save',
+            permission_classes=(IsAuthenticated, ))
+    def save_recipe(self, request, pk=None):
+        """Save the recipe for the user, or forget it with DELETE"""
+        recipe = self.get_object()
+        if request.method == 'DELETE':
+            SavedRecipe.objects.filter(
+                user=request.user, recipe=recipe
+            ).delete()
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        _, created = SavedRecipe.objects.get_or_create(
+            user=request.user, recipe=recipe
+        )
+        if created:
+            rankings.record_activity(recipe.id, saves=1)
+        return Response(
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        )
+
+
+class ChangeFeedView(APIView):
+    """List what changed in the user's data since ?since=<cursor>
+
+    Clients start with ``since=0`` and pass the returned cursor next time.
+    With ``reset`` the client missed deletes and has to download
+    everything again, then sync from the returned cursor.
+    """
+    authentication_classes = (ExpiringTokenAuthentication, )
+    permission_classes = (IsAuthenticated, )
+    querysets = {
+        'recipe': Recipe.objects.prefetch_related(
+            'tags', 'ingredients', 'recipe_ingredients'
+        ),
+        'tag': Tag.objects.all(),
+        'ingredient': Ingredient.objects.all(),
+    }
+    serializer_classes = {
+        'recipe': serializers.RecipeSerializer,
+        'tag': serializers.TagSerializer,
+        'ingredient': serializers.IngredientSerializer,
+    }
+
+    def get(self, request):
+        since = request.query_params.get('since', '0')
+        if not since.isdigit():
+            return Response(
+                {'since': ['A non-negative integer is required.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        since = int(since)
+        user_id = request.user.pk
+
+        horizon = changes.get_horizon(user_id)
+        if since < horizon:
+            return Response({
+                # the newest entry may have been dropped
+                'cursor': max(changes.latest_seq(user_id), horizon),
+                'more': False,
+                'reset': True,
+                'changes': [],
+            })
+
+        entries, cursor, more = changes.changes_since(
+            user_id, since, settings.CHANGE_FEED_PAGE_SIZE
+        )
+        # the current state of the changed objects, one query per model
+        objects = {}
+        for model, queryset in self.querysets.items():
+            ids = [e.object_id for e in entries
+                   if e.model == model and e.op == Change.UPSERT]
+            if ids:
+                for obj in queryset.filter(user_id=user_id, id__in=ids):
+                    objects[model, obj.id] = obj
+
+        data = []
+        for entry in entries:
+            item = {
+                'seq': entry.id,
+                'model': entry.model,
+                'id': entry.object_id,
+                'op': entry.op,
+                'data': None,
+            }
+            if entry.op == Change.UPSERT:
+                obj = objects.get((entry.model, entry.object_id))
+                if obj is None:
+                    # deleted since, its tombstone comes later
+                    continue
+                item['data'] = self.serializer_classes[entry.model](obj).data
+            data.append(item)
+
+        return Response({
+            'cursor': cursor,
+            'more': more,
+            'reset': False,
+            'changes': data,
+        })
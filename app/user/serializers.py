@@ -3,6 +3,8 @@ from rest_framework import serializers
 
 from django.utils.translation import ugettext as _
 
+from core import hashing
+
 
 # Create a new serializer called User serializer, we are going to inherit from
 # serilaizer.ModelSerializer. It does some tasks like creating and retreiving
@@ -27,7 +29,9 @@ class UserSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         """Create a new user with encrypted password and return it"""
-        return get_user_model().objects.create_user(**validated_data)
+        return hashing.run_hashing(
+            get_user_model().objects.create_user, **validated_data
+        )
 
     def update(self, instance, validated_data):
         """Update a user, setting the password correctly and return it"""
@@ -35,7 +39,7 @@ class UserSerializer(serializers.ModelSerializer):
         user = super().update(instance, validated_data)
 
         if password:
-            user.set_password(password)
+            hashing.run_hashing(user.set_password, password)
             user.save()
 
         return user
@@ -48,6 +52,11 @@ class AuthTokenSerializer(serializers.Serializer):
         style={'input-type': 'password'},
         trim_whitespace=False
     )
+    # name of the device the token is for, a user has one token per device
+    # and logging in again replaces it
+    device = serializers.CharField(
+        max_length=100, required=False, allow_blank=True
+    )
 
     def validate(self, attrs):
         """Validate and authenticate the user"""
@@ -55,15 +64,21 @@ class AuthTokenSerializer(serializers.Serializer):
         email = attrs.get('email')
         password = attrs.get('password')
 
-        user = authenticate(
+        # refuse to even hash the password while the email is backing off
+        failures = hashing.check_login_backoff(email)
+        user = hashing.run_hashing(
+            authenticate,
             request=self.context.get('request'),
             username=email,
             password=password
         )
         # if authentication fails
         if not user:
+            hashing.record_login_failure(email)
             msg = _('Unable to authenticate with provided credentials')
             raise serializers.ValidationError(msg, code='authentication')
+        if failures:
+            hashing.reset_login_failures(email)
 
         attrs['user'] = user
         return attrs
@@ -0,0 +1,132 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import AuthToken
+from core.throttling import get_store
+
+
+TOKEN_URL = reverse('user:token')
+ROTATE_URL = reverse('user:token-rotate')
+REVOKE_URL = reverse('user:token-revoke')
+ME_URL = reverse('user:me')
+
+
+class ExpiringTokenTests(TestCase):
+    """Test the expiring, per device auth tokens"""
+
+    def setUp(self):
+        get_store().clear()
+        self.payload = {'email': 'test@ram.com', 'password': 'testpass'}
+        self.user = get_user_model().objects.create_user(**self.payload)
+        self.client = APIClient()
+
+    def login(self, device=''):
+        res = self.client.post(TOKEN_URL, dict(self.payload, device=device))
+        return AuthToken.objects.get(key=res.data['token'])
+
+    def authenticate(self, token):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+
+    def test_one_token_per_device(self):
+        """Test logging in on two devices gives two working tokens"""
+        phone = self.login('phone')
+        laptop = self.login('laptop')
+
+        self.assertNotEqual(phone.key, laptop.key)
+        for token in (phone, laptop):
+            self.authenticate(token)
+            res = self.client.get(ME_URL)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_login_replaces_token_of_device(self):
+        """Test logging in again on a device revokes its old token"""
+        old = self.login('phone')
+        laptop = self.login('laptop')
+
+        new = self.login('phone')
+
+        self.assertNotEqual(new.key, old.key)
+        self.assertFalse(AuthToken.objects.filter(pk=old.pk).exists())
+        self.assertEqual(
+            set(AuthToken.objects.values_list('key', flat=True)),
+            {new.key, laptop.key}
+        )
+
+    def test_expired_token_rejected(self):
+        """Test that expired tokens can't be used"""
+        token = self.login()
+        AuthToken.objects.filter(pk=token.pk).update(
+            expires=timezone.now() - timedelta(seconds=1)
+        )
+        self.authenticate(token)
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_expiry_checked_without_extra_query(self):
+        """Test a fresh token costs only the token lookup"""
+        self.authenticate(self.login())
+
+        # token + user lookup (one query), nothing else for /me/
+        with self.assertNumQueries(1):
+            self.client.get(ME_URL)
+
+    def test_token_renewed_in_second_half_of_lifetime(self):
+        """Test that tokens in use keep sliding forward"""
+        token = self.login()
+        old_expiry = timezone.now() + timedelta(days=1)
+        AuthToken.objects.filter(pk=token.pk).update(expires=old_expiry)
+        self.authenticate(token)
+
+        self.client.get(ME_URL)
+
+        token.refresh_from_db()
+        self.assertGreater(token.expires, old_expiry + timedelta(days=1))
+
+    def test_rotate_token(self):
+        """Test rotating replaces only the token of the request"""
+        phone = self.login('phone')
+        laptop = self.login('laptop')
+        self.authenticate(phone)
+
+        res = self.client.post(ROTATE_URL)
+
+        new = AuthToken.objects.get(key=res.data['token'])
+        self.assertEqual(new.device, 'phone')
+        self.assertFalse(AuthToken.objects.filter(pk=phone.pk).exists())
+        self.assertTrue(AuthToken.objects.filter(pk=laptop.pk).exists())
+
+    def test_revoke_token(self):
+        """Test logging out deletes the token"""
+        token = self.login()
+        self.authenticate(token)
+
+        res = self.client.post(REVOKE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(AuthToken.objects.filter(pk=token.pk).exists())
+
+    def test_prune_tokens(self):
+        """Test the prune command deletes only the expired tokens"""
+        live = self.login()
+        for device in ('a', 'b', 'c'):
+            AuthToken.objects.create(
+                user=self.user, device=device,
+                expires=timezone.now() - timedelta(days=1)
+            )
+
+        call_command('prune_tokens', chunk_size=2, stdout=StringIO())
+
+        self.assertEqual(
+            list(AuthToken.objects.values_list('pk', flat=True)), [live.pk]
+        )
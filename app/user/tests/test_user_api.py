@@ -6,6 +6,9 @@ from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from core.jobs import run_worker
+from core.models import Recipe, Tag
+
 # create create user url using reverse
 CREATE_USER_URL = reverse('user:create')
 TOKEN_URL = reverse('user:token')
@@ -171,3 +174,27 @@ class PrivateUserApiTests(TestCase):
         self.assertEqual(self.user.name, payload['name'])
         self.assertTrue(self.user.check_password(payload['password']))
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_delete_user_account(self):
+        """Test deleting the account removes everything the user owns"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe = Recipe.objects.create(
+            user=self.user, title='Toast', time_minutes=2, price=1.00
+        )
+        recipe.tags.add(tag)
+
+        res = self.client.delete(ME_URL)
+
+        # the account is closed right away, the data purged by a job
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(res.content, b'')
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+
+        run_worker(burst=True)
+
+        self.assertFalse(
+            get_user_model().objects.filter(id=self.user.id).exists()
+        )
+        self.assertFalse(Recipe.objects.filter(id=recipe.id).exists())
+        self.assertFalse(Tag.objects.filter(id=tag.id).exists())
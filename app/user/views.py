@@ -1,7 +1,14 @@
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, permissions, status
+from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
+from rest_framework.views import APIView
 
+from core import jobs
+from core.authentication import ExpiringTokenAuthentication, issue_token
+from core.models import AuthToken
+from core.throttling import LoginThrottle
 # import our userserializer from our serializers.py
 from user.serializers import UserSerializer, AuthTokenSerializer
 
@@ -17,12 +24,48 @@ class CreateTokenView(ObtainAuthToken):
     """Create a new auth token for user"""
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    throttle_classes = (LoginThrottle,)
 
+    def post(self, request, *args, **kwargs):
+        """Give a new expiring token to the user for the device
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+        The token the device had before is revoked.
+        """
+        serializer = self.serializer_class(data=request.data,
+                                           context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        token = issue_token(
+            serializer.validated_data['user'],
+            serializer.validated_data.get('device', '')
+        )
+        return Response({'token': token.key, 'expires': token.expires})
+
+
+class RotateTokenView(APIView):
+    """Replace the token used for the request with a new one"""
+    authentication_classes = (ExpiringTokenAuthentication,)
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def post(self, request):
+        # replaces request.auth, the other devices stay logged in
+        token = issue_token(request.user, request.auth.device)
+        return Response({'token': token.key, 'expires': token.expires})
+
+
+class RevokeTokenView(APIView):
+    """Log out: delete the token used for the request"""
+    authentication_classes = (ExpiringTokenAuthentication,)
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def post(self, request):
+        request.auth.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class ManageUserView(generics.RetrieveUpdateDestroyAPIView):
     """Manage the authentcated user"""
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (ExpiringTokenAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):
@@ -31,3 +74,15 @@ class ManageUserView(generics.RetrieveUpdateAPIView):
         # the request have the user. It takes care of that.
         # We can just load it from the request
         return self.request.user
+
+    def destroy(self, request, *args, **kwargs):
+        """Close the account now and delete its data in the background"""
+        user = self.get_object()
+        user.is_active = False
+        user.save(update_fields=['is_active'])
+        AuthToken.objects.filter(user=user).delete()
+        Token.objects.filter(user=user).delete()
+
+        # the job isn't the user's, its status couldn't be read anyway
+        jobs.enqueue('purge_user', user_id=user.id)
+        return Response(status=status.HTTP_204_NO_CONTENT)